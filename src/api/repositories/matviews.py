@@ -0,0 +1,33 @@
+"""
+Leitura de materialized views Gold com fallback para as tabelas base
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_with_fallback(
+    db: Session,
+    view_name: str,
+    view_query: str,
+    fallback_query: str,
+    params: Optional[Dict[str, Any]] = None
+) -> List[Any]:
+    """
+    Executa view_query se a materialized view existir; senão (ou se ela
+    sumir durante uma reconstrução) executa fallback_query, que calcula o
+    mesmo resultado a partir das tabelas Gold base.
+    """
+    params = params or {}
+    exists = db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": view_name}).scalar()
+    if exists:
+        try:
+            return db.execute(text(view_query), params).fetchall()
+        except DBAPIError as e:
+            db.rollback()
+            logger.warning(f"Materialized view {view_name} indisponível, usando tabelas base: {e}")
+    return db.execute(text(fallback_query), params).fetchall()
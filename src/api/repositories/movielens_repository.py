@@ -4,6 +4,7 @@ MovieLens data repository
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Dict, Any, Optional, Tuple
+from .matviews import fetch_with_fallback
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,7 +15,7 @@ class MovieLensRepository:
     
     def get_stats(self) -> Dict[str, Any]:
         """Get general MovieLens statistics"""
-        query = text("""
+        fallback = """
             SELECT 
                 COUNT(DISTINCT dm.movieid) as total_movies,
                 SUM(fmr.total_users) as total_users,
@@ -22,8 +23,14 @@ class MovieLensRepository:
                 AVG(fmr.avg_rating) as avg_rating
             FROM gold.dim_movies dm
             LEFT JOIN gold.fact_movie_ratings fmr ON dm.movieid = fmr.movieid
-        """)
-        result = self.db.execute(query).fetchone()
+        """
+        rows = fetch_with_fallback(
+            self.db,
+            "gold.mv_movielens_stats",
+            "SELECT total_movies, total_users, total_ratings, avg_rating FROM gold.mv_movielens_stats",
+            fallback
+        )
+        result = rows[0]
         
         total_ratings = result.total_ratings or 0
         
@@ -69,7 +76,7 @@ class MovieLensRepository:
     
     def get_genre_stats(self) -> List[Dict[str, Any]]:
         """Get statistics by genre"""
-        query = text("""
+        fallback = """
             SELECT 
                 dg.genre_id,
                 dg.genre_name,
@@ -81,8 +88,13 @@ class MovieLensRepository:
             LEFT JOIN gold.fact_movie_ratings fmr ON fmg.movieid = fmr.movieid
             GROUP BY dg.genre_id, dg.genre_name
             ORDER BY total_movies DESC
-        """)
-        results = self.db.execute(query).fetchall()
+        """
+        results = fetch_with_fallback(
+            self.db,
+            "gold.mv_genre_stats",
+            "SELECT * FROM gold.mv_genre_stats ORDER BY total_movies DESC",
+            fallback
+        )
         
         return [
             {
@@ -257,7 +269,7 @@ class MovieLensRepository:
     # ============ GRÁFICOS ============
     def get_movies_by_decade(self) -> List[Dict[str, Any]]:
         """Get movies count grouped by decade"""
-        query = text("""
+        fallback = """
             SELECT 
                 FLOOR(release_year / 10) * 10 as decade,
                 COUNT(*) as count
@@ -265,8 +277,13 @@ class MovieLensRepository:
             WHERE release_year IS NOT NULL
             GROUP BY decade
             ORDER BY decade
-        """)
-        results = self.db.execute(query).fetchall()
+        """
+        results = fetch_with_fallback(
+            self.db,
+            "gold.mv_movies_by_decade",
+            "SELECT decade, count FROM gold.mv_movies_by_decade ORDER BY decade",
+            fallback
+        )
         return [{"decade": r.decade, "count": r.count} for r in results]
     
     def get_rating_distribution(self) -> List[Dict[str, Any]]:
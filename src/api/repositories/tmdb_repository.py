@@ -4,6 +4,7 @@ TMDB data repository
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List, Dict, Any, Optional, Tuple
+from .matviews import fetch_with_fallback
 import logging
 
 logger = logging.getLogger(__name__)
@@ -325,7 +326,7 @@ class TMDBRepository:
     # ============ ANÁLISES ============
     def get_revenue_by_decade(self) -> List[Dict[str, Any]]:
         """Get total revenue grouped by decade"""
-        query = text("""
+        fallback = """
             SELECT 
                 release_decade as decade,
                 COUNT(*) as movie_count,
@@ -335,8 +336,13 @@ class TMDBRepository:
             WHERE has_revenue = true AND release_decade IS NOT NULL
             GROUP BY release_decade
             ORDER BY release_decade
-        """)
-        results = self.db.execute(query).fetchall()
+        """
+        results = fetch_with_fallback(
+            self.db,
+            "gold_tmdb.mv_revenue_by_decade",
+            "SELECT * FROM gold_tmdb.mv_revenue_by_decade ORDER BY decade",
+            fallback
+        )
         
         return [
             {
@@ -350,7 +356,7 @@ class TMDBRepository:
     
     def get_genre_revenue(self) -> List[Dict[str, Any]]:
         """Get revenue by genre"""
-        query = text("""
+        fallback = """
             WITH genre_split AS (
                 SELECT 
                     movielens_id,
@@ -370,8 +376,13 @@ class TMDBRepository:
             GROUP BY genre
             ORDER BY total_revenue DESC
             LIMIT 10
-        """)
-        results = self.db.execute(query).fetchall()
+        """
+        results = fetch_with_fallback(
+            self.db,
+            "gold_tmdb.mv_genre_revenue",
+            "SELECT * FROM gold_tmdb.mv_genre_revenue ORDER BY total_revenue DESC LIMIT 10",
+            fallback
+        )
         
         return [
             {
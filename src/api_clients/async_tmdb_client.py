@@ -0,0 +1,260 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Set
+import httpx
+from src.api_clients.http_cache import HTTPResponseCache
+from src.settings.settings import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenBucket:
+    """
+    Rate limiter token bucket para asyncio.
+
+    Libera até `rate` requisições por segundo (com rajada de até `capacity`)
+    e dorme só o tempo exato até o próximo token. `pause` bloqueia o bucket
+    inteiro (ex: Retry-After de um 429).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Aguarda e consome um token."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Bloqueia novas requisições por `seconds` e zera os tokens."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+        self.updated_at = self.paused_until
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+class AsyncTMDBClient:
+    """
+    Cliente assíncrono da API TMDB.
+
+    Um único httpx.AsyncClient (pool de conexões compartilhado, HTTP/2) é
+    usado por todas as requisições, e o TokenBucket mantém o ritmo em
+    TMDB_MAX_REQUESTS_PER_SECOND, respeitando Retry-After.
+
+    Com `cache` (HTTPResponseCache), respostas dentro do TTL não vão à rede e
+    as vencidas são revalidadas com requisição condicional (304 = reuso).
+    `offline=True` serve só do cache, ignorando TTL (replay para debug/benchmark)
+    e `force_revalidate=True` revalida mesmo entradas no TTL (filmes alterados).
+
+    Uso:
+        async with AsyncTMDBClient() as client:
+            movie = await client.get_movie_details(603)
+    """
+
+    def __init__(
+        self,
+        api_key: str = settings.TMDB_API_KEY,
+        base_url: str = settings.TMDB_BASE_URL,
+        max_requests_per_second: float = settings.TMDB_MAX_REQUESTS_PER_SECOND,
+        max_connections: int = 20,
+        retries: int = settings.TMDB_RETRY_ATTEMPTS,
+        timeout: float = 30.0,
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[HTTPResponseCache] = None,
+        offline: bool = False,
+        force_revalidate: bool = False
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.timeout = timeout
+        self.http2 = http2
+        self.max_connections = max_connections
+        self.transport = transport
+        self.bucket = TokenBucket(rate=max_requests_per_second)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.cache = cache
+        self.offline = offline
+        self.force_revalidate = force_revalidate
+        self.requests_made = 0
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                params={"api_key": self.api_key},
+                headers={"Accept": "application/json"},
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self.transport
+            )
+            logger.info(
+                f"AsyncTMDBClient pronto ({self.bucket.rate} req/s, "
+                f"{self.max_connections} conexões, http2={self.http2})"
+            )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _get(self, endpoint: str, params: Optional[Dict] = None, cacheable: bool = True) -> Dict:
+        """
+        GET com cache, rate limiting, Retry-After e retry com backoff.
+
+        Retorna {} só quando o recurso não existe (404). Falhas transitórias
+        (conexão, 429, 5xx) que persistem após as retentativas levantam exceção.
+        """
+        key = entry = None
+        headers = {}
+        if self.cache is not None and cacheable:
+            key = self.cache.make_key(endpoint, params)
+            entry = self.cache.get(key)
+            if entry and (self.offline or (entry["fresh"] and not self.force_revalidate)):
+                return entry["data"]
+            headers = self.cache.conditional_headers(entry)
+
+        if self.offline:
+            return entry["data"] if entry else {}
+
+        if self.client is None:
+            await self.open()
+
+        for attempt in range(1, self.retries + 1):
+            await self.bucket.acquire()
+            try:
+                response = await self.client.get(
+                    f"/{endpoint.lstrip('/')}", params=params, headers=headers
+                )
+                self.requests_made += 1
+            except httpx.TransportError as e:
+                logger.warning(f"Erro de conexão em {endpoint} (tentativa {attempt}/{self.retries}): {e}")
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(2 ** (attempt - 1))
+                continue
+
+            if response.status_code == 429:
+                wait_time = parse_retry_after(response.headers.get("Retry-After"))
+                logger.warning(f"Rate limit atingido. Aguardando {wait_time:.1f}s...")
+                self.bucket.pause(wait_time)
+                continue
+
+            if response.status_code == 304 and entry is not None:
+                self.cache.touch(key)
+                return entry["data"]
+
+            if response.status_code == 404:
+                self._store(key, response, {})
+                return {}
+
+            if response.status_code >= 500 and attempt < self.retries:
+                await asyncio.sleep(2 ** (attempt - 1))
+                continue
+
+            response.raise_for_status()
+            data = response.json()
+            self._store(key, response, data)
+            return data
+
+        raise httpx.HTTPStatusError(
+            f"Rate limit persistente em {endpoint} após {self.retries} tentativas",
+            request=response.request,
+            response=response
+        )
+
+    def _store(self, key: Optional[str], response: httpx.Response, data: Dict):
+        """Grava a resposta no cache (404 também, para não repetir a busca)."""
+        if self.cache is not None and key is not None:
+            self.cache.put(
+                key,
+                status=response.status_code,
+                data=data,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+
+    async def get_changed_movie_ids(self, start_date: str, end_date: str) -> Set[int]:
+        """
+        IDs de filmes alterados no TMDB entre start_date e end_date (YYYY-MM-DD).
+
+        O endpoint /movie/changes aceita no máximo 14 dias por consulta e é
+        paginado; o chamador divide janelas maiores. Nunca usa o cache.
+        """
+        changed = set()
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            data = await self._get(
+                "movie/changes",
+                params={"start_date": start_date, "end_date": end_date, "page": page},
+                cacheable=False
+            )
+            if not data:
+                raise RuntimeError(f"Falha ao consultar movie/changes ({start_date} → {end_date}, página {page})")
+            changed.update(item["id"] for item in data.get("results", []))
+            total_pages = data.get("total_pages", 1)
+            page += 1
+        return changed
+
+    async def find_by_imdb_id(self, imdb_id: str) -> Dict:
+        """Busca filme pelo IMDb ID (endpoint /find). Retorna {} se não achar."""
+        data = await self._get(f"find/{imdb_id}", params={"external_source": "imdb_id"})
+        results = data.get("movie_results") or []
+        return results[0] if results else {}
+
+    async def get_movie_details(self, tmdb_id: int, append_to_response: Optional[str] = None) -> Dict:
+        """Detalhes do filme (opcionalmente com sub-recursos via append_to_response)."""
+        params = {"append_to_response": append_to_response} if append_to_response else None
+        return await self._get(f"movie/{tmdb_id}", params=params)
+
+    async def get_credits(self, tmdb_id: int) -> Dict:
+        """Créditos (elenco e equipe) do filme."""
+        return await self._get(f"movie/{tmdb_id}/credits")
@@ -0,0 +1,173 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CREATE_CACHE_TABLE = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class HTTPResponseCache:
+    """
+    Cache persistente (SQLite) de respostas HTTP, chaveado por endpoint+params.
+
+    Guarda corpo, status, ETag/Last-Modified e hora da busca. Entradas dentro
+    do TTL são servidas sem rede; entradas vencidas são revalidadas com
+    requisição condicional (If-None-Match / If-Modified-Since). O tamanho
+    total é limitado a max_size_mb, removendo as menos acessadas (LRU).
+
+    Uso:
+        cache = HTTPResponseCache("logs/tmdb_http_cache.sqlite", ttl_seconds=7 * 86400)
+        entry = cache.get(cache.make_key("movie/603", {}))
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 86400, max_size_mb: float = 2048):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(CREATE_CACHE_TABLE)
+        self._total_bytes = self._current_size()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[Dict] = None) -> str:
+        """Chave estável: endpoint + params ordenados (sem api_key)."""
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if k != "api_key")
+        query = "&".join(f"{k}={v}" for k, v in items)
+        return f"{endpoint.strip('/')}?{query}" if query else endpoint.strip("/")
+
+    def _current_size(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retorna a entrada (com 'fresh' indicando se está no TTL) ou None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status, body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.conn.commit()
+
+        status, body, etag, last_modified, fetched_at = row
+        fresh = time.time() - fetched_at < self.ttl_seconds
+        if fresh:
+            self.hits += 1
+        return {
+            "status": status,
+            "data": json.loads(body),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+            "fresh": fresh
+        }
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict:
+        """Headers para revalidar uma entrada vencida."""
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, key: str, status: int, data: Dict,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Grava/atualiza uma resposta e aplica a eviction por tamanho."""
+        body = json.dumps(data)
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, status, body, etag, last_modified, fetched_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, status, body, etag, last_modified, now, now, size)
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self.conn.commit()
+
+    def touch(self, key: str):
+        """Resposta 304: a entrada continua válida, renova o TTL."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self.conn.commit()
+            self.revalidated += 1
+
+    def _evict(self):
+        """Remove as entradas menos acessadas até ficar em ~90% do limite."""
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        rows = self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            removed += 1
+        logger.info(f"🧹 Cache HTTP: {removed} entradas removidas ({self._total_bytes / 1024 / 1024:.1f} MB)")
+
+    def purge_expired(self) -> int:
+        """Remove entradas fora do TTL sem validadores (não dá para revalidar)."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM responses WHERE fetched_at < ? AND etag IS NULL AND last_modified IS NULL",
+                (time.time() - self.ttl_seconds,)
+            )
+            self.conn.commit()
+            self._total_bytes = self._current_size()
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "entries": entries,
+            "size_mb": round(self._total_bytes / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated
+        }
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,107 @@
+"""
+Benchmark de memória: leitura antiga (bytes + BytesIO + pandas) vs read_table (Arrow).
+
+Sobe um Parquet sintético para o MinIO e mede, para cada forma de leitura,
+tempo, pico de memória Python (tracemalloc: bytes/BytesIO) e pico do pool
+de memória do Arrow.
+
+Uso:
+    python -m src.minio_client.benchmark_parquet_io [n_linhas]
+"""
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from io import BytesIO
+from src.minio_client.minio_utils import MinioClient
+from src.settings.settings import settings
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+BENCHMARK_OBJECT = "_benchmark/parquet_io.parquet"
+
+
+def make_synthetic_table(n_rows: int, seed: int = 42) -> pa.Table:
+    """Tabela no formato de ratings, com texto para pesar como a Bronze TMDB."""
+    rng = np.random.default_rng(seed)
+    return pa.table({
+        "userid": rng.integers(1, 300_000, n_rows, dtype=np.int32),
+        "movieid": rng.integers(1, 200_000, n_rows, dtype=np.int32),
+        "rating": rng.choice(np.arange(0.5, 5.5, 0.5), n_rows).astype(np.float32),
+        "timestamp": rng.integers(789_652_009, 1_700_000_000, n_rows, dtype=np.int64),
+        "overview": pa.array([f"overview {i % 5000} " * 8 for i in range(n_rows)]),
+    })
+
+
+def legacy_download(minio_client: MinioClient, bucket: str, object_name: str) -> pd.DataFrame:
+    """Caminho anterior do download_parquet: response.read() → BytesIO → pandas."""
+    response = minio_client.client.get_object(bucket, object_name)
+    try:
+        return pd.read_parquet(BytesIO(response.read()))
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def measure(label: str, fn):
+    """Executa fn medindo tempo, pico tracemalloc e pico do pool Arrow."""
+    pool = pa.default_memory_pool()
+    arrow_before = pool.bytes_allocated()
+    pool.release_unused()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = fn()
+
+    elapsed = time.perf_counter() - start
+    _, python_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_now = pool.bytes_allocated() - arrow_before
+
+    logger.info(
+        f"  {label:<42} {elapsed:6.2f}s | Python pico {python_peak / 1024 / 1024:8.1f} MB"
+        f" | Arrow retido {arrow_now / 1024 / 1024:8.1f} MB"
+    )
+    del result
+
+
+def run_benchmark(n_rows: int = 2_000_000):
+    minio_client = MinioClient(
+        endpoint=settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY
+    )
+    bucket = settings.BUCKET_BRONZE_MOVIELENS
+    minio_client.create_bucket(bucket)
+
+    logger.info(f"🧪 Gerando tabela sintética com {n_rows:,} linhas...")
+    # Ordenada por timestamp: as estatísticas dos row groups permitem pular grupos
+    table = make_synthetic_table(n_rows).sort_by("timestamp")
+    size = minio_client.write_table(bucket, BENCHMARK_OBJECT, table, row_group_size=250_000)
+    logger.info(f"📦 Objeto: {bucket}/{BENCHMARK_OBJECT} ({size / 1024 / 1024:.1f} MB)")
+    del table
+
+    try:
+        measure("antigo (bytes → BytesIO → pandas)",
+                lambda: legacy_download(minio_client, bucket, BENCHMARK_OBJECT))
+        measure("read_table → pandas",
+                lambda: minio_client.read_table(bucket, BENCHMARK_OBJECT, to_pandas=True))
+        measure("read_table (Arrow)",
+                lambda: minio_client.read_table(bucket, BENCHMARK_OBJECT))
+        measure("read_table 3 colunas (projeção)",
+                lambda: minio_client.read_table(bucket, BENCHMARK_OBJECT,
+                                                columns=["userid", "movieid", "rating"]))
+        measure("read_table projeção + filtro de row group",
+                lambda: minio_client.read_table(bucket, BENCHMARK_OBJECT,
+                                                columns=["movieid", "rating"],
+                                                filters=[("timestamp", ">=", 1_600_000_000)]))
+    finally:
+        minio_client.delete_object(bucket, BENCHMARK_OBJECT)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    run_benchmark(n)
@@ -1,20 +1,45 @@
 import json
+import time
 import pandas as pd
 import pyarrow as pa
+import pyarrow.csv as pacsv
 import pyarrow.parquet as pq
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from minio import Minio
 from minio.error import S3Error
 from io import BytesIO
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Iterable, Iterator, Tuple, Callable, Optional, Any
+from src.minio_client.streaming import ParquetStreamWriter
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Tipos explícitos dos CSVs do MovieLens (sem inferência, colunas compactas).
+# imdbId/tmdbId mantêm os tipos que o pandas inferia (int64/float64) para não
+# mudar o texto gravado em links_silver.
+MOVIELENS_CSV_TYPES = {
+    "movies.csv": {"movieId": pa.int32(), "title": pa.string(), "genres": pa.string()},
+    "ratings.csv": {"userId": pa.int32(), "movieId": pa.int32(), "rating": pa.float32(), "timestamp": pa.int64()},
+    "tags.csv": {"userId": pa.int32(), "movieId": pa.int32(), "tag": pa.string(), "timestamp": pa.int64()},
+    "links.csv": {"movieId": pa.int32(), "imdbId": pa.int64(), "tmdbId": pa.float64()},
+}
+
+# Arquivos com texto livre entre aspas que pode conter quebra de linha
+CSV_NEWLINES_IN_VALUES = {"tags.csv", "movies.csv"}
+
 
 class MinioClient:
     """Cliente para operações no MinIO."""
     
-    def __init__(self, endpoint: str, access_key: str, secret_key: str, secure: bool = False):
+    def __init__(
+        self,
+        endpoint: str,
+        access_key: str,
+        secret_key: str,
+        secure: bool = False,
+        max_pool_connections: int = 32
+    ):
         """
         Inicializa cliente MinIO.
         
@@ -23,13 +48,22 @@ class MinioClient:
             access_key: Access key do MinIO
             secret_key: Secret key do MinIO
             secure: Se True, usa HTTPS
+            max_pool_connections: Conexões no pool urllib3 compartilhado
+                (deve cobrir o max_workers de download_many)
         """
+        self.http_client = urllib3.PoolManager(
+            maxsize=max_pool_connections,
+            timeout=urllib3.Timeout(connect=10, read=300),
+            retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+        )
         self.client = Minio(
             endpoint=endpoint,
             access_key=access_key,
             secret_key=secret_key,
-            secure=secure
+            secure=secure,
+            http_client=self.http_client
         )
+        self.last_download_stats: Dict = {}
         logger.info(f"MinioClient conectado em {endpoint}")
     
     def create_bucket(self, bucket_name: str):
@@ -91,34 +125,51 @@ class MinioClient:
             else:
                 raise ValueError(f"Tipo não suportado: {type(data)}")
             
-            # Converter para Parquet em memória
-            buffer = BytesIO()
-            df.to_parquet(
-                buffer,
-                engine='pyarrow',
-                compression='snappy',
-                index=False
-            )
-            
-            # Voltar para o início do buffer
-            buffer.seek(0)
-            parquet_size = buffer.getbuffer().nbytes
-            
-            # Upload para MinIO
-            self.client.put_object(
-                bucket_name=bucket,
-                object_name=object_name,
-                data=buffer,
-                length=parquet_size,
-                content_type="application/octet-stream"
-            )
-            
-            logger.debug(f"Upload Parquet concluido: {bucket}/{object_name} ({parquet_size} bytes)")
+            self.write_table(bucket, object_name, pa.Table.from_pandas(df, preserve_index=False))
         
         except Exception as e:
             logger.error(f"Erro no upload Parquet para {bucket}/{object_name}: {e}")
             raise
     
+    def write_table(
+        self,
+        bucket: str,
+        object_name: str,
+        table: pa.Table,
+        compression: str = 'snappy',
+        row_group_size: Optional[int] = None
+    ) -> int:
+        """
+        Faz upload de uma pyarrow.Table como Parquet, sem passar por pandas.
+        
+        O Parquet é escrito num buffer Arrow e enviado direto dele
+        (sem cópia para BytesIO).
+        
+        Args:
+            bucket: Nome do bucket
+            object_name: Caminho do objeto
+            table: Tabela Arrow
+            compression: Codec do Parquet
+            row_group_size: Linhas por row group (permite filtros por row group na leitura)
+            
+        Returns:
+            Tamanho do objeto em bytes
+        """
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink, compression=compression, row_group_size=row_group_size)
+        buffer = sink.getvalue()
+        
+        self.client.put_object(
+            bucket_name=bucket,
+            object_name=object_name,
+            data=pa.BufferReader(buffer),
+            length=buffer.size,
+            content_type="application/octet-stream"
+        )
+        
+        logger.debug(f"Upload Parquet concluido: {bucket}/{object_name} ({buffer.size} bytes)")
+        return buffer.size
+    
     def download_json(self, bucket: str, object_name: str) -> Union[Dict, List]:
         """
         Faz download de JSON do MinIO.
@@ -144,6 +195,89 @@ class MinioClient:
             response.close()
             response.release_conn()
     
+    def open_parquet_writer(
+        self,
+        bucket: str,
+        object_name: str,
+        schema: pa.Schema,
+        part_size: int = 64 * 1024 * 1024,
+        num_parallel_uploads: int = 4,
+        compression: str = 'snappy'
+    ) -> ParquetStreamWriter:
+        """
+        Abre um writer Parquet em streaming (multipart): cada write() vira
+        row group(s) enviados em partes paralelas enquanto os próximos ainda
+        são codificados. O objeto pode ser maior que a memória disponível.
+        
+        Args:
+            bucket: Nome do bucket
+            object_name: Caminho do objeto
+            schema: Schema Arrow do arquivo
+            part_size: Tamanho de cada parte do multipart (mínimo 5 MB)
+            num_parallel_uploads: Partes enviadas em paralelo
+            compression: Codec do Parquet
+        """
+        return ParquetStreamWriter(
+            self.client,
+            bucket,
+            object_name,
+            schema,
+            part_size=part_size,
+            num_parallel_uploads=num_parallel_uploads,
+            compression=compression
+        )
+    
+    def _read_object_buffer(self, bucket: str, object_name: str) -> pa.Buffer:
+        """
+        Lê o corpo do objeto direto num buffer pré-alocado (readinto) e o
+        expõe ao Arrow pelo buffer protocol, sem bytes intermediários.
+        """
+        response = self.client.get_object(bucket, object_name)
+        try:
+            length = response.headers.get('Content-Length')
+            if length is None:
+                return pa.py_buffer(response.read())
+            
+            data = bytearray(int(length))
+            view = memoryview(data)
+            offset = 0
+            while offset < len(data):
+                read = response.readinto(view[offset:])
+                if not read:
+                    raise IOError(f"Resposta truncada: {offset}/{len(data)} bytes de {bucket}/{object_name}")
+                offset += read
+            return pa.py_buffer(data)
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def read_table(
+        self,
+        bucket: str,
+        object_name: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List] = None,
+        to_pandas: bool = False
+    ) -> Union[pa.Table, pd.DataFrame]:
+        """
+        Faz download de Parquet como pyarrow.Table.
+        
+        Args:
+            bucket: Nome do bucket
+            object_name: Caminho do objeto
+            columns: Colunas a ler (projeção; as demais não são decodificadas)
+            filters: Filtros no formato do pyarrow (ex: [('year', '>=', 2010)]);
+                row groups cujas estatísticas não batem são pulados
+            to_pandas: Se True, retorna DataFrame
+            
+        Returns:
+            pyarrow.Table (ou DataFrame se to_pandas=True)
+        """
+        buffer = self._read_object_buffer(bucket, object_name)
+        table = pq.read_table(pa.BufferReader(buffer), columns=columns, filters=filters)
+        logger.debug(f"Download Parquet concluido: {bucket}/{object_name} ({buffer.size} bytes)")
+        return table.to_pandas() if to_pandas else table
+    
     def download_parquet(self, bucket: str, object_name: str) -> pd.DataFrame:
         """
         Faz download de Parquet do MinIO.
@@ -156,19 +290,218 @@ class MinioClient:
             DataFrame com os dados
         """
         try:
-            response = self.client.get_object(bucket, object_name)
-            df = pd.read_parquet(BytesIO(response.read()))
-            logger.debug(f"Download Parquet concluido: {bucket}/{object_name}")
-            return df
+            return self.read_table(bucket, object_name, to_pandas=True)
         
         except S3Error as e:
             logger.error(f"Erro no download Parquet de {bucket}/{object_name}: {e}")
             return pd.DataFrame()
+    
+    def _download_with_retry(
+        self, bucket: str, object_name: str, retries: int, parser: Optional[Callable[[pa.Buffer], Any]]
+    ) -> Tuple[str, Any, int, float]:
+        """Baixa um objeto com retry/backoff; NoSuchKey não é repetido."""
+        for attempt in range(1, retries + 1):
+            start = time.perf_counter()
+            try:
+                data = self._read_object_buffer(bucket, object_name)
+                latency = time.perf_counter() - start
+                return object_name, (parser(data) if parser else data), len(data), latency
+            except S3Error as e:
+                if e.code == "NoSuchKey" or attempt == retries:
+                    raise
+            except Exception:
+                if attempt == retries:
+                    raise
+            time.sleep(0.5 * 2 ** (attempt - 1))
+    
+    def download_many(
+        self,
+        bucket: str,
+        keys: Iterable[str],
+        max_workers: int = 8,
+        retries: int = 3,
+        parser: Optional[Callable[[pa.Buffer], Any]] = None,
+        max_in_flight: Optional[int] = None,
+        ordered: bool = False
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Baixa vários objetos em paralelo (pool urllib3 compartilhado) e gera
+        (object_name, dados) na ordem em que terminam, ou na ordem de `keys`
+        com ordered=True.
+        
+        Objetos que falharem após `retries` tentativas geram (object_name, None).
+        Ao final, self.last_download_stats traz bytes/s e latência por objeto.
+        
+        Args:
+            bucket: Nome do bucket
+            keys: Caminhos dos objetos
+            max_workers: Downloads simultâneos
+            retries: Tentativas por objeto
+            parser: Função aplicada ao pa.Buffer do objeto na thread de
+                download (ex: ler Parquet); sem parser, gera o próprio buffer
+            max_in_flight: Máximo de objetos baixados e ainda não consumidos
+                (padrão: 2 x max_workers), limita a memória
+            ordered: Gera na ordem de `keys` (um objeto lento segura os
+                seguintes, que continuam baixando até max_in_flight)
+        """
+        max_in_flight = max_in_flight or 2 * max_workers
+        keys = iter(keys)
+        latencies = []
+        total_bytes = 0
+        failed = 0
+        start = time.perf_counter()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = {}
+            
+            def submit_next():
+                for key in keys:
+                    future = pool.submit(self._download_with_retry, bucket, key, retries, parser)
+                    pending[future] = key
+                    return True
+                return False
+            
+            def next_done():
+                if ordered:
+                    return [next(iter(pending))]
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                return done
+            
+            while len(pending) < max_in_flight and submit_next():
+                pass
+            
+            while pending:
+                for future in next_done():
+                    key = pending.pop(future)
+                    submit_next()
+                    try:
+                        object_name, data, nbytes, latency = future.result()
+                    except Exception as e:
+                        logger.error(f"Erro no download de {bucket}/{key}: {e}")
+                        failed += 1
+                        yield key, None
+                        continue
+                    
+                    total_bytes += nbytes
+                    latencies.append(latency)
+                    yield object_name, data
+        
+        elapsed = time.perf_counter() - start
+        lat = pd.Series(latencies, dtype='float64')
+        self.last_download_stats = {
+            "objects": len(latencies),
+            "failed": failed,
+            "bytes": total_bytes,
+            "seconds": round(elapsed, 3),
+            "mb_per_s": round(total_bytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_p50_ms": round(float(lat.quantile(0.5)) * 1000, 1) if len(lat) else None,
+            "latency_p95_ms": round(float(lat.quantile(0.95)) * 1000, 1) if len(lat) else None,
+            "latency_max_ms": round(float(lat.max()) * 1000, 1) if len(lat) else None
+        }
+        logger.info(f"download_many {bucket}: {self.last_download_stats}")
+    
+    def _csv_options(self, object_name: str, column_types: Optional[Dict], block_size: int):
+        file_name = object_name.rsplit("/", 1)[-1]
+        if column_types is None:
+            column_types = MOVIELENS_CSV_TYPES.get(file_name, {})
+        read_options = pacsv.ReadOptions(use_threads=True, block_size=block_size)
+        parse_options = pacsv.ParseOptions(newlines_in_values=file_name in CSV_NEWLINES_IN_VALUES)
+        convert_options = pacsv.ConvertOptions(column_types=column_types)
+        return read_options, parse_options, convert_options
+    
+    def _iter_csv_chunks(
+        self,
+        bucket: str,
+        object_name: str,
+        chunksize: int,
+        column_types: Optional[Dict],
+        as_arrow: bool,
+        block_size: int
+    ) -> Iterator[Union[pd.DataFrame, pa.Table]]:
+        """Lê o corpo do objeto em blocos e gera chunks de exatamente chunksize linhas."""
+        response = self.client.get_object(bucket, object_name)
+        try:
+            reader = pacsv.open_csv(
+                response, *self._csv_options(object_name, column_types, block_size)
+            )
+            pending = []
+            pending_rows = 0
+            for batch in reader:
+                pending.append(batch)
+                pending_rows += batch.num_rows
+                while pending_rows >= chunksize:
+                    table = pa.Table.from_batches(pending)
+                    chunk = table.slice(0, chunksize)
+                    rest = table.slice(chunksize)
+                    pending = rest.to_batches() if rest.num_rows else []
+                    pending_rows = rest.num_rows
+                    yield chunk if as_arrow else chunk.to_pandas()
+            
+            if pending_rows:
+                chunk = pa.Table.from_batches(pending)
+                yield chunk if as_arrow else chunk.to_pandas()
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def download_csv(
+        self,
+        bucket: str,
+        object_name: str,
+        chunksize: Optional[int] = None,
+        column_types: Optional[Dict] = None,
+        as_arrow: bool = False,
+        block_size: int = 16 * 1024 * 1024
+    ) -> Union[pd.DataFrame, pa.Table, Iterator[Union[pd.DataFrame, pa.Table]]]:
+        """
+        Faz download de CSV do MinIO com o leitor CSV multithread do Arrow.
+        
+        O corpo é lido em blocos de block_size direto do stream da resposta
+        (nunca bufferizado por inteiro quando chunksize é informado).
+        
+        Args:
+            bucket: Nome do bucket
+            object_name: Caminho do objeto
+            chunksize: Se informado, retorna um iterador de chunks com esse
+                número de linhas (como pd.read_csv(chunksize=...))
+            column_types: Tipos Arrow por coluna; padrão são os tipos
+                explícitos do MovieLens (MOVIELENS_CSV_TYPES) pelo nome do arquivo
+            as_arrow: Se True, gera pyarrow.Table em vez de DataFrame
+            block_size: Bytes lidos/parseados por bloco
+            
+        Returns:
+            DataFrame/Table com o arquivo inteiro, ou iterador de chunks
+        """
+        if chunksize:
+            return self._iter_csv_chunks(bucket, object_name, chunksize, column_types, as_arrow, block_size)
         
+        response = self.client.get_object(bucket, object_name)
+        try:
+            table = pacsv.read_csv(
+                response, *self._csv_options(object_name, column_types, block_size)
+            )
+            logger.debug(f"Download CSV concluido: {bucket}/{object_name} ({table.num_rows} linhas)")
+            return table if as_arrow else table.to_pandas()
         finally:
             response.close()
             response.release_conn()
     
+    def list_files(self, bucket: str, prefix: str = "") -> List[str]:
+        """
+        Lista os arquivos no nível do prefixo (sem "pastas").
+        
+        Args:
+            bucket: Nome do bucket
+            prefix: Prefixo para filtrar objetos
+            
+        Returns:
+            Nomes dos arquivos (ex: ['movies.csv', 'ratings.csv'])
+        """
+        return [
+            name for name in self.list_objects(bucket, prefix=prefix, recursive=False)
+            if not name.endswith("/")
+        ]
+    
     def list_objects(self, bucket: str, prefix: str = "", recursive: bool = True) -> List[str]:
         """
         Lista objetos em um bucket.
@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+from typing import Optional, Union
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # mínimo do S3/MinIO para partes de multipart
+
+
+class PipeStream:
+    """
+    Pipe em memória entre o encoder Parquet (write) e o upload (read).
+
+    Limitado a max_bytes: o encoder bloqueia quando o upload fica para trás,
+    então a memória não cresce com o tamanho do objeto.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.buffered = 0
+        self.position = 0
+        self.closed = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    # Lado do encoder (pyarrow chama write/tell/flush/close)
+    def write(self, data) -> int:
+        data = bytes(data)
+        with self.cond:
+            while self.buffered > 0 and self.buffered + len(data) > self.max_bytes and self.error is None:
+                self.cond.wait()
+            if self.error is not None:
+                raise IOError(f"Upload interrompido: {self.error}")
+            self.chunks.append(data)
+            self.buffered += len(data)
+            self.position += len(data)
+            self.cond.notify_all()
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def abort(self, error: BaseException):
+        """Interrompe os dois lados (o upload falha e aborta o multipart)."""
+        with self.cond:
+            self.error = error
+            self.cond.notify_all()
+
+    # Lado do upload (minio lê partes com read(size))
+    def read(self, size: int = -1) -> bytes:
+        with self.cond:
+            while not self.chunks and not self.closed and self.error is None:
+                self.cond.wait()
+            if self.error is not None:
+                raise IOError(f"Escrita interrompida: {self.error}")
+
+            out = []
+            remaining = size if size and size > 0 else self.buffered
+            while self.chunks and remaining > 0:
+                chunk = self.chunks.popleft()
+                if len(chunk) > remaining:
+                    self.chunks.appendleft(chunk[remaining:])
+                    chunk = chunk[:remaining]
+                out.append(chunk)
+                remaining -= len(chunk)
+                self.buffered -= len(chunk)
+            self.cond.notify_all()
+            return b"".join(out)
+
+
+class ParquetStreamWriter:
+    """
+    Escreve um Parquet grande direto no MinIO via upload multipart.
+
+    Cada write() codifica um row group no pipe; uma thread de upload lê o
+    pipe em partes de part_size e o minio envia até num_parallel_uploads
+    partes em paralelo enquanto os próximos row groups ainda são codificados.
+    Memória ~ (num_parallel_uploads + 1) x part_size, independente do objeto.
+
+    Uso:
+        with minio_client.open_parquet_writer(bucket, "ratings/ratings.parquet", schema) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(
+        self,
+        client,
+        bucket: str,
+        object_name: str,
+        schema: pa.Schema,
+        part_size: int = 64 * 1024 * 1024,
+        num_parallel_uploads: int = 4,
+        compression: str = 'snappy'
+    ):
+        self.bucket = bucket
+        self.object_name = object_name
+        self.schema = schema
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.rows = 0
+        self.result = None
+        self.upload_error: Optional[BaseException] = None
+        self.start = time.perf_counter()
+
+        self.pipe = PipeStream(max_bytes=self.part_size)
+        self.writer = pq.ParquetWriter(self.pipe, schema, compression=compression)
+        self.upload_thread = threading.Thread(
+            target=self._upload,
+            args=(client, num_parallel_uploads),
+            name=f"upload-{object_name}",
+            daemon=True
+        )
+        self.upload_thread.start()
+
+    def _upload(self, client, num_parallel_uploads: int):
+        try:
+            self.result = client.put_object(
+                bucket_name=self.bucket,
+                object_name=self.object_name,
+                data=self.pipe,
+                length=-1,
+                part_size=self.part_size,
+                num_parallel_uploads=num_parallel_uploads,
+                content_type="application/octet-stream"
+            )
+        except BaseException as e:
+            self.upload_error = e
+            self.pipe.abort(e)
+
+    def write(self, data: Union[pa.Table, pa.RecordBatch, pd.DataFrame]):
+        """Codifica um bloco de linhas como row group(s) e envia ao pipe."""
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, schema=self.schema, preserve_index=False)
+        elif isinstance(data, pa.RecordBatch):
+            data = pa.Table.from_batches([data])
+        self.writer.write_table(data)
+        self.rows += data.num_rows
+
+    def close(self) -> int:
+        """Escreve o footer, espera o upload terminar e retorna os bytes enviados."""
+        self.writer.close()
+        self.pipe.close()
+        self.upload_thread.join()
+        if self.upload_error is not None:
+            raise self.upload_error
+
+        elapsed = time.perf_counter() - self.start
+        size = self.pipe.position
+        logger.info(
+            f"Upload multipart concluido: {self.bucket}/{self.object_name} "
+            f"({self.rows:,} linhas, {size / 1024 / 1024:.1f} MB, "
+            f"{size / 1024 / 1024 / elapsed:.1f} MB/s)"
+        )
+        return size
+
+    def abort(self, error: BaseException):
+        """Cancela a escrita; o minio aborta o multipart upload pendente."""
+        self.pipe.abort(error)
+        self.upload_thread.join()
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        logger.error(f"Upload multipart cancelado: {self.bucket}/{self.object_name}: {error}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.abort(exc)
+            return False
+        self.close()
+        return False
@@ -0,0 +1,290 @@
+"""
+Bronze MovieLens: conversão única CSV → Parquet particionado por ano.
+
+ratings.csv e tags.csv (bucket dataflixraw) viram Parquet comprimido em
+BUCKET_BRONZE_MOVIELENS, um objeto por ano do timestamp (UTC), com tipos
+compactos (ids int32, rating float32):
+
+    bronze-movielens/ratings/year=2015/data.parquet
+    bronze-movielens/ratings/_manifest.json
+
+Linhas sem timestamp (sem ano) ficam fora da Bronze e são contadas no
+manifest (dropped_null_timestamp). O manifest guarda o ETag do CSV de
+origem: a conversão só é refeita quando o CSV muda. Silver lê essa cópia colunar com projeção, sem parse de texto.
+"""
+import json
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+import pyarrow as pa
+import pyarrow.compute as pc
+from minio.error import S3Error
+from src.minio_client.minio_utils import MinioClient
+from src.settings.settings import settings
+
+BUCKET_RAW = "dataflixraw"
+
+BRONZE_SCHEMAS = {
+    "ratings": pa.schema([
+        ("userId", pa.int32()),
+        ("movieId", pa.int32()),
+        ("rating", pa.float32()),
+        ("timestamp", pa.int64()),
+    ]),
+    "tags": pa.schema([
+        ("userId", pa.int32()),
+        ("movieId", pa.int32()),
+        ("tag", pa.string()),
+        ("timestamp", pa.int64()),
+    ]),
+}
+
+# CSV de origem → dataset Bronze
+BRONZE_DATASETS = {"ratings.csv": "ratings", "tags.csv": "tags"}
+
+
+def get_minio_client() -> MinioClient:
+    return MinioClient(
+        endpoint=settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY
+    )
+
+
+def year_object_name(dataset: str, year: int) -> str:
+    return f"{dataset}/year={year}/data.parquet"
+
+
+def load_manifest(minio_client: MinioClient, dataset: str) -> Optional[Dict]:
+    """Manifest da última conversão (None se o dataset ainda não existe)."""
+    try:
+        response = minio_client.client.get_object(
+            settings.BUCKET_BRONZE_MOVIELENS, f"{dataset}/_manifest.json"
+        )
+    except S3Error:
+        return None
+    try:
+        return json.loads(response.read().decode("utf-8"))
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def source_etag(minio_client: MinioClient, csv_file: str) -> Optional[str]:
+    try:
+        return minio_client.client.stat_object(BUCKET_RAW, csv_file).etag
+    except S3Error:
+        return None
+
+
+def needs_conversion(minio_client: MinioClient, csv_file: str) -> bool:
+    """True se não há Bronze Parquet ou se o CSV mudou desde a conversão."""
+    manifest = load_manifest(minio_client, BRONZE_DATASETS[csv_file])
+    if manifest is None:
+        return True
+    etag = source_etag(minio_client, csv_file)
+    return etag is not None and etag != manifest.get("source_etag")
+
+
+def epoch_years(timestamps: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Ano UTC de cada timestamp em epoch (segundos)."""
+    return pc.year(pc.cast(timestamps, pa.timestamp("s")))
+
+
+def convert_csv_to_parquet(
+    minio_client: MinioClient,
+    csv_file: str,
+    chunksize: int = 1_000_000,
+    row_group_rows: int = 500_000
+) -> Dict:
+    """
+    Converte um CSV do MovieLens em Parquet particionado por ano.
+
+    Duas passadas com memória limitada: o CSV é lido em streaming e as
+    linhas de cada ano vão para um arquivo Arrow IPC local (zstd) por ano;
+    depois cada ano é enviado em sequência por um único writer multipart,
+    em row groups de row_group_rows. Os ratings vêm ordenados por usuário,
+    não por data, então gravar direto exigiria um writer aberto por ano.
+
+    Args:
+        minio_client: Cliente MinIO
+        csv_file: 'ratings.csv' ou 'tags.csv'
+        chunksize: Linhas por chunk lido do CSV
+        row_group_rows: Linhas por row group em cada ano
+
+    Returns:
+        Manifest gravado (linhas por ano, linhas descartadas, ETag de origem)
+    """
+    dataset = BRONZE_DATASETS[csv_file]
+    schema = BRONZE_SCHEMAS[dataset]
+    bucket = settings.BUCKET_BRONZE_MOVIELENS
+    minio_client.create_bucket(bucket)
+
+    print(f"🧱 Convertendo {csv_file} → {bucket}/{dataset}/ (Parquet por ano)...")
+
+    # Remove partições antigas (o conjunto de anos pode mudar)
+    for object_name in minio_client.list_objects(bucket, prefix=f"{dataset}/"):
+        minio_client.delete_object(bucket, object_name)
+
+    rows_per_year: Dict[int, int] = {}
+    null_timestamp_rows = 0
+    spill_options = pa.ipc.IpcWriteOptions(compression="zstd")
+
+    with tempfile.TemporaryDirectory(prefix=f"bronze_{dataset}_") as spill_dir:
+        def spill_path(year):
+            return os.path.join(spill_dir, f"{year}.arrow")
+
+        # 1ª passada: CSV → um arquivo IPC local por ano
+        spills = {}
+        try:
+            chunks = minio_client.download_csv(BUCKET_RAW, csv_file, chunksize=chunksize, as_arrow=True)
+            for chunk_num, chunk in enumerate(chunks, 1):
+                chunk = chunk.select(schema.names).cast(schema)
+                years = epoch_years(chunk.column("timestamp"))
+                null_timestamp_rows += years.null_count
+
+                for year in pc.unique(years).to_pylist():
+                    if year is None:
+                        continue
+                    part = chunk.filter(pc.equal(years, year))
+                    if year not in spills:
+                        spills[year] = pa.ipc.new_stream(spill_path(year), schema, options=spill_options)
+                        rows_per_year[year] = 0
+                    spills[year].write_table(part)
+                    rows_per_year[year] += part.num_rows
+
+                if chunk_num % 10 == 0:
+                    print(f"  - {chunk_num * chunksize:,} linhas lidas...")
+        finally:
+            for spill in spills.values():
+                spill.close()
+
+        # 2ª passada: um ano por vez, um writer multipart aberto
+        for year in sorted(rows_per_year):
+            writer = minio_client.open_parquet_writer(
+                bucket, year_object_name(dataset, year), schema,
+                part_size=8 * 1024 * 1024, num_parallel_uploads=2, compression="zstd"
+            )
+            try:
+                with pa.memory_map(spill_path(year)) as source:
+                    buffered, buffered_rows = [], 0
+                    for batch in pa.ipc.open_stream(source):
+                        buffered.append(batch)
+                        buffered_rows += batch.num_rows
+                        if buffered_rows >= row_group_rows:
+                            writer.write(pa.Table.from_batches(buffered, schema=schema))
+                            buffered, buffered_rows = [], 0
+                    if buffered:
+                        writer.write(pa.Table.from_batches(buffered, schema=schema))
+                writer.close()
+            except Exception as e:
+                writer.abort(e)
+                raise
+            os.remove(spill_path(year))
+
+    if null_timestamp_rows:
+        print(f"  ⚠️  {null_timestamp_rows:,} linhas sem timestamp descartadas (sem ano para particionar)")
+
+    manifest = {
+        "source": f"{BUCKET_RAW}/{csv_file}",
+        "source_etag": source_etag(minio_client, csv_file),
+        "converted_at": datetime.now().isoformat(),
+        "schema": {field.name: str(field.type) for field in schema},
+        "rows_per_year": {str(year): rows for year, rows in sorted(rows_per_year.items())},
+        "total_rows": sum(rows_per_year.values()),
+        "dropped_null_timestamp": null_timestamp_rows
+    }
+    minio_client.upload_json(bucket, f"{dataset}/_manifest.json", manifest)
+    print(f"  ✅ {manifest['total_rows']:,} linhas em {len(rows_per_year)} partições anuais")
+    return manifest
+
+
+def ensure_bronze_parquet(minio_client: MinioClient, csv_file: str, force: bool = False) -> Optional[Dict]:
+    """
+    Garante a cópia Parquet de um CSV: converte se faltar ou estiver
+    desatualizada. Retorna o manifest (None se não há CSV nem Parquet).
+    """
+    if force or needs_conversion(minio_client, csv_file):
+        if source_etag(minio_client, csv_file) is None:
+            return load_manifest(minio_client, BRONZE_DATASETS[csv_file])
+        return convert_csv_to_parquet(minio_client, csv_file)
+    return load_manifest(minio_client, BRONZE_DATASETS[csv_file])
+
+
+def iter_bronze_chunks(
+    minio_client: MinioClient,
+    dataset: str,
+    chunksize: int,
+    columns: Optional[List[str]] = None,
+    years: Optional[List[int]] = None,
+    prefetch: int = 2
+) -> Iterator:
+    """
+    Lê a Bronze Parquet em chunks de exatamente chunksize linhas (DataFrames).
+
+    Os anos são lidos em ordem (a numeração dos chunks é estável entre
+    execuções, o que o ledger do modo paralelo exige), com os próximos
+    `prefetch` anos baixando em segundo plano. Só as colunas pedidas são
+    decodificadas.
+
+    Args:
+        minio_client: Cliente MinIO
+        dataset: 'ratings' ou 'tags'
+        chunksize: Linhas por chunk
+        columns: Projeção (padrão: todas as colunas do schema Bronze)
+        years: Restringe a esses anos (padrão: todos)
+        prefetch: Anos baixados antecipadamente
+    """
+    bucket = settings.BUCKET_BRONZE_MOVIELENS
+    manifest = load_manifest(minio_client, dataset) or {"rows_per_year": {}}
+    selected = sorted(int(year) for year in manifest["rows_per_year"])
+    if years is not None:
+        selected = [year for year in selected if year in set(years)]
+    columns = columns or BRONZE_SCHEMAS[dataset].names
+
+    def read_year(year):
+        return minio_client.read_table(bucket, year_object_name(dataset, year), columns=columns)
+
+    pending_batches = []
+    pending_rows = 0
+    with ThreadPoolExecutor(max_workers=prefetch) as pool:
+        queue = deque(pool.submit(read_year, year) for year in selected[:prefetch])
+        next_years = iter(selected[prefetch:])
+
+        while queue:
+            table = queue.popleft().result()
+            next_year = next(next_years, None)
+            if next_year is not None:
+                queue.append(pool.submit(read_year, next_year))
+
+            pending_batches.extend(table.to_batches())
+            pending_rows += table.num_rows
+            while pending_rows >= chunksize:
+                merged = pa.Table.from_batches(pending_batches)
+                rest = merged.slice(chunksize)
+                pending_batches = rest.to_batches()
+                pending_rows = rest.num_rows
+                yield merged.slice(0, chunksize).to_pandas()
+
+    if pending_rows:
+        yield pa.Table.from_batches(pending_batches).to_pandas()
+
+
+def run_bronze_conversion(force: bool = False):
+    """Converte ratings.csv e tags.csv para a Bronze Parquet."""
+    print("\n=== Bronze MovieLens: CSV → Parquet ===\n")
+    minio_client = get_minio_client()
+    for csv_file in BRONZE_DATASETS:
+        if not force and not needs_conversion(minio_client, csv_file):
+            print(f"✓ {csv_file}: Bronze Parquet já atualizada")
+            continue
+        convert_csv_to_parquet(minio_client, csv_file)
+    print("=== Conversão concluída ===\n")
+
+
+if __name__ == "__main__":
+    import sys
+    run_bronze_conversion(force="--force" in sys.argv)
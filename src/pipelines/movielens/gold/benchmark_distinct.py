@@ -0,0 +1,95 @@
+"""
+Benchmark: COUNT(DISTINCT) exato vs estimativas HyperLogLog do estado Gold.
+
+Mede o tempo das contagens distintas exatas sobre ratings_silver (por filme,
+por ano e por gênero) e o das estimativas a partir dos sketches salvos em
+gold.state_* (incluindo a união por gênero, sem ler ratings), e reporta o
+erro relativo das estimativas.
+
+Uso:
+    python benchmark_distinct.py [erro_padrao]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import pandas as pd
+from settings.db import get_connection
+from gold.incremental_gold import distinct_by_group, load_stats_from_state, refresh_gold_facts_incremental
+from gold.sketches import HyperLogLog, precision_for_error
+
+EXACT_QUERIES = {
+    "filme": """
+        SELECT movieid as key, COUNT(DISTINCT userid) as exact
+        FROM silver.ratings_silver GROUP BY movieid
+    """,
+    "ano": """
+        SELECT EXTRACT(YEAR FROM TO_TIMESTAMP(timestamp))::int as key,
+               COUNT(DISTINCT userid) as exact
+        FROM silver.ratings_silver GROUP BY 1
+    """,
+    "gênero": """
+        SELECT mg.genre_id as key, COUNT(DISTINCT r.userid) as exact
+        FROM silver.movie_genres_silver mg
+        JOIN silver.ratings_silver r ON r.movieid = mg.movieid
+        GROUP BY mg.genre_id
+    """,
+}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def report_errors(label, exact, estimate, exact_seconds, approx_seconds):
+    """Erro relativo (médio, p95, máximo) das estimativas de um nível."""
+    df = exact.merge(estimate, on="key")
+    error = (df["estimate"] - df["exact"]).abs() / df["exact"].clip(lower=1)
+    print(
+        f"  {label:<7} {len(df):>7,} grupos | exato {exact_seconds:7.1f}s | HLL {approx_seconds:6.2f}s"
+        f" | erro médio {error.mean():6.2%} p95 {error.quantile(0.95):6.2%} máx {error.max():6.2%}"
+    )
+
+
+def run_benchmark(error=0.023):
+    precision = precision_for_error(error)
+    hll = HyperLogLog(precision)
+    print(f"\n🧪 Benchmark de contagens distintas (precisão {precision}, erro padrão ±{hll.relative_error:.1%})\n")
+
+    # Garante o estado atualizado (na primeira vez, reconstrói a partir de todos os ratings)
+    _, state_seconds = timed(lambda: refresh_gold_facts_incremental(precision=precision))
+    print(f"  ⏱️  Atualização do estado: {state_seconds:.1f}s\n")
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TIME ZONE 'UTC'")
+
+        exact = {}
+        for label, query in EXACT_QUERIES.items():
+            exact[label] = timed(lambda query=query: pd.read_sql(query, conn))
+
+        (df_movies, df_years), stats_seconds = timed(lambda: load_stats_from_state(conn, hll))
+        bridge = pd.read_sql(
+            "SELECT movieid, genre_id as group FROM silver.movie_genres_silver", conn
+        )
+        df_genres, genre_seconds = timed(lambda: distinct_by_group(conn, hll, bridge))
+    finally:
+        conn.close()
+
+    estimates = {
+        "filme": (df_movies.rename(columns={"movieid": "key", "total_users": "estimate"}), stats_seconds),
+        "ano": (df_years.rename(columns={"rating_year": "key", "active_users": "estimate"}), stats_seconds),
+        "gênero": (df_genres.rename(columns={"group": "key", "distinct_estimate": "estimate"}), genre_seconds),
+    }
+    for label, (df_exact, exact_seconds) in exact.items():
+        df_estimate, approx_seconds = estimates[label]
+        report_errors(label, df_exact, df_estimate[["key", "estimate"]], exact_seconds, approx_seconds)
+    print()
+
+
+if __name__ == "__main__":
+    run_benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 0.023)
@@ -0,0 +1,513 @@
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from settings.db import get_connection, copy_dataframe, merge_dataframe, align_integer_columns
+from gold.sketches import DEFAULT_PRECISION, HyperLogLog
+from gold.rollups import round_half_up
+from gold.transformations_gold import FACT_MOVIE_RATINGS_COLUMNS, FACT_RATINGS_BY_YEAR_COLUMNS
+
+WATERMARK_NAME = "fact_ratings"
+
+# Janela relida abaixo do high-water mark: ratings que chegam atrasados (ou
+# no mesmo segundo do high-water mark) dentro dela ainda são incorporados
+DEFAULT_OVERLAP_SECONDS = 7 * 24 * 3600
+
+# Estado mergeável por filme e por ano: somas simples + sketches HLL (BYTEA)
+CREATE_STATE_TABLES = """
+CREATE TABLE IF NOT EXISTS gold.state_movie_ratings (
+    movieid INTEGER PRIMARY KEY,
+    total_ratings BIGINT NOT NULL,
+    sum_rating DOUBLE PRECISION NOT NULL,
+    sumsq_rating DOUBLE PRECISION NOT NULL,
+    min_rating NUMERIC(2,1),
+    max_rating NUMERIC(2,1),
+    users_sketch BYTEA NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS gold.state_ratings_by_year (
+    rating_year INTEGER PRIMARY KEY,
+    total_ratings BIGINT NOT NULL,
+    sum_rating DOUBLE PRECISION NOT NULL,
+    sumsq_rating DOUBLE PRECISION NOT NULL,
+    min_rating NUMERIC(2,1),
+    max_rating NUMERIC(2,1),
+    users_sketch BYTEA NOT NULL,
+    movies_sketch BYTEA NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS gold.state_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    high_water_mark BIGINT NOT NULL,
+    sketch_precision SMALLINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Chaves já incorporadas dentro da janela de sobreposição (dedup da releitura)
+CREATE TABLE IF NOT EXISTS gold.state_recent_ratings (
+    userid INTEGER NOT NULL,
+    movieid INTEGER NOT NULL,
+    timestamp BIGINT NOT NULL,
+    PRIMARY KEY (userid, movieid, timestamp)
+);
+"""
+
+NUMERIC_STATE_COLUMNS = ["total_ratings", "sum_rating", "sumsq_rating", "min_rating", "max_rating"]
+
+# Colunas de contagem distinta nas tabelas Gold (exatas ou estimativas HLL)
+DISTINCT_COLUMNS = {
+    "gold.fact_movie_ratings": ["total_users"],
+    "gold.fact_ratings_by_year": ["active_users", "movies_rated"],
+    "gold.dim_movies": ["total_users"],
+}
+
+
+class RunningStats:
+    """
+    Estado mergeável por chave (filme ou ano): contagem, soma, soma dos
+    quadrados, mínimo, máximo e um sketch HLL por coluna distinta.
+
+    fold() incorpora um chunk de ratings; merge_state() incorpora o estado
+    já salvo das mesmas chaves. Nenhuma operação depende da ordem.
+    """
+
+    def __init__(self, key_name, hll, sketch_columns):
+        """
+        Args:
+            key_name: Coluna de agrupamento ('movieid' ou 'rating_year')
+            hll: HyperLogLog usado em todos os sketches
+            sketch_columns: {nome do sketch: coluna contada}, ex: {'users': 'userid'}
+        """
+        self.key_name = key_name
+        self.hll = hll
+        self.sketch_columns = sketch_columns
+        self.keys = pd.Index([], dtype="int64")
+        self.partials = []
+        self.sketches = {name: hll.empty(0) for name in sketch_columns}
+
+    def _positions(self, keys):
+        """Linha de cada chave na matriz de sketches (cria as que faltam)."""
+        new_keys = pd.Index(pd.unique(np.asarray(keys, dtype=np.int64))).difference(self.keys)
+        if len(new_keys):
+            self.keys = self.keys.append(new_keys)
+            capacity = len(next(iter(self.sketches.values())))
+            if len(self.keys) > capacity:
+                grow = max(len(self.keys), 2 * capacity) - capacity
+                for name in self.sketches:
+                    self.sketches[name] = np.vstack([self.sketches[name], self.hll.empty(grow)])
+        return self.keys.get_indexer(keys)
+
+    def fold(self, df):
+        """Incorpora um chunk (userid, movieid, rating, rating_sq, rating_year)."""
+        self.partials.append(df.groupby(self.key_name).agg(
+            total_ratings=("rating", "size"),
+            sum_rating=("rating", "sum"),
+            sumsq_rating=("rating_sq", "sum"),
+            min_rating=("rating", "min"),
+            max_rating=("rating", "max")
+        ))
+        positions = self._positions(df[self.key_name].to_numpy())
+        for name, column in self.sketch_columns.items():
+            self.hll.add(self.sketches[name], positions, df[column].to_numpy())
+
+    def merge_state(self, state):
+        """Incorpora linhas da tabela de estado (sketches como bytes)."""
+        if state.empty:
+            return
+        self.partials.append(state.set_index(self.key_name)[NUMERIC_STATE_COLUMNS])
+        positions = self._positions(state[self.key_name].to_numpy())
+        for name in self.sketch_columns:
+            saved = np.vstack([self.hll.from_bytes(data) for data in state[f"{name}_sketch"]])
+            self.sketches[name][positions] = np.maximum(self.sketches[name][positions], saved)
+
+    def result(self):
+        """Estado combinado: uma linha por chave, com estimativas e sketches serializados."""
+        df = pd.concat(self.partials).groupby(level=0).agg({
+            "total_ratings": "sum",
+            "sum_rating": "sum",
+            "sumsq_rating": "sum",
+            "min_rating": "min",
+            "max_rating": "max"
+        })
+        positions = self.keys.get_indexer(df.index)
+        for name in self.sketch_columns:
+            registers = self.sketches[name][positions]
+            df[f"{name}_estimate"] = self.hll.estimate(registers)
+            df[f"{name}_sketch"] = [self.hll.to_bytea(row) for row in registers]
+        df.index.name = self.key_name
+        return df.reset_index()
+
+
+def iter_ratings(conn, since_timestamp=None, chunk_rows=1_000_000):
+    """
+    Lê ratings_silver em chunks por um cursor nomeado (server-side).
+    Com since_timestamp, só ratings com timestamp >= since_timestamp que
+    ainda não estão em gold.state_recent_ratings (em ratings_silver
+    particionada, lê apenas as partições recentes).
+    """
+    query = "SELECT r.userid, r.movieid, r.rating::float8, r.timestamp FROM silver.ratings_silver r"
+    params = None
+    if since_timestamp is not None:
+        query += """
+            WHERE r.timestamp >= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM gold.state_recent_ratings k
+                  WHERE k.userid = r.userid AND k.movieid = r.movieid AND k.timestamp = r.timestamp
+              )
+        """
+        params = (since_timestamp,)
+
+    cur = conn.cursor(name="gold_incremental_scan")
+    cur.itersize = chunk_rows
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield pd.DataFrame(rows, columns=["userid", "movieid", "rating", "timestamp"])
+    finally:
+        cur.close()
+
+
+def load_watermark(conn):
+    """(high_water_mark, sketch_precision) da última atualização, ou None."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT high_water_mark, sketch_precision FROM gold.state_watermarks WHERE name = %s",
+            (WATERMARK_NAME,)
+        )
+        return cur.fetchone()
+
+
+def save_watermark(conn, high_water_mark, precision):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO gold.state_watermarks (name, high_water_mark, sketch_precision, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE SET
+                high_water_mark = EXCLUDED.high_water_mark,
+                sketch_precision = EXCLUDED.sketch_precision,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (WATERMARK_NAME, int(high_water_mark), precision)
+        )
+
+
+def save_recent_keys(conn, since_timestamp):
+    """Substitui as chaves da janela de sobreposição pelas de ratings_silver (mesmo snapshot do scan)."""
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE gold.state_recent_ratings")
+        cur.execute(
+            """
+            INSERT INTO gold.state_recent_ratings (userid, movieid, timestamp)
+            SELECT userid, movieid, timestamp FROM silver.ratings_silver WHERE timestamp >= %s
+            """,
+            (int(since_timestamp),)
+        )
+
+
+def check_state_drift(conn):
+    """
+    Compara o total de ratings do estado com ratings_silver. Diferença =
+    ratings atrasados além da janela de sobreposição, ou alterados/removidos
+    abaixo do high-water mark: o estado só volta a bater com rebuild.
+
+    Returns:
+        (linhas em ratings_silver, linhas incorporadas ao estado)
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM silver.ratings_silver")
+        silver_rows = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(SUM(total_ratings), 0) FROM gold.state_movie_ratings")
+        state_rows = int(cur.fetchone()[0])
+    if silver_rows != state_rows:
+        print(f"  ⚠️  Estado Gold diverge de ratings_silver ({state_rows:,} incorporados vs "
+              f"{silver_rows:,} no Silver): ratings fora da janela de sobreposição ou "
+              f"alterados/removidos - rode com --rebuild")
+    return silver_rows, state_rows
+
+
+def load_state(conn, table_name, key_name, keys, sketch_names):
+    """Linhas salvas de estado para as chaves informadas."""
+    sketch_list = ", ".join(f"{name}_sketch" for name in sketch_names)
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {key_name}, total_ratings, sum_rating, sumsq_rating,
+                   min_rating::float8, max_rating::float8, {sketch_list}
+            FROM {table_name}
+            WHERE {key_name} = ANY(%s)
+            """,
+            ([int(key) for key in keys],)
+        )
+        rows = cur.fetchall()
+    columns = [key_name] + NUMERIC_STATE_COLUMNS + [f"{name}_sketch" for name in sketch_names]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def load_stats_from_state(conn, hll):
+    """
+    Estatísticas por filme e por ano a partir do estado salvo, no mesmo
+    formato de aggregate_ratings_single_pass, sem ler ratings_silver:
+    contagens/somas exatas, contagens distintas estimadas pelos sketches.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT movieid, total_ratings, sum_rating, sumsq_rating, "
+            "min_rating, max_rating, users_sketch FROM gold.state_movie_ratings ORDER BY movieid"
+        )
+        df_movies = pd.DataFrame(cur.fetchall(), columns=["movieid"] + NUMERIC_STATE_COLUMNS + ["users_sketch"])
+        cur.execute(
+            "SELECT rating_year, total_ratings, sum_rating, sumsq_rating, min_rating, "
+            "max_rating, users_sketch, movies_sketch FROM gold.state_ratings_by_year ORDER BY rating_year"
+        )
+        df_years = pd.DataFrame(
+            cur.fetchall(),
+            columns=["rating_year"] + NUMERIC_STATE_COLUMNS + ["users_sketch", "movies_sketch"]
+        )
+
+    def estimates(sketches):
+        if len(sketches) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return hll.estimate(np.vstack([hll.from_bytes(data) for data in sketches]))
+
+    df_movies["total_users"] = estimates(df_movies.pop("users_sketch"))
+    df_years["active_users"] = estimates(df_years.pop("users_sketch"))
+    df_years["movies_rated"] = estimates(df_years.pop("movies_sketch"))
+
+    partials = ["sum_rating", "sumsq_rating"]
+    df_movies = finalize_metrics(df_movies)[FACT_MOVIE_RATINGS_COLUMNS + partials]
+    df_years = finalize_metrics(df_years)[FACT_RATINGS_BY_YEAR_COLUMNS + partials]
+    return df_movies, df_years
+
+
+def distinct_by_group(conn, hll, groups, table_name="gold.state_movie_ratings",
+                      key_name="movieid", sketch="users_sketch"):
+    """
+    Contagem distinta estimada por grupo, unindo os sketches salvos das
+    chaves de cada grupo (ex: usuários por gênero a partir dos filmes).
+
+    Args:
+        groups: DataFrame com as colunas key_name e 'group'
+    Returns:
+        DataFrame (group, distinct_estimate)
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {key_name}, {sketch} FROM {table_name} WHERE {key_name} = ANY(%s)",
+            ([int(key) for key in groups[key_name].unique()],)
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return pd.DataFrame({"group": [], "distinct_estimate": []})
+
+    keys = pd.Index([row[0] for row in rows])
+    registers = np.vstack([hll.from_bytes(row[1]) for row in rows])
+    groups = groups[groups[key_name].isin(keys)]
+    unique, merged = hll.merge_groups(registers[keys.get_indexer(groups[key_name])], groups["group"].to_numpy())
+    return pd.DataFrame({"group": unique, "distinct_estimate": hll.estimate(merged)})
+
+
+def mark_distinct_columns(conn, approximate, precision=None):
+    """Documenta (COMMENT ON COLUMN) se as contagens distintas Gold são exatas ou estimadas."""
+    if approximate:
+        error = HyperLogLog(precision or DEFAULT_PRECISION).relative_error
+        comment = f"Estimativa HyperLogLog (erro padrão ±{error:.1%})"
+    else:
+        comment = "Contagem distinta exata"
+    with conn.cursor() as cur:
+        for table_name, columns in DISTINCT_COLUMNS.items():
+            for column in columns:
+                cur.execute(f"COMMENT ON COLUMN {table_name}.{column} IS %s", (comment,))
+    conn.commit()
+
+
+def finalize_metrics(state):
+    """avg/stddev (amostral, como STDDEV do Postgres) a partir das parciais."""
+    n = state["total_ratings"].astype(float)
+    variance = (state["sumsq_rating"] - state["sum_rating"] ** 2 / n) / (n - 1).where(n > 1)
+    return state.assign(
+        avg_rating=round_half_up(state["sum_rating"] / n),
+        stddev_rating=round_half_up(np.sqrt(variance.clip(lower=0)))
+    )
+
+
+def replace_fact_rows(df, table_name, key_name, conn):
+    """Substitui (DELETE + COPY) só as linhas das chaves de df, sem commit."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"DELETE FROM {table_name} WHERE {key_name} = ANY(%s)",
+            (df[key_name].astype(int).tolist(),)
+        )
+        df = align_integer_columns(df, cur, table_name)
+    copy_dataframe(df, table_name, conn, commit=False)
+
+
+def update_movies_dimension(df_facts, conn):
+    """Atualiza as métricas de rating de gold.dim_movies dos filmes afetados."""
+    values = list(zip(
+        df_facts["movieid"].astype(int).tolist(),
+        df_facts["avg_rating"].astype(float).tolist(),
+        df_facts["total_ratings"].astype(int).tolist(),
+        df_facts["total_users"].astype(int).tolist()
+    ))
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            """
+            UPDATE gold.dim_movies d SET
+                avg_rating = v.avg_rating,
+                total_ratings = v.total_ratings,
+                total_users = v.total_users
+            FROM (VALUES %s) AS v(movieid, avg_rating, total_ratings, total_users)
+            WHERE d.movieid = v.movieid
+            """,
+            values,
+            template="(%s::int, %s::numeric, %s::bigint, %s::bigint)",
+            page_size=10_000
+        )
+
+
+def refresh_gold_facts_incremental(precision=DEFAULT_PRECISION, rebuild=False, chunk_rows=1_000_000,
+                                   overlap_seconds=DEFAULT_OVERLAP_SECONDS):
+    """
+    Atualiza gold.fact_movie_ratings e gold.fact_ratings_by_year lendo só
+    os ratings novos desde o high-water mark salvo.
+
+    O high-water mark é o maior timestamp (hora do evento) incorporado. A
+    leitura recomeça overlap_seconds abaixo dele e descarta as chaves
+    (userid, movieid, timestamp) já incorporadas nessa janela
+    (gold.state_recent_ratings), então ratings do mesmo segundo do
+    high-water mark ou que chegam atrasados dentro da janela não se perdem
+    nem são contados duas vezes. Scan, estado e chaves da janela usam o
+    mesmo snapshot (REPEATABLE READ).
+
+    Os ratings novos viram parciais por filme/ano (contagem, soma, soma dos
+    quadrados, mín, máx e sketches HLL de usuários/filmes), que são
+    combinadas com o estado salvo em gold.state_*; só as linhas afetadas dos
+    fatos (e as métricas de gold.dim_movies) são reescritas. Estado, fatos e
+    high-water mark são gravados na mesma transação.
+
+    Sem estado salvo (ou com rebuild=True, ou se a precisão mudou) o estado
+    é reconstruído a partir de todos os ratings. Contagens distintas
+    (total_users, active_users, movies_rated) das linhas reescritas passam a
+    ser estimativas HLL.
+
+    Ratings mais atrasados que a janela, alterados ou removidos exigem
+    --rebuild: ao final, o total do estado é comparado com ratings_silver
+    (um COUNT(*) completo) e a divergência é reportada.
+
+    Args:
+        precision: Precisão dos sketches HLL (2^precision registradores)
+        rebuild: Reconstrói o estado do zero
+        chunk_rows: Linhas por chunk lido de ratings_silver
+        overlap_seconds: Janela relida abaixo do high-water mark
+    """
+    print("\n🔁 Atualização incremental dos fatos Gold...")
+    start = time.perf_counter()
+    conn = get_connection()
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(CREATE_STATE_TABLES)
+            cur.execute("SET TIME ZONE 'UTC'")
+        conn.commit()
+
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        watermark = load_watermark(conn)
+        if watermark is not None and watermark[1] != precision:
+            print(f"  ⚠️  Sketches salvos com precisão {watermark[1]}, pedida {precision} - reconstruindo")
+            rebuild = True
+        full = rebuild or watermark is None
+        after = None if full else watermark[0]
+        since = None if full else after - overlap_seconds
+        if not full:
+            with conn.cursor() as cur:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM gold.state_recent_ratings)")
+                if not cur.fetchone()[0]:
+                    # Sem chaves da janela (estado anterior à sobreposição):
+                    # reler a janela contaria em dobro, então lê só > high-water mark
+                    since = after + 1
+        print(f"  📍 High-water mark: {'(reconstrução completa)' if full else after}")
+
+        hll = HyperLogLog(precision)
+        movies = RunningStats("movieid", hll, {"users": "userid"})
+        years = RunningStats("rating_year", hll, {"users": "userid", "movies": "movieid"})
+
+        new_rows = 0
+        high_water_mark = after
+        for df in iter_ratings(conn, since, chunk_rows):
+            df["rating_year"] = pd.to_datetime(df["timestamp"], unit="s").dt.year
+            df["rating_sq"] = df["rating"] ** 2
+            movies.fold(df)
+            years.fold(df)
+            new_rows += len(df)
+            chunk_max = int(df["timestamp"].max())
+            high_water_mark = chunk_max if high_water_mark is None else max(high_water_mark, chunk_max)
+
+        if new_rows == 0:
+            check_state_drift(conn)
+            conn.rollback()
+            print("  ✓ Nenhum rating novo desde o último high-water mark")
+            return
+
+        if not full:
+            movies.merge_state(load_state(conn, "gold.state_movie_ratings", "movieid", movies.keys, ["users"]))
+            years.merge_state(load_state(conn, "gold.state_ratings_by_year", "rating_year", years.keys, ["users", "movies"]))
+
+        df_movie_state = finalize_metrics(movies.result())
+        df_year_state = finalize_metrics(years.result())
+
+        # Estado
+        with conn.cursor() as cur:
+            if full:
+                cur.execute("TRUNCATE gold.state_movie_ratings, gold.state_ratings_by_year")
+        merge_dataframe(
+            df_movie_state[["movieid"] + NUMERIC_STATE_COLUMNS + ["users_sketch"]],
+            "gold.state_movie_ratings", conn, key_columns=["movieid"], commit=False
+        )
+        merge_dataframe(
+            df_year_state[["rating_year"] + NUMERIC_STATE_COLUMNS + ["users_sketch", "movies_sketch"]],
+            "gold.state_ratings_by_year", conn, key_columns=["rating_year"], commit=False
+        )
+
+        # Fatos e dimensão (só as chaves afetadas)
+        df_movie_facts = df_movie_state.rename(columns={"users_estimate": "total_users"})[FACT_MOVIE_RATINGS_COLUMNS]
+        df_year_facts = df_year_state.rename(columns={
+            "users_estimate": "active_users", "movies_estimate": "movies_rated"
+        })[FACT_RATINGS_BY_YEAR_COLUMNS]
+        replace_fact_rows(df_movie_facts, "gold.fact_movie_ratings", "movieid", conn)
+        replace_fact_rows(df_year_facts, "gold.fact_ratings_by_year", "rating_year", conn)
+        update_movies_dimension(df_movie_facts, conn)
+
+        save_recent_keys(conn, high_water_mark - overlap_seconds)
+        save_watermark(conn, high_water_mark, precision)
+        check_state_drift(conn)
+        conn.commit()
+        mark_distinct_columns(conn, approximate=True, precision=precision)
+
+    except Exception as e:
+        conn.rollback()
+        print(f"  ❌ Erro na atualização incremental: {e}")
+        raise
+    finally:
+        conn.close()
+
+    print(f"  ✅ {new_rows:,} ratings incorporados: {len(df_movie_facts):,} filmes e "
+          f"{len(df_year_facts)} anos atualizados ({time.perf_counter() - start:.1f}s)")
+    print(f"  📍 Novo high-water mark: {high_water_mark} "
+          f"(contagens distintas ±{hll.relative_error:.1%})\n")
+
+
+if __name__ == "__main__":
+    # --rebuild: necessário quando chegam ratings mais antigos que a janela de sobreposição
+    refresh_gold_facts_incremental(rebuild="--rebuild" in sys.argv)
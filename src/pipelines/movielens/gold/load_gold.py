@@ -2,51 +2,69 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.db import get_connection, insert_dataframe
+import time
+from settings.db import get_connection, swap_replace_table
+from settings.settings import settings
+from settings.matviews import refresh_materialized_views
 from gold.transformations_gold import (
-    aggregate_movie_ratings,
-    aggregate_ratings_by_year,
+    FACT_MOVIE_RATINGS_COLUMNS,
+    FACT_RATINGS_BY_YEAR_COLUMNS,
+    aggregate_ratings_single_pass,
     enrich_movies_dimension,
     aggregate_genres,
     get_movie_genres_relationships
 )
-import pandas as pd
-
-def get_native_values(df):
-    """Converte DataFrame em lista de tuplas com valores nativos Python"""
-    df_clean = df.copy() 
-    df_clean = df_clean.replace({pd.NA: None})
-    values = [tuple(row) for row in df_clean.itertuples(index=False)]
-    return values
+from gold.incremental_gold import (
+    load_stats_from_state,
+    mark_distinct_columns,
+    refresh_gold_facts_incremental
+)
+from gold.sketches import HyperLogLog, precision_for_error
 
 
 def insert_gold_data(df, table_name, conn):
-    """Insere dados na camada Gold"""
+    """
+    Carrega dados na camada Gold via tabela sombra (<tabela>__next) e troca
+    atômica com a tabela viva; a versão anterior fica em <tabela>__prev.
+    """
     if df.empty:
         print(f"  ⚠️  DataFrame vazio para {table_name}")
         return
     
-    values = get_native_values(df)
-    columns = df.columns.tolist()
-    
     try:
-        insert_dataframe(
-            columns=columns,
-            table_name=table_name,
-            conn=conn,
-            values=values
-        )
-        print(f"  ✅ {len(df):,} registros inseridos em {table_name}\n")
+        rows, elapsed = swap_replace_table(df, table_name, conn)
+        print(f"  ✅ {rows:,} registros publicados em {table_name} ({elapsed:.1f}s)\n")
     except Exception as e:
         print(f"  ❌ Erro ao inserir em {table_name}: {e}\n")
         conn.rollback()
         raise
 
 
-def load_gold_pipeline(recreate_schema=False):
+def load_gold_pipeline(recreate_schema=False, incremental=False, approximate=False,
+                       distinct_error=None):
     """
     Pipeline que transforma dados Silver em Gold (agregados e modelados)
+
+    ratings_silver é agregada uma única vez (aggregate_ratings_single_pass);
+    dimensões e fatos são derivados dessas estatísticas por filme e por ano.
+
+    Args:
+        incremental: Se True, só incorpora aos fatos os ratings acima do
+            high-water mark (ver incremental_gold); dimensões não são recarregadas
+        approximate: Se True, contagens distintas (usuários, filmes por ano)
+            vêm dos sketches HyperLogLog do estado incremental em vez de
+            COUNT(DISTINCT) sobre ratings_silver; as colunas são marcadas
+            como estimativas
+        distinct_error: Erro padrão aceito nas estimativas
+            (padrão: settings.GOLD_DISTINCT_ERROR)
     """
+    precision = precision_for_error(distinct_error or settings.GOLD_DISTINCT_ERROR)
+
+    if incremental:
+        refresh_gold_facts_incremental(precision=precision)
+        refresh_materialized_views("movielens")
+        return
+
     print("\n" + "="*60)
     print("🏆 INICIANDO PIPELINE GOLD")
     print("="*60 + "\n")
@@ -54,24 +72,35 @@ def load_gold_pipeline(recreate_schema=False):
     conn = get_connection()
     
     try:
+        # 0. Agregação única de ratings (por filme e por ano)
+        start = time.perf_counter()
+        if approximate:
+            print(f"📦 [0/5] Estatísticas do estado incremental (HLL, erro ±{HyperLogLog(precision).relative_error:.1%})...")
+            refresh_gold_facts_incremental(precision=precision)
+            df_movie_stats, df_year_stats = load_stats_from_state(conn, HyperLogLog(precision))
+        else:
+            print("📦 [0/5] Agregando ratings_silver (passada única)...")
+            df_movie_stats, df_year_stats = aggregate_ratings_single_pass()
+        print(f"  ⏱️  Agregação: {time.perf_counter() - start:.1f}s\n")
+
         # 1. Carregar dimensão de gêneros
         print("📦 [1/5] Processando dimensão de gêneros...")
-        df_genres = aggregate_genres()
+        df_genres = aggregate_genres(movie_stats=df_movie_stats)
         insert_gold_data(df_genres, 'gold.dim_genres', conn)
         
         # 2. Carregar dimensão de filmes (enriquecida)
         print("📦 [2/5] Processando dimensão de filmes...")
-        df_movies = enrich_movies_dimension()
+        df_movies = enrich_movies_dimension(movie_stats=df_movie_stats)
         insert_gold_data(df_movies, 'gold.dim_movies', conn)
         
         # 3. Carregar fato de ratings por filme
         print("📦 [3/5] Processando fato de ratings...")
-        df_ratings = aggregate_movie_ratings()
+        df_ratings = df_movie_stats[FACT_MOVIE_RATINGS_COLUMNS]
         insert_gold_data(df_ratings, 'gold.fact_movie_ratings', conn)
         
         # 4. Carregar fato de ratings por ano
         print("📦 [4/5] Processando fato temporal...")
-        df_by_year = aggregate_ratings_by_year()
+        df_by_year = df_year_stats[FACT_RATINGS_BY_YEAR_COLUMNS]
         insert_gold_data(df_by_year, 'gold.fact_ratings_by_year', conn)
         
         # 5. Carregar relacionamentos filme-gênero
@@ -79,6 +108,11 @@ def load_gold_pipeline(recreate_schema=False):
         df_movie_genres = get_movie_genres_relationships()
         insert_gold_data(df_movie_genres, 'gold.fact_movie_genres', conn)
         
+        mark_distinct_columns(conn, approximate=approximate, precision=precision)
+
+        # 6. Rollups consultados pela API
+        refresh_materialized_views("movielens")
+
         print("="*60)
         print("✅ PIPELINE GOLD CONCLUÍDO COM SUCESSO!")
         print("="*60 + "\n")
@@ -94,4 +128,7 @@ def load_gold_pipeline(recreate_schema=False):
 
 
 if __name__ == "__main__":
-    load_gold_pipeline()
\ No newline at end of file
+    load_gold_pipeline(
+        incremental="--incremental" in sys.argv,
+        approximate="--approximate" in sys.argv
+    )
\ No newline at end of file
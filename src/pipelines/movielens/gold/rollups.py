@@ -0,0 +1,67 @@
+"""
+Rollups Gold a partir de parciais por filme.
+
+Dimensões agregadas (gênero, década, ...) não precisam reler ratings_silver:
+contagem, soma e soma dos quadrados por filme são mergeáveis, então a média
+ponderada, o desvio padrão e mín/máx de qualquer agrupamento de filmes saem
+das ~90k linhas por filme em vez dos 32M ratings (ou dos ~80M do JOIN com
+uma tabela N:N).
+"""
+import numpy as np
+
+# Parciais por filme reconhecidas pelo rollup (total_ratings e sum_rating são obrigatórias)
+MOVIE_PARTIALS = ["total_ratings", "sum_rating", "sumsq_rating", "min_rating", "max_rating"]
+
+
+def round_half_up(values, decimals=2):
+    """
+    Arredonda como ROUND(numeric) do Postgres (0.125 -> 0.13) para valores
+    não negativos. O valor escalado é arredondado a 6 casas antes do floor:
+    em float, metades exatas como 41/40 = 1.025 viram 102.49999... e
+    cairiam para baixo.
+    """
+    factor = 10 ** decimals
+    return np.floor(np.round(np.asarray(values, dtype=float) * factor, 6) + 0.5) / factor
+
+
+def rollup_movie_partials(movie_stats, movie_groups, group_columns, groups=None):
+    """
+    Agrega parciais por filme em grupos de filmes.
+
+    Args:
+        movie_stats: DataFrame por filme com movieid, total_ratings,
+            sum_rating e, opcionalmente, sumsq_rating, min_rating, max_rating
+        movie_groups: Mapeamento movieid -> group_columns (pode ser N:N,
+            ex: movie_genres_silver)
+        group_columns: Colunas que identificam o grupo
+        groups: Todos os grupos (com colunas descritivas); grupos sem filmes
+            aparecem com contagens zeradas
+
+    Returns:
+        DataFrame com group_columns, total_movies (filmes distintos no
+        mapeamento), total_ratings, avg_rating e, conforme as parciais
+        disponíveis, stddev_rating, min_rating, max_rating
+    """
+    partials = [col for col in MOVIE_PARTIALS if col in movie_stats.columns]
+    df = movie_groups[["movieid"] + group_columns].merge(
+        movie_stats[["movieid"] + partials], on="movieid", how="left"
+    )
+
+    aggregations = {"total_movies": ("movieid", "nunique")}
+    for col in partials:
+        aggregations[col] = (col, "min" if col == "min_rating" else "max" if col == "max_rating" else "sum")
+    df = df.groupby(group_columns, as_index=False).agg(**aggregations)
+
+    n = df["total_ratings"].astype(float)
+    df["avg_rating"] = round_half_up(df["sum_rating"] / n.where(n > 0))
+    if "sumsq_rating" in partials:
+        variance = (df["sumsq_rating"] - df["sum_rating"] ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+        df["stddev_rating"] = round_half_up(np.sqrt(variance.clip(lower=0)))
+    df = df.drop(columns=[col for col in ("sum_rating", "sumsq_rating") if col in df.columns])
+
+    if groups is not None:
+        df = groups.merge(df, on=group_columns, how="left")
+        df["total_movies"] = df["total_movies"].fillna(0)
+    df["total_ratings"] = df["total_ratings"].fillna(0).astype(int)
+    df["total_movies"] = df["total_movies"].astype(int)
+    return df
@@ -3,7 +3,81 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pandas as pd
+from datetime import datetime, timezone
 from settings.db import get_connection
+from gold.rollups import rollup_movie_partials
+
+# Colunas de cada fato Gold derivadas da agregação em passada única
+FACT_MOVIE_RATINGS_COLUMNS = [
+    "movieid", "total_ratings", "avg_rating", "min_rating",
+    "max_rating", "stddev_rating", "total_users"
+]
+FACT_RATINGS_BY_YEAR_COLUMNS = [
+    "rating_year", "total_ratings", "avg_rating", "active_users", "movies_rated"
+]
+
+
+def aggregate_ratings_single_pass():
+    """
+    Agrega silver.ratings_silver UMA vez para todas as tabelas Gold.
+
+    GROUPING SETS ((movieid), (rating_year)) produz na mesma varredura as
+    estatísticas por filme e por ano. Além das métricas finais, cada grupo
+    traz parciais mergeáveis (contagem, soma, soma dos quadrados), das
+    quais saem os rollups (gêneros) sem reler os 32M de ratings.
+
+    Returns:
+        (df_movie_stats, df_year_stats): por filme (FACT_MOVIE_RATINGS_COLUMNS
+        + sum_rating, sumsq_rating) e por ano (FACT_RATINGS_BY_YEAR_COLUMNS
+        + sum_rating, sumsq_rating)
+    """
+    print("  📊 Agregando ratings (passada única: filme + ano)...")
+
+    conn = get_connection()
+
+    query = """
+    SELECT
+        GROUPING(movieid, rating_year) as grouping_set,
+        movieid,
+        rating_year,
+        COUNT(*) as total_ratings,
+        SUM(rating)::float8 as sum_rating,
+        SUM(rating * rating)::float8 as sumsq_rating,
+        ROUND(AVG(rating)::numeric, 2) as avg_rating,
+        MIN(rating) as min_rating,
+        MAX(rating) as max_rating,
+        ROUND(STDDEV(rating)::numeric, 2) as stddev_rating,
+        COUNT(DISTINCT userid) as total_users,
+        COUNT(DISTINCT movieid) as movies_rated
+    FROM (
+        SELECT
+            movieid,
+            userid,
+            rating,
+            EXTRACT(YEAR FROM TO_TIMESTAMP(timestamp))::int as rating_year
+        FROM silver.ratings_silver
+    ) r
+    GROUP BY GROUPING SETS ((movieid), (rating_year))
+    """
+
+    with conn.cursor() as cur:
+        cur.execute("SET TIME ZONE 'UTC'")
+        cur.execute("SET work_mem = '256MB'")
+    df = pd.read_sql(query, conn)
+    conn.close()
+
+    # GROUPING = 1: rating_year fora do grupo (por filme); 2: por ano
+    partials = ["sum_rating", "sumsq_rating"]
+    df_movie_stats = df[df["grouping_set"] == 1][FACT_MOVIE_RATINGS_COLUMNS + partials]
+    df_movie_stats = df_movie_stats.astype({"movieid": int}).sort_values("movieid")
+
+    df_year_stats = df[df["grouping_set"] == 2].rename(columns={"total_users": "active_users"})
+    df_year_stats = df_year_stats[FACT_RATINGS_BY_YEAR_COLUMNS + partials]
+    df_year_stats = df_year_stats.astype({"rating_year": int}).sort_values("rating_year")
+
+    print(f"  ✓ {len(df_movie_stats):,} filmes e {len(df_year_stats)} anos agregados")
+    return df_movie_stats.reset_index(drop=True), df_year_stats.reset_index(drop=True)
+
 
 def aggregate_movie_ratings():
     """
@@ -35,16 +109,32 @@ def aggregate_movie_ratings():
     return df
 
 
-def aggregate_ratings_by_year():
+def year_range_filter(years):
+    """
+    Filtro em timestamp (epoch UTC) cobrindo os anos informados.
+    Comparar a coluna crua permite partition pruning em ratings_silver
+    particionada, o que EXTRACT(YEAR FROM TO_TIMESTAMP(...)) não permite.
+    """
+    start = int(datetime(min(years), 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(max(years) + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+    return f"timestamp >= {start} AND timestamp < {end}"
+
+
+def aggregate_ratings_by_year(years=None):
     """
     Agrega ratings por ano (temporal)
     Retorna DataFrame pronto para gold.fact_ratings_by_year
+
+    Args:
+        years: Se informado, agrega só esse intervalo de anos (lê apenas as
+            partições correspondentes quando ratings_silver é particionada)
     """
     print("  📊 Agregando ratings por ano...")
     
     conn = get_connection()
     
-    query = """
+    where = f"WHERE {year_range_filter(years)}" if years else ""
+    query = f"""
     SELECT 
         EXTRACT(YEAR FROM TO_TIMESTAMP(timestamp))::int as rating_year,
         COUNT(*) as total_ratings,
@@ -52,10 +142,15 @@ def aggregate_ratings_by_year():
         COUNT(DISTINCT userid) as active_users,
         COUNT(DISTINCT movieid) as movies_rated
     FROM silver.ratings_silver
+    {where}
     GROUP BY rating_year
     ORDER BY rating_year
     """
     
+    # Com partições anuais, cada ano é agregado dentro da sua partição
+    with conn.cursor() as cur:
+        cur.execute("SET enable_partitionwise_aggregate = on")
+        cur.execute("SET TIME ZONE 'UTC'")
     df = pd.read_sql(query, conn)
     conn.close()
     
@@ -63,10 +158,14 @@ def aggregate_ratings_by_year():
     return df
 
 
-def enrich_movies_dimension():
+def enrich_movies_dimension(movie_stats=None):
     """
     Enriquece dimensão de filmes com métricas agregadas
     OTIMIZADO: Queries separadas ao invés de JOINs gigantes
+
+    Args:
+        movie_stats: Estatísticas por filme já calculadas
+            (aggregate_ratings_single_pass); evita reagregar ratings_silver
     """
     print("  📊 Enriquecendo dimensão de filmes...")
     
@@ -88,17 +187,21 @@ def enrich_movies_dimension():
     df_movies = pd.read_sql(query_movies, conn)
     
     # 2. Busca métricas de ratings (agregado)
-    print("    → Calculando métricas de ratings...")
-    query_ratings = """
-    SELECT 
-        movieid,
-        ROUND(AVG(rating)::numeric, 2) as avg_rating,
-        COUNT(*) as total_ratings,
-        COUNT(DISTINCT userid) as total_users
-    FROM silver.ratings_silver
-    GROUP BY movieid
-    """
-    df_ratings = pd.read_sql(query_ratings, conn)
+    if movie_stats is not None:
+        print("    → Reaproveitando métricas de ratings da passada única...")
+        df_ratings = movie_stats[['movieid', 'avg_rating', 'total_ratings', 'total_users']]
+    else:
+        print("    → Calculando métricas de ratings...")
+        query_ratings = """
+        SELECT 
+            movieid,
+            ROUND(AVG(rating)::numeric, 2) as avg_rating,
+            COUNT(*) as total_ratings,
+            COUNT(DISTINCT userid) as total_users
+        FROM silver.ratings_silver
+        GROUP BY movieid
+        """
+        df_ratings = pd.read_sql(query_ratings, conn)
     
     # 3. Busca total de tags
     print("    → Calculando total de tags...")
@@ -127,35 +230,46 @@ def enrich_movies_dimension():
     return df
 
 
-def aggregate_genres():
+def aggregate_genres(movie_stats=None):
     """
     Agrega estatísticas por gênero
     Retorna DataFrame pronto para gold.dim_genres
+
+    O gênero é um rollup das parciais por filme (ver rollups): média
+    ponderada pelas contagens, sem o JOIN gêneros x filmes x ratings que
+    multiplicava cada rating pelo número de gêneros do filme.
+
+    Args:
+        movie_stats: Estatísticas por filme (aggregate_ratings_single_pass);
+            sem elas, as parciais por filme são calculadas num GROUP BY simples
     """
     print("  📊 Agregando estatísticas por gênero...")
     
     conn = get_connection()
-    
-    query = """
-    SELECT 
-        g.genre_id,
-        g.genre_name,
-        COUNT(DISTINCT mg.movieid) as total_movies,
-        COUNT(r.rating) as total_ratings,
-        ROUND(AVG(r.rating)::numeric, 2) as avg_rating
-    FROM silver.genres_silver g
-    LEFT JOIN silver.movie_genres_silver mg ON g.genre_id = mg.genre_id
-    LEFT JOIN silver.ratings_silver r ON mg.movieid = r.movieid
-    GROUP BY g.genre_id, g.genre_name
-    ORDER BY g.genre_name
-    """
-    
-    df = pd.read_sql(query, conn)
+
+    if movie_stats is None:
+        query_partials = """
+        SELECT
+            movieid,
+            COUNT(*) as total_ratings,
+            SUM(rating)::float8 as sum_rating
+        FROM silver.ratings_silver
+        GROUP BY movieid
+        """
+        movie_stats = pd.read_sql(query_partials, conn)
+
+    df_genres = pd.read_sql("SELECT genre_id, genre_name FROM silver.genres_silver", conn)
+    df_bridge = pd.read_sql("SELECT movieid, genre_id FROM silver.movie_genres_silver", conn)
     conn.close()
-    
-    # Trata valores nulos
-    df['total_movies'] = df['total_movies'].fillna(0).astype(int)
-    df['total_ratings'] = df['total_ratings'].fillna(0).astype(int)
+
+    df = rollup_movie_partials(
+        movie_stats[['movieid', 'total_ratings', 'sum_rating']],
+        df_bridge,
+        group_columns=['genre_id'],
+        groups=df_genres
+    )
+    df = df[['genre_id', 'genre_name', 'total_movies', 'total_ratings', 'avg_rating']]
+    df = df.sort_values('genre_name').reset_index(drop=True)
     
     print(f"  ✓ {len(df)} gêneros processados")
     return df
@@ -1,14 +1,43 @@
 from minio_client.minio_utils import MinioClient
-from settings.db import get_connection, insert_dataframe
+from settings.db import get_connection, insert_dataframe, merge_dataframe
 from src.pipelines.movielens.silver.transformations import (
     transform_movies,
     transform_movie_genres,
     transform_ratings,
     transform_tags,
-    transform_links
+    transform_links,
+    chunksize_for_memory
 )
+from src.pipelines.movielens.silver.parallel_load import ChunkLedger, load_chunks_parallel
+from src.pipelines.movielens.silver.dedup import GlobalDeduplicator
+from src.pipelines.movielens.bronze.convert_parquet import (
+    BRONZE_DATASETS,
+    ensure_bronze_parquet,
+    iter_bronze_chunks
+)
+from functools import partial
 import pandas as pd
 import os
+import threading
+import time
+
+# Chave natural (PK/UNIQUE) de cada tabela Silver, usada no modo merge
+MERGE_KEYS = {
+    "silver.movies_silver": ["movieid"],
+    "silver.genres_silver": ["genre_name"],
+    "silver.movie_genres_silver": ["movieid", "genre_id"],
+    "silver.ratings_silver": ["userid", "movieid", "timestamp"],
+    "silver.tags_silver": ["userid", "movieid", "timestamp"],
+    "silver.links_silver": ["movieid"],
+}
+
+def table_has_rows(conn, table_name):
+    """Retorna True se table_name tem ao menos uma linha."""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {table_name})")
+        has_rows = cur.fetchone()[0]
+    conn.commit()
+    return has_rows
 
 def get_native_values(df):
     """
@@ -20,14 +49,109 @@ def get_native_values(df):
     return values
 
 
-def insert_genres_with_mapping(df_genres, df_movie_genres, conn):
+def insert_transformed(df, table_name, conn, use_copy=False):
+    """
+    Insere um DataFrame já transformado na tabela Silver.
+    Com use_copy=True usa COPY FROM STDIN em vez de execute_values.
+    Retorna o tempo gasto na carga (segundos).
+    """
+    start = time.perf_counter()
+    if use_copy:
+        insert_dataframe(
+            columns=df.columns.tolist(),
+            table_name=table_name,
+            conn=conn,
+            df=df,
+            use_copy=True
+        )
+    else:
+        insert_dataframe(
+            columns=df.columns.tolist(),
+            table_name=table_name,
+            conn=conn,
+            values=get_native_values(df)
+        )
+    return time.perf_counter() - start
+
+
+class MergeTotals:
+    """Soma (thread-safe) das contagens de merge_dataframe de uma tabela."""
+
+    def __init__(self):
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        self.lock = threading.Lock()
+
+    def add(self, result):
+        with self.lock:
+            for key in self.counts:
+                self.counts[key] += result[key]
+
+    def report(self, label):
+        print(f"  🔀 {label}: {self.counts['inserted']:,} inseridos, "
+              f"{self.counts['updated']:,} atualizados, {self.counts['unchanged']:,} inalterados")
+
+
+def merge_transformed(df, table_name, conn, totals):
+    """
+    Aplica um DataFrame já transformado via upsert (ver merge_dataframe),
+    acumulando as contagens em totals. Retorna o tempo gasto (segundos).
+    """
+    result = merge_dataframe(df, table_name, conn, key_columns=MERGE_KEYS[table_name])
+    totals.add(result)
+    return result["seconds"]
+
+
+def report_throughput(label, rows, seconds):
+    """Imprime a taxa de carga (linhas/s) de uma tabela."""
+    rate = rows / seconds if seconds > 0 else 0
+    print(f"  ⚡ {label}: {rows:,} linhas em {seconds:.1f}s ({rate:,.0f} linhas/s)")
+
+
+def load_chunks_serial(chunk_iterator, transform, table_name, conn, use_copy=False, dedup=None,
+                       load_fn=None):
+    """
+    Transforma e carrega chunks em série numa única conexão.
+    Com dedup (GlobalDeduplicator), linhas cuja chave já apareceu em um
+    chunk anterior são descartadas antes da carga. load_fn (df, table_name,
+    conn) -> segundos substitui a carga padrão (ex: merge_transformed).
+    Retorna (total de linhas carregadas, segundos de carga somados).
+    """
+    load_fn = load_fn or partial(insert_transformed, use_copy=use_copy)
+    total_inserted = 0
+    load_seconds = 0.0
+
+    for chunk_num, df_chunk in enumerate(chunk_iterator, 1):
+        print(f"  - Chunk {chunk_num}: {len(df_chunk)} registros")
+
+        df_transformed = transform(df_chunk)
+        if dedup is not None:
+            df_transformed = dedup.filter(df_transformed)
+
+        if not df_transformed.empty:
+            try:
+                load_seconds += load_fn(df_transformed, table_name, conn)
+                total_inserted += len(df_transformed)
+            except Exception as e:
+                print(f"    ❌ Erro ao inserir chunk {chunk_num}: {e}")
+                conn.rollback()
+
+    return total_inserted, load_seconds
+
+
+def insert_genres_with_mapping(df_genres, df_movie_genres, conn, merge=False):
     """
     Insere gêneros e retorna mapeamento genre_name -> genre_id
     Depois insere os relacionamentos movie-genre
+    Com merge=True gêneros e relacionamentos já existentes são mantidos.
     """
     # 1. Insere gêneros únicos
     print("  → Inserindo gêneros únicos...")
-    if not df_genres.empty:
+    if merge:
+        merge_dataframe(
+            df_genres[['genre_name']], 'silver.genres_silver', conn,
+            key_columns=MERGE_KEYS['silver.genres_silver']
+        )
+    elif not df_genres.empty:
         values = get_native_values(df_genres)
         insert_dataframe(
             columns=['genre_name'],
@@ -48,7 +172,14 @@ def insert_genres_with_mapping(df_genres, df_movie_genres, conn):
     
     # 4. Insere relacionamentos
     print("  → Inserindo relacionamentos filme-gênero...")
-    if not df_movie_genres.empty:
+    if merge:
+        totals = MergeTotals()
+        totals.add(merge_dataframe(
+            df_movie_genres, 'silver.movie_genres_silver', conn,
+            key_columns=MERGE_KEYS['silver.movie_genres_silver']
+        ))
+        totals.report('silver.movie_genres_silver')
+    elif not df_movie_genres.empty:
         values = get_native_values(df_movie_genres)
         insert_dataframe(
             columns=['movieid', 'genre_id'],
@@ -58,12 +189,50 @@ def insert_genres_with_mapping(df_genres, df_movie_genres, conn):
         )
 
 
-def load_silver_pipeline(recreate_schema=False):
+def load_silver_pipeline(recreate_schema=False, use_copy=True, parallel=False,
+                         transform_workers=2, load_workers=2, max_memory_mb=1024,
+                         bulk_load=False, partitioned=False, bronze_parquet=True,
+                         merge=False):
     """
     Pipeline que baixa os CSVs do MinIO, aplica transformações
     e carrega nas tabelas Silver do Postgres
+
+    Args:
+        recreate_schema: Se True, recria o schema Silver antes da carga
+        use_copy: Se True, ratings e tags são carregados via COPY FROM STDIN
+        parallel: Se True, arquivos em chunks usam o modo produtor/consumidor
+            (ver parallel_load), com ledger por chunk para retomada
+        transform_workers: Processos de transformação no modo paralelo
+        load_workers: Conexões de carga no modo paralelo
+        max_memory_mb: Teto de memória para chunks em voo; também define o
+            chunksize de ratings/tags (ver chunksize_for_memory)
+        bulk_load: Se True (exige recreate_schema=True), cria ratings/tags
+            UNLOGGED e sem índices, e só constrói PKs/índices depois da carga
+        partitioned: Se True (junto com recreate_schema), cria ratings_silver
+            particionada por ano de timestamp; o COPY roteia cada linha para
+            a partição do seu ano
+        bronze_parquet: Se True, ratings/tags são lidos da Bronze Parquet
+            (BUCKET_BRONZE_MOVIELENS, convertida do CSV uma única vez) em vez
+            de re-parsear o CSV
+        merge: Se True, cada tabela é carregada por upsert (COPY para tabela
+            temporária + INSERT ... ON CONFLICT), então a pipeline pode ser
+            reexecutada sobre um Silver existente para aplicar um novo drop
+            do MovieLens; reporta linhas inseridas/atualizadas/inalteradas
     """
     print("\n=== Iniciando Pipeline Silver ===\n")
+
+    if merge and bulk_load:
+        print("⚠️  merge exige as PKs durante a carga - ignorando bulk_load")
+        bulk_load = False
+
+    if bulk_load and not recreate_schema:
+        # Recriar o schema apaga o Silver existente: não fazer isso implicitamente
+        raise ValueError(
+            "bulk_load exige tabelas novas (UNLOGGED, sem índices), o que apaga o "
+            "schema Silver existente - passe recreate_schema=True explicitamente"
+        )
+
+    phase_timings = {}
     
     # Configurações
     MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "localhost:9000")
@@ -79,9 +248,13 @@ def load_silver_pipeline(recreate_schema=False):
     if recreate_schema:
         from src.pipelines.movielens.silver.schemas import create_silver_tables
         print("♻️  Recriando schema Silver...")
-        create_silver_tables(conn)
+        phase_start = time.perf_counter()
+        create_silver_tables(conn, bulk_load=bulk_load, partitioned=partitioned)
+        phase_timings["schema"] = time.perf_counter() - phase_start
         print()
 
+    load_start = time.perf_counter()
+
     # Lista arquivos no bucket
     files = minio_client.list_files(BUCKET_RAW)
     print(f"Arquivos encontrados no bucket '{BUCKET_RAW}': {files}\n")
@@ -103,7 +276,14 @@ def load_silver_pipeline(recreate_schema=False):
             df_movies = df_movies.drop(columns=['genres'])
             
             # Insere movies
-            if not df_movies.empty:
+            if merge:
+                totals = MergeTotals()
+                totals.add(merge_dataframe(
+                    df_movies, 'silver.movies_silver', conn,
+                    key_columns=MERGE_KEYS['silver.movies_silver']
+                ))
+                totals.report('silver.movies_silver')
+            elif not df_movies.empty:
                 values = get_native_values(df_movies)
                 insert_dataframe(
                     columns=df_movies.columns.tolist(),
@@ -114,7 +294,7 @@ def load_silver_pipeline(recreate_schema=False):
                 print(f"  ✅ Movies carregados com sucesso!")
             
             # Insere gêneros e relacionamentos
-            insert_genres_with_mapping(df_genres, df_movie_genres, conn)
+            insert_genres_with_mapping(df_genres, df_movie_genres, conn, merge=merge)
             print(f"  ✅ Gêneros e relacionamentos carregados!\n")
             
         except Exception as e:
@@ -124,16 +304,21 @@ def load_silver_pipeline(recreate_schema=False):
             traceback.print_exc()
 
     # ========== PROCESSA OUTROS ARQUIVOS ==========
+    # Chunksize derivado do orçamento de memória (chunks vivos ao mesmo tempo:
+    # 1 no modo serial; leitura + transformação + carga no paralelo)
+    chunks_in_flight = transform_workers + load_workers + 1 if parallel else 1
     pipeline_config = {
         "ratings.csv": {
             "table": "silver.ratings_silver",
             "transform": transform_ratings,
-            "chunksize": 100_000
+            "chunksize": chunksize_for_memory("ratings.csv", max_memory_mb, chunks_in_flight),
+            "copy": True
         },
         "tags.csv": {
             "table": "silver.tags_silver",
             "transform": transform_tags,
-            "chunksize": 100_000
+            "chunksize": chunksize_for_memory("tags.csv", max_memory_mb, chunks_in_flight),
+            "copy": True
         },
         "links.csv": {
             "table": "silver.links_silver",
@@ -142,7 +327,16 @@ def load_silver_pipeline(recreate_schema=False):
     }
 
     for csv_file, config in pipeline_config.items():
-        if csv_file not in files:
+        manifest = None
+        if bronze_parquet and config.get("chunksize") and csv_file in BRONZE_DATASETS:
+            # Converte o CSV na primeira vez (ou se mudou); depois lê o Parquet.
+            # Falha na conversão/leitura da Bronze não derruba a pipeline: cai no CSV
+            try:
+                manifest = ensure_bronze_parquet(minio_client, csv_file)
+            except Exception as e:
+                print(f"  ⚠️  Bronze Parquet indisponível para {csv_file}, lendo o CSV: {e}")
+
+        if csv_file not in files and manifest is None:
             print(f"⚠️  {csv_file} não encontrado no bucket\n")
             continue
 
@@ -152,30 +346,71 @@ def load_silver_pipeline(recreate_schema=False):
             chunksize = config.get("chunksize", None)
             
             if chunksize:
-                print(f"  ⚠️  Arquivo grande - processando em chunks...")
-                chunk_iterator = minio_client.download_csv(BUCKET_RAW, csv_file, chunksize=chunksize)
-                total_inserted = 0
+                print(f"  ⚠️  Arquivo grande - processando em chunks de {chunksize:,} linhas...")
+                if manifest is not None:
+                    dataset = BRONZE_DATASETS[csv_file]
+                    print(f"  🧱 Lendo Bronze Parquet ({manifest['total_rows']:,} linhas, {len(manifest['rows_per_year'])} anos)")
+                    chunk_iterator = iter_bronze_chunks(minio_client, dataset, chunksize)
+                    ledger_source = f"bronze:{dataset}:{manifest['source_etag']}"
+                else:
+                    chunk_iterator = minio_client.download_csv(BUCKET_RAW, csv_file, chunksize=chunksize)
+                    ledger_source = csv_file
+                chunk_copy = use_copy and config.get("copy", False)
+                # Duplicados entre chunks são descartados antes do COPY, em vez
+                # de derrubarem o chunk inteiro na violação da PK
+                dedup = GlobalDeduplicator()
+                totals = MergeTotals()
+                if merge:
+                    chunk_load_fn = partial(merge_transformed, totals=totals)
+                else:
+                    chunk_load_fn = partial(insert_transformed, use_copy=chunk_copy)
 
-                for chunk_num, df_chunk in enumerate(chunk_iterator, 1):
-                    print(f"  - Chunk {chunk_num}: {len(df_chunk)} registros")
-                    
-                    df_transformed = config["transform"](df_chunk)
-                    
-                    if not df_transformed.empty:
-                        native_values = get_native_values(df_transformed)
-                        
-                        try:
-                            insert_dataframe(
-                                columns=df_transformed.columns.tolist(),
-                                table_name=config["table"],
-                                conn=conn,
-                                values=native_values
-                            )
-                            total_inserted += len(df_transformed)
-                        except Exception as e:
-                            print(f"    ❌ Erro ao inserir chunk {chunk_num}: {e}")
-                            conn.rollback()
+                if parallel:
+                    ledger = ChunkLedger(
+                        path=f"logs/silver_ledger_{csv_file}.json",
+                        source=ledger_source,
+                        chunksize=chunksize,
+                        reset=recreate_schema
+                    )
+                    # Retomada: os chunks commitados são pulados antes do
+                    # dedup, então suas chaves vêm da própria tabela. Semeia
+                    # sempre que a tabela já tem linhas, não só quando o ledger
+                    # tem chunks: um ledger descartado (chunksize ou origem
+                    # mudaram) recarrega tudo, e o dedup descarta o que já está
+                    # lá. No merge não (ON CONFLICT já absorve a repetição, e a
+                    # tabela tem chaves de drops anteriores que devem ser atualizadas)
+                    if ledger.discarded:
+                        print(f"  ⚠️  Ledger de {csv_file} descartado (origem/chunksize mudou): "
+                              f"recarregando todos os chunks")
+                    if not merge and table_has_rows(conn, config["table"]):
+                        seeded = dedup.seed_from_table(conn, config["table"])
+                        print(f"  ♻️  Retomando: {len(ledger.committed_chunks)} chunks já commitados "
+                              f"({seeded:,} chaves carregadas no dedup)")
+                    total_inserted, load_seconds = load_chunks_parallel(
+                        chunk_iterator,
+                        transform=config["transform"],
+                        table_name=config["table"],
+                        ledger=ledger,
+                        transform_workers=transform_workers,
+                        load_workers=load_workers,
+                        max_memory_mb=max_memory_mb,
+                        load_fn=chunk_load_fn,
+                        dedup=dedup
+                    )
+                    if ledger.failed_chunks:
+                        print(f"  ⚠️  Chunks com falha (reexecute para retomar): {ledger.failed_chunks}")
+                    else:
+                        ledger.clear()
+                else:
+                    total_inserted, load_seconds = load_chunks_serial(
+                        chunk_iterator, config["transform"], config["table"], conn,
+                        dedup=dedup, load_fn=chunk_load_fn
+                    )
 
+                dedup.report(config["table"])
+                if merge:
+                    totals.report(config["table"])
+                report_throughput(config["table"], total_inserted, load_seconds)
                 print(f"  ✅ {csv_file} carregado: {total_inserted} registros totais\n")
 
             else:
@@ -185,7 +420,15 @@ def load_silver_pipeline(recreate_schema=False):
                 
                 df_transformed = config["transform"](df)
                 
-                if not df_transformed.empty:
+                if merge:
+                    totals = MergeTotals()
+                    totals.add(merge_dataframe(
+                        df_transformed, config["table"], conn,
+                        key_columns=MERGE_KEYS[config["table"]]
+                    ))
+                    totals.report(config["table"])
+                    print(f"  ✅ {csv_file} carregado com sucesso!\n")
+                elif not df_transformed.empty:
                     native_values = get_native_values(df_transformed)
                     
                     try:
@@ -208,4 +451,19 @@ def load_silver_pipeline(recreate_schema=False):
             traceback.print_exc()
 
     conn.close()
+    phase_timings["load"] = time.perf_counter() - load_start
+
+    if bulk_load:
+        from src.pipelines.movielens.silver.schemas import build_deferred_indexes
+        phase_timings.update(build_deferred_indexes())
+    elif partitioned:
+        from src.pipelines.movielens.silver.schemas import maintain_ratings_partitions
+        print("📊 Analisando partições de ratings...")
+        phase_start = time.perf_counter()
+        maintain_ratings_partitions(vacuum=False)
+        phase_timings["analyze"] = time.perf_counter() - phase_start
+
+    print("⏱️  Tempo por fase:")
+    for phase, seconds in phase_timings.items():
+        print(f"  - {phase}: {seconds:.1f}s")
     print("=== Pipeline Silver Concluída ===\n")
\ No newline at end of file
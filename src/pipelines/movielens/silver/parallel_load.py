@@ -0,0 +1,203 @@
+"""
+Carga paralela de arquivos grandes da camada Silver (produtor/consumidor).
+
+Um leitor (thread principal) lê os chunks do CSV, N processos aplicam a
+transformação e M conexões carregam os chunks no Postgres. Um orçamento de
+memória limita quantos chunks ficam em voo, e um ledger por chunk registra
+o que já foi commitado para que uma nova execução só refaça os que falharam.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from settings.db import get_connection, copy_dataframe
+
+
+class MemoryBudget:
+    """Limita os bytes de chunks em voo (lidos e ainda não carregados)."""
+
+    def __init__(self, max_mb):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, nbytes):
+        """Bloqueia até haver espaço (um chunk sozinho sempre passa)."""
+        with self.cond:
+            while self.used > 0 and self.used + nbytes > self.max_bytes:
+                self.cond.wait()
+            self.used += nbytes
+
+    def release(self, nbytes):
+        with self.cond:
+            self.used -= nbytes
+            self.cond.notify_all()
+
+
+class ChunkLedger:
+    """Registro em disco dos chunks commitados/falhos de um arquivo."""
+
+    def __init__(self, path, source, chunksize, reset=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True)
+        self.lock = threading.Lock()
+        if reset:
+            self.clear()
+        self.state = self._load(source, chunksize)
+
+    def _load(self, source, chunksize):
+        """
+        Carrega o ledger; descarta se for de outro arquivo/chunksize
+        (self.discarded indica que os chunks commitados registrados nele
+        foram esquecidos, mas as linhas continuam na tabela).
+        """
+        self.discarded = False
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            if state.get("source") == source and state.get("chunksize") == chunksize:
+                return state
+            self.discarded = bool(state.get("committed"))
+        return {"source": source, "chunksize": chunksize, "committed": {}, "failed": {}}
+
+    def _save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+
+    def is_committed(self, chunk_num):
+        return str(chunk_num) in self.state["committed"]
+
+    def mark_committed(self, chunk_num, rows):
+        with self.lock:
+            self.state["committed"][str(chunk_num)] = rows
+            self.state["failed"].pop(str(chunk_num), None)
+            self._save()
+
+    def mark_failed(self, chunk_num, error):
+        with self.lock:
+            self.state["failed"][str(chunk_num)] = str(error)
+            self._save()
+
+    @property
+    def committed_chunks(self):
+        return sorted(int(n) for n in self.state["committed"])
+
+    @property
+    def failed_chunks(self):
+        return sorted(int(n) for n in self.state["failed"])
+
+    def clear(self):
+        """Remove o ledger (arquivo carregado por completo)."""
+        if self.path.exists():
+            self.path.unlink()
+
+
+def _copy_load(df, table_name, conn):
+    """Carga padrão: COPY FROM STDIN."""
+    copy_dataframe(df, table_name, conn)
+
+
+def load_chunks_parallel(chunk_iterator, transform, table_name, ledger,
+                         transform_workers=2, load_workers=2,
+                         max_memory_mb=1024, max_retries=3, load_fn=None,
+                         dedup=None):
+    """
+    Lê, transforma e carrega chunks em paralelo.
+
+    Args:
+        chunk_iterator: Iterador de DataFrames (ex: download_csv com chunksize)
+        transform: Função de transformação (precisa ser picklable)
+        table_name: Tabela destino
+        ledger: ChunkLedger do arquivo
+        transform_workers: Processos de transformação (N)
+        load_workers: Conexões de carga (M)
+        max_memory_mb: Teto de memória para chunks em voo
+        max_retries: Tentativas de carga por chunk
+        load_fn: Função (df, table_name, conn) de carga; padrão é COPY
+        dedup: GlobalDeduplicator opcional; descarta linhas cuja chave já
+            apareceu em outro chunk antes da carga. Chunks já commitados no
+            ledger são pulados sem passar por ele: ao retomar, semeie o
+            dedup com as chaves da tabela (seed_from_table)
+
+    Returns:
+        (total de linhas carregadas, segundos de carga somados)
+    """
+    load_fn = load_fn or _copy_load
+    budget = MemoryBudget(max_mb=max_memory_mb)
+    local = threading.local()
+    connections = []
+    conn_lock = threading.Lock()
+    stats = {"rows": 0, "seconds": 0.0}
+    stats_lock = threading.Lock()
+
+    def get_thread_connection():
+        if not hasattr(local, "conn"):
+            local.conn = get_connection()
+            with conn_lock:
+                connections.append(local.conn)
+        return local.conn
+
+    def load_chunk(chunk_num, df, nbytes):
+        try:
+            # Filtra uma única vez: as chaves ficam reservadas e as
+            # retentativas reutilizam o mesmo df filtrado
+            if dedup is not None:
+                df = dedup.filter(df)
+            if df.empty:
+                ledger.mark_committed(chunk_num, 0)
+                return
+            conn = get_thread_connection()
+            for attempt in range(1, max_retries + 1):
+                try:
+                    start = time.perf_counter()
+                    load_fn(df, table_name, conn)
+                    elapsed = time.perf_counter() - start
+                    ledger.mark_committed(chunk_num, len(df))
+                    with stats_lock:
+                        stats["rows"] += len(df)
+                        stats["seconds"] += elapsed
+                    return
+                except Exception as e:
+                    conn.rollback()
+                    if attempt == max_retries:
+                        print(f"    ❌ Chunk {chunk_num} falhou após {attempt} tentativas: {e}")
+                        ledger.mark_failed(chunk_num, e)
+                    else:
+                        time.sleep(2 ** (attempt - 1))
+        finally:
+            budget.release(nbytes)
+
+    # O pool de transformação fecha primeiro: seu shutdown aguarda todos os
+    # callbacks, que agendam as cargas antes do pool de carga ser fechado.
+    with ThreadPoolExecutor(max_workers=load_workers) as load_pool, \
+            ProcessPoolExecutor(max_workers=transform_workers) as transform_pool:
+
+        def on_transformed(future, chunk_num, nbytes):
+            try:
+                df = future.result()
+            except Exception as e:
+                print(f"    ❌ Erro ao transformar chunk {chunk_num}: {e}")
+                ledger.mark_failed(chunk_num, e)
+                budget.release(nbytes)
+                return
+            load_pool.submit(load_chunk, chunk_num, df, nbytes)
+
+        for chunk_num, df_chunk in enumerate(chunk_iterator, 1):
+            if ledger.is_committed(chunk_num):
+                print(f"  - Chunk {chunk_num}: já commitado, pulando")
+                continue
+
+            nbytes = int(df_chunk.memory_usage(deep=True).sum())
+            budget.acquire(nbytes)
+            print(f"  - Chunk {chunk_num}: {len(df_chunk)} registros")
+
+            future = transform_pool.submit(transform, df_chunk)
+            future.add_done_callback(
+                lambda f, n=chunk_num, b=nbytes: on_transformed(f, n, b)
+            )
+
+    for conn in connections:
+        conn.close()
+
+    return stats["rows"], stats["seconds"]
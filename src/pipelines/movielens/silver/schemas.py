@@ -1,3 +1,8 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from settings.db import get_connection
+
 CREATE_SILVER_SCHEMA = """
 -- Remover schema antigo se existir
 DROP SCHEMA IF EXISTS silver CASCADE;
@@ -30,24 +35,13 @@ CREATE TABLE silver.movie_genres_silver (
     FOREIGN KEY (genre_id) REFERENCES silver.genres_silver(genre_id) ON DELETE CASCADE
 );
 
--- Tabela de ratings
-CREATE TABLE silver.ratings_silver (
-    userid INTEGER NOT NULL,
-    movieid INTEGER NOT NULL,
-    rating NUMERIC(2,1) NOT NULL CHECK (rating >= 0.5 AND rating <= 5.0),
-    timestamp BIGINT NOT NULL,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (userid, movieid, timestamp)
-);
-
 -- Tabela de tags
 CREATE TABLE silver.tags_silver (
     userid INTEGER NOT NULL,
     movieid INTEGER NOT NULL,
     tag VARCHAR(255),
     timestamp BIGINT NOT NULL,
-    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (userid, movieid, timestamp)
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Tabela de links
@@ -59,11 +53,9 @@ CREATE TABLE silver.links_silver (
 );
 
 -- Índices para melhorar performance
+-- (PKs e índices de ratings/tags ficam em DEFERRED_INDEXES)
 CREATE INDEX idx_movie_genres_movieid ON silver.movie_genres_silver(movieid);
 CREATE INDEX idx_movie_genres_genreid ON silver.movie_genres_silver(genre_id);
-CREATE INDEX idx_ratings_movieid ON silver.ratings_silver(movieid);
-CREATE INDEX idx_ratings_userid ON silver.ratings_silver(userid);
-CREATE INDEX idx_tags_movieid ON silver.tags_silver(movieid);
 CREATE INDEX idx_movies_title ON silver.movies_silver(title);
 CREATE INDEX idx_movies_year ON silver.movies_silver(release_year);
 
@@ -83,14 +75,337 @@ GROUP BY m.movieid, m.title, m.release_year;
 COMMENT ON TABLE silver.movies_silver IS 'Dados de filmes na camada Silver (sem gêneros inline)';
 COMMENT ON TABLE silver.genres_silver IS 'Gêneros únicos normalizados';
 COMMENT ON TABLE silver.movie_genres_silver IS 'Relacionamento N:N entre filmes e gêneros';
-COMMENT ON TABLE silver.ratings_silver IS 'Avaliações de usuários na camada Silver';
 COMMENT ON TABLE silver.tags_silver IS 'Tags atribuídas por usuários na camada Silver';
 COMMENT ON TABLE silver.links_silver IS 'Links externos (IMDB, TMDB) na camada Silver';
 """
 
-def create_silver_tables(conn):
-    """Cria as tabelas Silver no Postgres"""
+# Tabela de ratings (heap único)
+CREATE_RATINGS_TABLE = """
+CREATE TABLE silver.ratings_silver (
+    userid INTEGER NOT NULL,
+    movieid INTEGER NOT NULL,
+    rating NUMERIC(2,1) NOT NULL CHECK (rating >= 0.5 AND rating <= 5.0),
+    timestamp BIGINT NOT NULL,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE silver.ratings_silver IS 'Avaliações de usuários na camada Silver';
+"""
+
+# Tabela de ratings particionada por ano (RANGE em timestamp, epoch UTC)
+CREATE_RATINGS_PARTITIONED = """
+CREATE TABLE silver.ratings_silver (
+    userid INTEGER NOT NULL,
+    movieid INTEGER NOT NULL,
+    rating NUMERIC(2,1) NOT NULL CHECK (rating >= 0.5 AND rating <= 5.0),
+    timestamp BIGINT NOT NULL,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE silver.ratings_silver_default PARTITION OF silver.ratings_silver DEFAULT;
+
+COMMENT ON TABLE silver.ratings_silver IS 'Avaliações de usuários na camada Silver (partições anuais por timestamp)';
+"""
+
+# Anos com partição própria (o restante cai em ratings_silver_default)
+RATINGS_PARTITION_FIRST_YEAR = 1995
+
+# Tabelas grandes: no modo bulk load são criadas UNLOGGED e sem índices
+BULK_LOAD_TABLES = ["silver.ratings_silver", "silver.tags_silver"]
+
+# (tabela, índice, colunas, é PK) das tabelas grandes. No modo normal são
+# criados junto com o schema; no modo bulk load, só depois da carga.
+DEFERRED_INDEXES = [
+    ("silver.ratings_silver", "ratings_silver_pkey", "userid, movieid, timestamp", True),
+    ("silver.ratings_silver", "idx_ratings_movieid", "movieid", False),
+    ("silver.ratings_silver", "idx_ratings_userid", "userid", False),
+    ("silver.tags_silver", "tags_silver_pkey", "userid, movieid, timestamp", True),
+    ("silver.tags_silver", "idx_tags_movieid", "movieid", False),
+]
+
+
+def year_epoch_bounds(year):
+    """Retorna (início, fim) do ano em epoch UTC, fim exclusivo."""
+    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def ratings_partition_name(year):
+    return f"silver.ratings_silver_y{year}"
+
+
+def create_ratings_partition(cur, year, unlogged=False):
+    """Cria a partição anual de ratings_silver, se ainda não existir."""
+    start, end = year_epoch_bounds(year)
+    persistence = "UNLOGGED " if unlogged else ""
+    cur.execute(
+        f"CREATE {persistence}TABLE IF NOT EXISTS {ratings_partition_name(year)} "
+        f"PARTITION OF silver.ratings_silver FOR VALUES FROM ({start}) TO ({end})"
+    )
+
+
+def get_leaf_tables(cur, table):
+    """Partições folha de uma tabela (a própria tabela se não particionada)."""
+    cur.execute(
+        "SELECT relid::regclass::text FROM pg_partition_tree(%s::regclass) WHERE isleaf",
+        (table,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (table,))
+    return cur.fetchone()[0]
+
+
+def _index_ddl(table, name, columns, primary_key):
+    """DDL do índice direto na tabela (ou no pai, propagando às partições)."""
+    if primary_key:
+        return f"ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY ({columns})"
+    return f"CREATE INDEX {name} ON {table}({columns})"
+
+
+def _leaf_index_name(table, leaf, name):
+    """Nome do índice na folha (igual ao original se a tabela não é particionada)."""
+    if leaf == table:
+        return name
+    return f"{leaf.split('.')[-1]}_{name}"
+
+
+def create_silver_tables(conn, bulk_load=False, partitioned=False, last_year=None):
+    """
+    Cria as tabelas Silver no Postgres
+
+    Com bulk_load=True, ratings e tags são criadas UNLOGGED e sem PK/índices;
+    chame build_deferred_indexes depois da carga.
+    Com partitioned=True, ratings_silver é particionada por ano de timestamp
+    (RATINGS_PARTITION_FIRST_YEAR até last_year, padrão: ano atual + 1).
+    """
+    last_year = last_year or datetime.now().year + 1
     with conn.cursor() as cur:
         cur.execute(CREATE_SILVER_SCHEMA)
+        if partitioned:
+            cur.execute(CREATE_RATINGS_PARTITIONED)
+            for year in range(RATINGS_PARTITION_FIRST_YEAR, last_year + 1):
+                create_ratings_partition(cur, year)
+        else:
+            cur.execute(CREATE_RATINGS_TABLE)
+
+        if bulk_load:
+            for table in BULK_LOAD_TABLES:
+                for leaf in get_leaf_tables(cur, table):
+                    cur.execute(f"ALTER TABLE {leaf} SET UNLOGGED")
+        else:
+            for table, name, columns, primary_key in DEFERRED_INDEXES:
+                cur.execute(_index_ddl(table, name, columns, primary_key))
+        conn.commit()
+    mode = " (bulk load: UNLOGGED, sem índices)" if bulk_load else ""
+    layout = " [ratings particionada por ano]" if partitioned else ""
+    print(f"✓ Schema Silver criado com sucesso!{mode}{layout}")
+
+
+def _build_index(ddl, maintenance_work_mem):
+    """Executa um CREATE INDEX em conexão própria e retorna o tempo gasto."""
+    start = time.perf_counter()
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+            cur.execute(ddl)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def _remove_duplicate_keys(table, columns, work_mem):
+    """
+    Valida a chave antes do índice único: se houver linhas repetidas em
+    columns, remove as extras (mantém a primeira gravada, como o dedup da
+    carga). Retorna (linhas removidas, segundos).
+    """
+    start = time.perf_counter()
+    removed = 0
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SET work_mem = '{work_mem}'")
+            cur.execute(
+                f"SELECT EXISTS (SELECT 1 FROM {table} GROUP BY {columns} HAVING COUNT(*) > 1)"
+            )
+            if cur.fetchone()[0]:
+                cur.execute(
+                    f"""
+                    DELETE FROM {table} t USING (
+                        SELECT ctid FROM (
+                            SELECT ctid, ROW_NUMBER() OVER (PARTITION BY {columns} ORDER BY ctid) AS rn
+                            FROM {table}
+                        ) ranked
+                        WHERE rn > 1
+                    ) dup
+                    WHERE t.ctid = dup.ctid
+                    """
+                )
+                removed = cur.rowcount
         conn.commit()
-    print("✓ Schema Silver criado com sucesso!")
\ No newline at end of file
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return removed, time.perf_counter() - start
+
+
+def build_deferred_indexes(max_workers=4, maintenance_work_mem="512MB"):
+    """
+    Finaliza o modo bulk load: valida as chaves (linhas repetidas entre
+    chunks são removidas antes do índice único, em vez de derrubarem o
+    CREATE UNIQUE INDEX depois da carga inteira), constrói os índices em
+    paralelo (uma conexão por índice e partição), promove os índices únicos
+    a PRIMARY KEY, volta as tabelas para LOGGED e roda ANALYZE.
+
+    Em tabelas particionadas os índices são construídos por partição e
+    depois anexados ao pai (o CREATE INDEX/ADD PRIMARY KEY no pai só os
+    reaproveita, sem reconstruir).
+
+    Returns:
+        Dict com o tempo (segundos) de cada fase
+    """
+    timings = {}
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            leaves = {table: get_leaf_tables(cur, table) for table in BULK_LOAD_TABLES}
+            partitioned = {table: is_partitioned(cur, table) for table in BULK_LOAD_TABLES}
+
+        print("🔎 Validando chaves antes dos índices únicos...")
+        start = time.perf_counter()
+        checks = [
+            (leaf, columns)
+            for table, name, columns, primary_key in DEFERRED_INDEXES if primary_key
+            for leaf in leaves[table]
+        ]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_remove_duplicate_keys, leaf, columns, maintenance_work_mem): leaf
+                for leaf, columns in checks
+            }
+            for future, leaf in futures.items():
+                removed, seconds = future.result()
+                if removed:
+                    print(f"  ⚠️  {leaf}: {removed:,} linhas com chave repetida removidas ({seconds:.1f}s)")
+                else:
+                    print(f"  ✓ {leaf}: chaves únicas ({seconds:.1f}s)")
+        timings["validate_keys"] = time.perf_counter() - start
+
+        print("🔨 Construindo índices deferidos...")
+        start = time.perf_counter()
+        jobs = []
+        for table, name, columns, primary_key in DEFERRED_INDEXES:
+            unique = "UNIQUE " if primary_key else ""
+            for leaf in leaves[table]:
+                leaf_name = _leaf_index_name(table, leaf, name)
+                jobs.append(f"CREATE {unique}INDEX {leaf_name} ON {leaf}({columns})")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_build_index, ddl, maintenance_work_mem): ddl
+                for ddl in jobs
+            }
+            for future, ddl in futures.items():
+                print(f"  ✓ {ddl.split(' ON ')[0]} ({future.result():.1f}s)")
+        timings["indexes"] = time.perf_counter() - start
+
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            for table, name, columns, primary_key in DEFERRED_INDEXES:
+                if primary_key:
+                    for leaf in leaves[table]:
+                        leaf_name = _leaf_index_name(table, leaf, name)
+                        cur.execute(
+                            f"ALTER TABLE {leaf} ADD CONSTRAINT {leaf_name} "
+                            f"PRIMARY KEY USING INDEX {leaf_name}"
+                        )
+                if partitioned[table]:
+                    cur.execute(_index_ddl(table, name, columns, primary_key))
+            conn.commit()
+            timings["primary_keys"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for table in BULK_LOAD_TABLES:
+                for leaf in leaves[table]:
+                    cur.execute(f"ALTER TABLE {leaf} SET LOGGED")
+            conn.commit()
+            timings["set_logged"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for table in BULK_LOAD_TABLES:
+                cur.execute(f"ANALYZE {table}")
+            conn.commit()
+            timings["analyze"] = time.perf_counter() - start
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print("✓ Índices, PKs e LOGGED aplicados")
+    return timings
+
+
+def attach_ratings_partition(conn, year, source_table, replace=False):
+    """
+    Anexa uma tabela já carregada (ex: novo dump de ratings de um ano) como
+    partição anual de ratings_silver.
+
+    Um CHECK com os limites do ano é criado antes do ATTACH, para o Postgres
+    não precisar varrer a tabela para validar. Com replace=True, a partição
+    existente do ano é desanexada e removida.
+    """
+    start, end = year_epoch_bounds(year)
+    partition = ratings_partition_name(year)
+    with conn.cursor() as cur:
+        if replace:
+            cur.execute("SELECT to_regclass(%s)", (partition,))
+            if cur.fetchone()[0]:
+                cur.execute(f"ALTER TABLE silver.ratings_silver DETACH PARTITION {partition}")
+                cur.execute(f"DROP TABLE {partition}")
+            if source_table != partition:
+                cur.execute(f"ALTER TABLE {source_table} RENAME TO {partition.split('.')[-1]}")
+                source_table = partition
+
+        cur.execute(
+            f"ALTER TABLE {source_table} ADD CONSTRAINT {source_table.split('.')[-1]}_year_check "
+            f"CHECK (timestamp >= {start} AND timestamp < {end})"
+        )
+        cur.execute(
+            f"ALTER TABLE silver.ratings_silver ATTACH PARTITION {source_table} "
+            f"FOR VALUES FROM ({start}) TO ({end})"
+        )
+        conn.commit()
+    print(f"✓ {source_table} anexada como partição de {year}")
+
+
+def maintain_ratings_partitions(years=None, vacuum=True):
+    """
+    Roda VACUUM ANALYZE (ou só ANALYZE) partição por partição em
+    ratings_silver. Com years, só nas partições desses anos.
+    """
+    conn = get_connection()
+    conn.autocommit = True  # VACUUM não roda dentro de transação
+    try:
+        with conn.cursor() as cur:
+            if years:
+                partitions = [ratings_partition_name(year) for year in years]
+            else:
+                partitions = get_leaf_tables(cur, "silver.ratings_silver")
+            command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+            for partition in partitions:
+                start = time.perf_counter()
+                cur.execute(f"{command} {partition}")
+                print(f"  ✓ {command} {partition} ({time.perf_counter() - start:.1f}s)")
+    finally:
+        conn.close()
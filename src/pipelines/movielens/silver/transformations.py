@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import re
 
 def transform_movies(df):
@@ -75,38 +76,83 @@ def transform_movie_genres(df_movies):
     return df_genres, df_movie_genres
 
 
+# Bytes estimados por linha durante a carga (chunk Arrow + DataFrame +
+# máscara/saída do transform + buffer CSV do COPY), com tipos compactos
+ESTIMATED_ROW_BYTES = {
+    "ratings.csv": 96,
+    "tags.csv": 224,
+}
+
+
+def chunksize_for_memory(csv_file, max_memory_mb, chunks_in_flight=1,
+                         min_rows=50_000, max_rows=2_000_000):
+    """
+    Escolhe o chunksize que cabe em max_memory_mb.
+
+    Args:
+        csv_file: Arquivo (ratings.csv / tags.csv)
+        max_memory_mb: Memória disponível para os chunks
+        chunks_in_flight: Chunks vivos ao mesmo tempo (1 no modo serial;
+            leitura + transformação + carga no modo paralelo)
+    """
+    row_bytes = ESTIMATED_ROW_BYTES.get(csv_file, 256)
+    rows = int(max_memory_mb * 1024 * 1024 / (row_bytes * max(1, chunks_in_flight)))
+    return max(min_rows, min(max_rows, rows))
+
+
+def _compact_numeric(series, dtype):
+    """Converte para numérico sem cópia se o tipo já é o compacto."""
+    if series.dtype == dtype:
+        return series
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    return pd.to_numeric(series, errors='coerce')
+
+
+def _clean_tags(tags):
+    """
+    strip + lower calculados só sobre os valores distintos (categorical).
+    Nulos têm código -1, que cai no None acrescentado ao fim das categorias
+    (também num chunk sem nenhuma tag, sem categorias).
+    """
+    categorical = tags.astype('category')
+    cleaned = categorical.cat.categories.astype(str).str.strip().str.lower()
+    codes = categorical.cat.codes.to_numpy()
+    values = np.append(cleaned.to_numpy(dtype=object), None)[codes]
+    return pd.Series(values, index=tags.index, dtype=object)
+
+
 def transform_ratings(df):
     """
     Transforma dados de ratings:
     - Remove duplicados
     - Valida range de ratings (0.5 a 5.0)
     - Remove registros inválidos
+
+    Tipos compactos (int32 ids, float32 rating, int64 timestamp) e uma única
+    máscara booleana: só a saída final é materializada.
     """
     print(f"  Transformando ratings: {len(df)} registros originais")
     
     # Renomeia colunas para lowercase
     df.columns = df.columns.str.lower()
     
-    # Remove duplicados
-    df = df.drop_duplicates(subset=['userid', 'movieid', 'timestamp'], keep='first')
-    
-    # Converte para tipos nativos do Python
-    df['userid'] = pd.to_numeric(df['userid'], errors='coerce').astype('Int64')
-    df['movieid'] = pd.to_numeric(df['movieid'], errors='coerce').astype('Int64')
-    df['rating'] = pd.to_numeric(df['rating'], errors='coerce').astype(float)
-    df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce').astype('Int64')
-    
-    # Remove registros com valores nulos
-    df = df.dropna()
-    
-    # Valida range de ratings
-    df = df[(df['rating'] >= 0.5) & (df['rating'] <= 5.0)]
-    
-    # Converte para tipos Python puros
-    df['userid'] = df['userid'].astype(int)
-    df['movieid'] = df['movieid'].astype(int)
-    df['timestamp'] = df['timestamp'].astype(int)
-    df['rating'] = df['rating'].astype(float)
+    userid = _compact_numeric(df['userid'], 'int32')
+    movieid = _compact_numeric(df['movieid'], 'int32')
+    rating = _compact_numeric(df['rating'], 'float32')
+    timestamp = _compact_numeric(df['timestamp'], 'int64')
+    
+    # Duplicados, nulos e range de rating numa máscara só
+    mask = ~df.duplicated(subset=['userid', 'movieid', 'timestamp'], keep='first')
+    mask &= userid.notna() & movieid.notna() & timestamp.notna()
+    mask &= rating.between(0.5, 5.0)
+    
+    df = pd.DataFrame({
+        'userid': userid[mask].astype('int32', copy=False),
+        'movieid': movieid[mask].astype('int32', copy=False),
+        'rating': rating[mask].astype('float32', copy=False),
+        'timestamp': timestamp[mask].astype('int64', copy=False),
+    })
     
     print(f"  ✓ Ratings transformados: {len(df)} registros finais")
     return df
@@ -118,32 +164,29 @@ def transform_tags(df):
     - Remove duplicados
     - Limpa tags (lowercase, remove espaços extras)
     - Remove tags vazias
+
+    Mesma abordagem de transform_ratings: tipos compactos e uma máscara.
     """
     print(f"  Transformando tags: {len(df)} registros originais")
     
     # Renomeia colunas para lowercase
     df.columns = df.columns.str.lower()
     
-    # Remove duplicados
-    df = df.drop_duplicates(subset=['userid', 'movieid', 'timestamp'], keep='first')
-    
-    # Limpa tags
-    df['tag'] = df['tag'].str.strip().str.lower()
+    userid = _compact_numeric(df['userid'], 'int32')
+    movieid = _compact_numeric(df['movieid'], 'int32')
+    timestamp = _compact_numeric(df['timestamp'], 'int64')
+    tag = _clean_tags(df['tag'])
     
-    # Remove tags vazias ou nulas
-    df = df[df['tag'].notna() & (df['tag'] != '')]
-    
-    # Garante tipos corretos
-    df['userid'] = pd.to_numeric(df['userid'], errors='coerce').astype('Int64')
-    df['movieid'] = pd.to_numeric(df['movieid'], errors='coerce').astype('Int64')
-    df['timestamp'] = pd.to_numeric(df['timestamp'], errors='coerce').astype('Int64')
+    mask = ~df.duplicated(subset=['userid', 'movieid', 'timestamp'], keep='first')
+    mask &= tag.notna() & (tag != '')
+    mask &= userid.notna() & movieid.notna() & timestamp.notna()
     
-    # Remove registros com valores nulos
-    df = df.dropna()
-    
-    df['userid'] = df['userid'].astype(int)
-    df['movieid'] = df['movieid'].astype(int)
-    df['timestamp'] = df['timestamp'].astype(int)
+    df = pd.DataFrame({
+        'userid': userid[mask].astype('int32', copy=False),
+        'movieid': movieid[mask].astype('int32', copy=False),
+        'tag': tag[mask],
+        'timestamp': timestamp[mask].astype('int64', copy=False),
+    })
     
     print(f"  ✓ Tags transformados: {len(df)} registros finais")
     return df
@@ -1,4 +1,6 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from typing import Optional, Dict, List
 from datetime import datetime
 import time
@@ -45,8 +47,20 @@ class TMDBCreditsExtractor:
             logger.error(f"❌ Erro ao listar filmes: {e}")
             return []
     
-    def get_existing_credits(self) -> set:
-        """Retorna set de IDs de créditos já extraídos."""
+    def get_existing_credits(self, max_workers: int = 16) -> set:
+        """
+        Retorna set de IDs (movielens_id) de créditos já extraídos: arquivos
+        credits/{id}.parquet e os lotes gravados pela extração de filmes com
+        --with-credits (credits_v3/ e credits_delta/), lendo só a coluna
+        'movielens_id' de cada lote.
+        """
+        def read_movielens_ids(data: pa.Buffer) -> List[int]:
+            parquet_file = pq.ParquetFile(pa.BufferReader(data))
+            if 'movielens_id' not in parquet_file.schema_arrow.names:
+                return []
+            table = parquet_file.read(columns=['movielens_id'])
+            return [int(mid) for mid in table.column('movielens_id').to_pylist() if mid is not None]
+        
         try:
             objects = self.minio_client.list_objects(self.bucket, prefix="credits/")
             existing = set()
@@ -56,13 +70,52 @@ class TMDBCreditsExtractor:
                 if movie_id.isdigit():
                     existing.add(int(movie_id))
             
-            logger.info(f"📁 {len(existing)} créditos já existem no MinIO")
+            batch_keys = [
+                obj
+                for prefix in ("credits_v3/", "credits_delta/")
+                for obj in self.minio_client.list_objects(self.bucket, prefix=prefix, recursive=True)
+                if obj.endswith(".parquet")
+            ]
+            if batch_keys:
+                downloads = self.minio_client.download_many(
+                    self.bucket, batch_keys, max_workers=max_workers, parser=read_movielens_ids
+                )
+                for _, movielens_ids in downloads:
+                    if movielens_ids:
+                        existing.update(movielens_ids)
+            
+            logger.info(f"📁 {len(existing)} créditos já existem no MinIO ({len(batch_keys)} lotes V3/delta)")
             return existing
         
         except Exception as e:
             logger.error(f"❌ Erro ao listar créditos existentes: {e}")
             return set()
     
+    def get_tmdb_ids(self, movie_ids: List[int], max_workers: int = 16) -> Dict[int, int]:
+        """
+        Lê o tmdb_id de cada movies/{id}.parquet com downloads paralelos
+        (MinioClient.download_many), lendo só a coluna 'id'.
+        """
+        def read_tmdb_id(data: pa.Buffer) -> Optional[int]:
+            parquet_file = pq.ParquetFile(pa.BufferReader(data))
+            if 'id' not in parquet_file.schema_arrow.names:
+                return None
+            table = parquet_file.read(columns=['id'])
+            return table.column('id')[0].as_py() if table.num_rows else None
+        
+        keys = [f"movies/{movie_id}.parquet" for movie_id in movie_ids]
+        tmdb_ids = {}
+        downloads = self.minio_client.download_many(
+            self.bucket, keys, max_workers=max_workers, parser=read_tmdb_id
+        )
+        for object_name, tmdb_id in downloads:
+            if tmdb_id is not None:
+                movie_id = int(object_name.replace("movies/", "").replace(".parquet", ""))
+                tmdb_ids[movie_id] = int(tmdb_id)
+        
+        logger.info(f"🔑 {len(tmdb_ids):,} TMDB IDs lidos ({self.minio_client.last_download_stats})")
+        return tmdb_ids
+    
     def extract_credits(self, movie_id: int, tmdb_id: int) -> Optional[Dict]:
         """Extrai créditos de um filme."""
         try:
@@ -125,24 +178,21 @@ class TMDBCreditsExtractor:
         logger.info(f"📊 Total a processar: {total:,}")
         logger.info("=" * 80)
         
+        # TMDB IDs de todos os filmes de uma vez (downloads em paralelo)
+        tmdb_ids = self.get_tmdb_ids(movie_ids)
+        
         # Barra de progresso
         with tqdm(total=total, desc="🎭 Extraindo créditos", unit="filme") as pbar:
             for movie_id in movie_ids:
                 try:
-                    # Ler arquivo do filme para pegar tmdb_id
-                    movie_data = self.minio_client.download_parquet(
-                        self.bucket,
-                        f"movies/{movie_id}.parquet"
-                    )
+                    tmdb_id = tmdb_ids.get(movie_id)
                     
-                    if movie_data.empty or 'id' not in movie_data.columns:
+                    if tmdb_id is None:
                         logger.warning(f"⚠️  TMDB ID não encontrado para filme {movie_id}")
                         error_count += 1
                         pbar.update(1)
                         continue
                     
-                    tmdb_id = int(movie_data['id'].iloc[0])
-                    
                     # Extrair créditos
                     credits_data = self.extract_credits(movie_id, tmdb_id)
                     
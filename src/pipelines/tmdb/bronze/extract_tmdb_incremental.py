@@ -0,0 +1,200 @@
+"""
+Extração INCREMENTAL TMDB - guiada pelo feed de alterações (/movie/changes)
+
+Em vez de percorrer todo o catálogo MovieLens, busca os IDs que o TMDB
+reporta como alterados desde o último high-water mark, cruza com
+links_silver.tmdbid e re-extrai só esses filmes para uma partição delta
+(uma subpasta por execução, para duas execuções no mesmo dia não se
+sobrescreverem):
+
+    bronze-tmdb/movies_delta/dt=YYYY-MM-DD/run=HHMMSS/batch_NNNNN.parquet
+    bronze-tmdb/credits_delta/dt=YYYY-MM-DD/run=HHMMSS/batch_NNNNN.parquet  (--with-credits)
+    bronze-tmdb/movies_delta/dt=YYYY-MM-DD/run=HHMMSS/_manifest.json
+
+O high-water mark só avança quando não houve falhas transitórias (erro após
+as retentativas); com elas, a próxima execução repete a janela a partir do
+mesmo ponto. Filmes que não existem no TMDB (removidos, adultos: 404 e /find
+vazio) não seguram o high-water mark: são listados no manifest.
+"""
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+import pandas as pd
+from src.pipelines.tmdb.bronze.extract_tmdb_movies import TMDBMoviesExtractorV3
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__, "tmdb_bronze_incremental.log")
+
+WATERMARK_FILE = Path("logs/tmdb_changes_watermark.json")
+CHANGES_MAX_WINDOW_DAYS = 14  # limite do endpoint /movie/changes
+
+
+def load_watermark() -> Optional[date]:
+    """Data do último refresh incremental concluído (None se nunca rodou)."""
+    if WATERMARK_FILE.exists():
+        with open(WATERMARK_FILE, 'r') as f:
+            return date.fromisoformat(json.load(f)["high_water_mark"])
+    return None
+
+
+def save_watermark(high_water_mark: date, stats: dict):
+    """Avança o high-water mark (só após todos os batches salvos)."""
+    WATERMARK_FILE.parent.mkdir(exist_ok=True)
+    with open(WATERMARK_FILE, 'w') as f:
+        json.dump({
+            "high_water_mark": high_water_mark.isoformat(),
+            "updated_at": datetime.now().isoformat(),
+            "last_run": stats
+        }, f, indent=2)
+
+
+def change_windows(start: date, end: date) -> List[Tuple[str, str]]:
+    """Divide [start, end] em janelas de até 14 dias para /movie/changes."""
+    windows = []
+    current = start
+    while current <= end:
+        window_end = min(current + timedelta(days=CHANGES_MAX_WINDOW_DAYS - 1), end)
+        windows.append((current.isoformat(), window_end.isoformat()))
+        current = window_end + timedelta(days=1)
+    return windows
+
+
+async def fetch_changed_ids(client, windows: List[Tuple[str, str]]) -> Set[int]:
+    """União dos IDs alterados em todas as janelas."""
+    changed = set()
+    for start_date, end_date in windows:
+        ids = await client.get_changed_movie_ids(start_date, end_date)
+        logger.info(f"  🔎 {start_date} → {end_date}: {len(ids):,} filmes alterados no TMDB")
+        changed |= ids
+    return changed
+
+
+def filter_changed_movies(movies_df: pd.DataFrame, changed_ids: Set[int]) -> pd.DataFrame:
+    """Mantém só os filmes MovieLens cujo tmdbid está no feed de alterações."""
+    tmdb_ids = pd.to_numeric(movies_df['tmdbid'], errors='coerce')
+    return movies_df[tmdb_ids.isin(changed_ids)].reset_index(drop=True)
+
+
+def run_incremental_extraction(
+    since: Optional[date] = None,
+    batch_size: int = 2000,
+    max_workers: int = 10,
+    with_credits: bool = False,
+    use_cache: bool = True
+):
+    """
+    Executa a extração incremental.
+
+    Args:
+        since: Início da janela; padrão é o high-water mark salvo
+            (ou ontem, na primeira execução)
+        batch_size: Filmes por arquivo Parquet da partição delta
+        max_workers: Requisições simultâneas
+        with_credits: Extrai créditos na mesma requisição (append_to_response)
+        use_cache: Usa o cache HTTP (filmes alterados são sempre revalidados)
+    """
+    start_time = time.time()
+    run_started = datetime.now()
+    run_date = run_started.date()
+    run_id = run_started.strftime("%H%M%S")
+    since = since or load_watermark()
+    if since is None:
+        since = run_date - timedelta(days=1)
+        logger.warning(f"⚠️  Sem high-water mark salvo, usando {since.isoformat()}")
+
+    logger.info("=" * 80)
+    logger.info("🔁 EXTRAÇÃO TMDB INCREMENTAL (feed de alterações)")
+    logger.info(f"📅 Janela: {since.isoformat()} → {run_date.isoformat()}")
+    logger.info("=" * 80)
+
+    extractor = TMDBMoviesExtractorV3(
+        batch_size=batch_size,
+        max_workers=max_workers,
+        use_async=True,
+        with_credits=with_credits,
+        use_cache=use_cache
+    )
+    # Partição delta do dia/execução e revalidação forçada: o TMDB disse que mudou
+    extractor.movies_prefix = f"movies_delta/dt={run_date.isoformat()}/run={run_id}"
+    extractor.credits_prefix = f"credits_delta/dt={run_date.isoformat()}/run={run_id}"
+    extractor.async_client.force_revalidate = True
+
+    try:
+        changed_ids = extractor.loop.run_until_complete(
+            fetch_changed_ids(extractor.async_client, change_windows(since, run_date))
+        )
+
+        movies_df = filter_changed_movies(extractor.get_movielens_movies(), changed_ids)
+        total_movies = len(movies_df)
+        logger.info(f"🎯 {len(changed_ids):,} alterados no TMDB ∩ links_silver = {total_movies:,} filmes")
+
+        success_count = error_count = 0
+        batches = []
+        for batch_num, start_idx in enumerate(range(0, total_movies, batch_size), 1):
+            if extractor.killer.kill_now:
+                logger.warning("🛑 Interrompido: high-water mark NÃO avançado")
+                sys.exit(0)
+
+            batch_movies_df = movies_df.iloc[start_idx:start_idx + batch_size]
+            batch_data, batch_success, batch_errors = extractor.extract_batch_async(batch_movies_df)
+            success_count += batch_success
+            error_count += batch_errors
+
+            if batch_data:
+                extractor.save_batch_to_minio(batch_data, batch_num)
+                batches.append(batch_num)
+
+        stats = {
+            "run_date": run_date.isoformat(),
+            "run_id": run_id,
+            "since": since.isoformat(),
+            "changed_in_tmdb": len(changed_ids),
+            "matched_links": total_movies,
+            "extracted": success_count,
+            "errors": error_count,
+            "not_found": len(extractor.not_found),
+            "not_found_movielens_ids": sorted(extractor.not_found),
+            "batches": batches,
+            "with_credits": with_credits,
+            "requests": extractor.async_client.requests_made
+        }
+        extractor.minio_client.upload_json(
+            bucket=extractor.bucket,
+            object_name=f"{extractor.movies_prefix}/_manifest.json",
+            data=stats
+        )
+        if extractor.not_found:
+            logger.info(f"🔍 {len(extractor.not_found):,} filmes inexistentes no TMDB (listados no manifest)")
+        if error_count:
+            # Filmes com falha transitória só reaparecem no feed se mudarem de
+            # novo: mantém a janela para a próxima execução buscá-los outra vez
+            logger.warning(f"⚠️  {error_count:,} erros: high-water mark NÃO avançado "
+                           f"(próxima execução repete desde {since.isoformat()})")
+        else:
+            save_watermark(run_date, stats)
+    finally:
+        extractor.close()
+
+    elapsed = time.time() - start_time
+    logger.info("=" * 80)
+    logger.info("🎉 EXTRAÇÃO INCREMENTAL CONCLUÍDA!")
+    logger.info(f"✅ Sucesso: {success_count:,} | ❌ Erros: {error_count:,}")
+    logger.info(f"📦 Partição: {extractor.bucket}/{extractor.movies_prefix}/")
+    logger.info(f"⏱️ Tempo: {elapsed/60:.1f}min")
+    logger.info("=" * 80)
+
+
+if __name__ == "__main__":
+    # --since YYYY-MM-DD: sobrescreve o high-water mark
+    since_arg = None
+    if "--since" in sys.argv:
+        since_arg = date.fromisoformat(sys.argv[sys.argv.index("--since") + 1])
+
+    run_incremental_extraction(
+        since=since_arg,
+        with_credits="--with-credits" in sys.argv,
+        use_cache="--no-cache" not in sys.argv
+    )
@@ -2,8 +2,9 @@
 Pipeline ULTRA OTIMIZADO - Processamento Paralelo com Threading
 """
 import pandas as pd
-from typing import Optional, Dict, List
+from typing import TYPE_CHECKING, Optional, Dict, List
 from datetime import datetime
+import asyncio
 import time
 import gc
 import json
@@ -13,12 +14,16 @@ from pathlib import Path
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
-from src.api_clients.tmdb_client import TMDBClient
+from src.api_clients.async_tmdb_client import AsyncTMDBClient
+from src.api_clients.http_cache import HTTPResponseCache
 from src.minio_client.minio_utils import MinioClient
 from src.settings.db import get_connection
 from src.settings.settings import settings
 from src.utils.logger import setup_logger
 
+if TYPE_CHECKING:
+    from src.api_clients.tmdb_client import TMDBClient
+
 logger = setup_logger(__name__, "tmdb_bronze_movies_v3.log")
 
 
@@ -38,14 +43,32 @@ class GracefulKiller:
 class TMDBMoviesExtractorV3:
     """Extrator ULTRA otimizado com threading paralelo."""
     
-    def __init__(self, batch_size: int = 2000, max_workers: int = 10):
+    def __init__(
+        self,
+        batch_size: int = 2000,
+        max_workers: int = 10,
+        use_async: bool = True,
+        with_credits: bool = False,
+        use_cache: bool = True,
+        offline: bool = False
+    ):
         """
         Args:
             batch_size: Filmes por arquivo Parquet (padrão: 2000)
-            max_workers: Threads paralelas (padrão: 10)
+            max_workers: Threads paralelas, ou requisições simultâneas no modo async (padrão: 10)
+            use_async: Se True, usa AsyncTMDBClient (um pool HTTP compartilhado
+                e token bucket); se False, threads com um TMDBClient por filme
+            with_credits: Se True (modo async), pede detalhes + créditos numa
+                única requisição (append_to_response=credits) e grava os
+                créditos em credits_v3/ no mesmo batch
+            use_cache: Se True (modo async), usa o cache HTTP persistente em
+                TMDB_CACHE_PATH (re-extrair filmes inalterados quase não custa)
+            offline: Se True, responde só do cache, sem rede (replay)
         """
         self.batch_size = batch_size
         self.max_workers = max_workers
+        self.use_async = use_async
+        self.with_credits = with_credits and use_async
         self.killer = GracefulKiller()
         self.lock = Lock()  # Thread-safe operations
         
@@ -58,10 +81,33 @@ class TMDBMoviesExtractorV3:
         self.bucket = settings.BUCKET_BRONZE_TMDB
         self.minio_client.create_bucket(self.bucket)
         
+        # Prefixos de saída no bucket (a extração incremental grava em partições delta)
+        self.movies_prefix = "movies_v3"
+        self.credits_prefix = "credits_v3"
+        
         # Checkpoint file
         self.checkpoint_file = Path("logs/tmdb_extraction_checkpoint.json")
         self.checkpoint_file.parent.mkdir(exist_ok=True)
         
+        # movieids sem filme no TMDB (404 + /find vazio): não são falhas transitórias
+        self.not_found: List[int] = []
+        
+        # Cliente async compartilhado por toda a extração (um event loop próprio)
+        if self.use_async:
+            self.loop = asyncio.new_event_loop()
+            self.http_cache = None
+            if use_cache or offline:
+                self.http_cache = HTTPResponseCache(
+                    path=settings.TMDB_CACHE_PATH,
+                    ttl_seconds=settings.TMDB_CACHE_TTL_HOURS * 3600,
+                    max_size_mb=settings.TMDB_CACHE_MAX_MB
+                )
+            self.async_client = AsyncTMDBClient(
+                max_connections=max_workers,
+                cache=self.http_cache,
+                offline=offline
+            )
+        
         logger.info(f"✅ Extrator V3 ULTRA inicializado")
         logger.info(f"📦 Batch size: {self.batch_size} filmes/arquivo")
         logger.info(f"🚀 Workers paralelos: {self.max_workers}")
@@ -119,7 +165,15 @@ class TMDBMoviesExtractorV3:
         imdb_str = str(imdb_id).replace('tt', '').zfill(7)
         return f"tt{imdb_str}"
     
-    def extract_single_movie(self, row: pd.Series, tmdb_client: TMDBClient) -> Optional[Dict]:
+    def known_tmdb_id(self, row: pd.Series) -> Optional[int]:
+        """TMDB ID já mapeado em links_silver.tmdbid (None se ausente/inválido)."""
+        try:
+            tmdb_id = int(float(row.get('tmdbid')))
+            return tmdb_id if tmdb_id > 0 else None
+        except (TypeError, ValueError):
+            return None
+    
+    def extract_single_movie(self, row: pd.Series, tmdb_client: "TMDBClient") -> Optional[Dict]:
         """
         Extrai UM filme (thread-safe, cada thread tem seu próprio client).
         
@@ -136,12 +190,14 @@ class TMDBMoviesExtractorV3:
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                result = tmdb_client.get_movie_by_imdb_id(formatted_imdb_id)
-                
-                if not result:
-                    return None
-                
-                tmdb_id = result.get('id')
+                tmdb_id = self.known_tmdb_id(row)
+                if tmdb_id is None:
+                    result = tmdb_client.get_movie_by_imdb_id(formatted_imdb_id)
+                    
+                    if not result:
+                        return None
+                    
+                    tmdb_id = result.get('id')
                 details = tmdb_client.get_movie_details(tmdb_id)
                 
                 if details:
@@ -172,6 +228,8 @@ class TMDBMoviesExtractorV3:
         Returns:
             (lista de dados, sucessos, erros)
         """
+        from src.api_clients.tmdb_client import TMDBClient
+        
         batch_data = []
         batch_success = 0
         batch_errors = 0
@@ -218,15 +276,143 @@ class TMDBMoviesExtractorV3:
         
         return batch_data, batch_success, batch_errors
     
+    async def extract_single_movie_async(
+        self, row: pd.Series, client: AsyncTMDBClient, semaphore: asyncio.Semaphore
+    ) -> Optional[Dict]:
+        """
+        Extrai UM filme pelo cliente async (o token bucket dita o ritmo).
+        
+        Usa o TMDB ID de links_silver quando existe (sem chamada /find; se o
+        ID estiver desatualizado e der 404, cai para o /find pelo IMDb ID).
+        Com with_credits, os créditos vêm na mesma requisição, na chave 'credits'.
+        
+        Returns:
+            Detalhes do filme; {} se o filme não existe no TMDB (registrado em
+            self.not_found); None em falha (erro após as retentativas)
+        """
+        formatted_imdb_id = self.format_imdb_id(str(row['imdbid']))
+        append = 'credits' if self.with_credits else None
+        
+        async with semaphore:
+            try:
+                details = {}
+                tmdb_id = self.known_tmdb_id(row)
+                if tmdb_id is not None:
+                    details = await client.get_movie_details(tmdb_id, append_to_response=append)
+                
+                if not details:
+                    result = await client.find_by_imdb_id(formatted_imdb_id)
+                    if result:
+                        details = await client.get_movie_details(result['id'], append_to_response=append)
+                
+                if not details:
+                    self.not_found.append(int(row['movieid']))
+                    return {}
+                
+                details['movielens_id'] = int(row['movieid'])
+                details['imdb_id'] = formatted_imdb_id
+                details['extracted_at'] = datetime.now().isoformat()
+                return details
+            
+            except Exception as e:
+                logger.debug(f"❌ Falha em {row['title']}: {e}")
+                return None
+    
+    async def _extract_batch_async(self, batch_movies_df: pd.DataFrame) -> tuple[List[Dict], int, int]:
+        await self.async_client.open()
+        semaphore = asyncio.Semaphore(self.max_workers)
+        tasks = [
+            asyncio.ensure_future(self.extract_single_movie_async(row, self.async_client, semaphore))
+            for _, row in batch_movies_df.iterrows()
+        ]
+        
+        batch_data = []
+        batch_success = 0
+        batch_errors = 0
+        
+        with tqdm(total=len(tasks), desc="Extraindo", unit="filme", leave=False) as pbar:
+            for next_done in asyncio.as_completed(tasks):
+                if self.killer.kill_now:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                    break
+                
+                movie_data = await next_done
+                if movie_data:
+                    batch_data.append(movie_data)
+                    batch_success += 1
+                elif movie_data is None:
+                    batch_errors += 1
+                
+                pbar.update(1)
+                pbar.set_postfix({
+                    'Success': batch_success,
+                    'Errors': batch_errors,
+                    'Req': self.async_client.requests_made
+                })
+        
+        return batch_data, batch_success, batch_errors
+    
+    def extract_batch_async(self, batch_movies_df: pd.DataFrame) -> tuple[List[Dict], int, int]:
+        """
+        Extrai batch INTEIRO com o cliente async compartilhado.
+        
+        Args:
+            batch_movies_df: DataFrame com filmes do batch
+            
+        Returns:
+            (lista de dados, sucessos, erros); filmes inexistentes no TMDB não
+            contam como erro e vão para self.not_found
+        """
+        return self.loop.run_until_complete(self._extract_batch_async(batch_movies_df))
+    
+    def close(self):
+        """Fecha o cliente async, o cache HTTP e o event loop."""
+        if self.use_async:
+            self.loop.run_until_complete(self.async_client.close())
+            self.loop.close()
+            if self.http_cache is not None:
+                logger.info(f"💾 Cache HTTP: {self.http_cache.stats()}")
+                self.http_cache.close()
+    
+    def split_credits(self, movies_data: List[Dict]) -> List[Dict]:
+        """
+        Separa os créditos vindos via append_to_response dos detalhes do filme.
+        Retorna linhas no formato de credits_v3/ (cast/crew como JSON).
+        """
+        credits_rows = []
+        for movie in movies_data:
+            credits = movie.pop('credits', None)
+            if not credits:
+                continue
+            credits_rows.append({
+                'movielens_id': movie['movielens_id'],
+                'tmdb_id': movie.get('id'),
+                'cast': json.dumps(credits.get('cast', [])),
+                'crew': json.dumps(credits.get('crew', [])),
+                'extracted_at': movie['extracted_at']
+            })
+        return credits_rows
+    
     def save_batch_to_minio(self, movies_data: List[Dict], batch_number: int):
-        """Salva batch no MinIO."""
+        """Salva batch no MinIO (e os créditos do mesmo batch, se houver)."""
         if not movies_data:
             logger.warning(f"⚠️  Batch {batch_number} vazio")
             return
         
+        credits_data = self.split_credits(movies_data)
+        
         max_retries = 3
         for attempt in range(max_retries):
             try:
+                if credits_data:
+                    self.minio_client.upload_parquet(
+                        bucket=self.bucket,
+                        object_name=f"{self.credits_prefix}/batch_{batch_number:05d}.parquet",
+                        data=pd.DataFrame(credits_data)
+                    )
+                
                 df = pd.DataFrame(movies_data)
                 
                 # ✅ CONVERTER COLUNAS JSON PARA STRING (CORRIGIDO!)
@@ -238,7 +424,7 @@ class TMDBMoviesExtractorV3:
                             lambda x: json.dumps(x) if isinstance(x, (list, dict)) else None
                         )
                 
-                object_name = f"movies_v3/batch_{batch_number:05d}.parquet"
+                object_name = f"{self.movies_prefix}/batch_{batch_number:05d}.parquet"
                 
                 self.minio_client.upload_parquet(
                     bucket=self.bucket,
@@ -246,7 +432,10 @@ class TMDBMoviesExtractorV3:
                     data=df
                 )
                 
-                logger.info(f"✅ Batch {batch_number} salvo: {len(movies_data)} filmes")
+                logger.info(
+                    f"✅ Batch {batch_number} salvo: {len(movies_data)} filmes"
+                    + (f", {len(credits_data)} créditos" if credits_data else "")
+                )
                 return
             
             except Exception as e:
@@ -312,7 +501,10 @@ class TMDBMoviesExtractorV3:
             logger.info(f"📦 Batch {batch_num}/{total_batches} ({len(batch_movies_df)} filmes)...")
             
             # EXTRAÇÃO PARALELA 🚀
-            batch_data, batch_success, batch_errors = self.extract_batch_parallel(batch_movies_df)
+            if self.use_async:
+                batch_data, batch_success, batch_errors = self.extract_batch_async(batch_movies_df)
+            else:
+                batch_data, batch_success, batch_errors = self.extract_batch_parallel(batch_movies_df)
             
             batch_elapsed = time.time() - batch_start_time
             batch_rate = len(batch_movies_df) / batch_elapsed if batch_elapsed > 0 else 0
@@ -346,8 +538,9 @@ class TMDBMoviesExtractorV3:
             # Progresso geral
             progress = (batch_num / total_batches) * 100
             elapsed = time.time() - start_time
-            rate = (success_count + error_count) / elapsed if elapsed > 0 else 0
-            remaining_movies = total_movies - (success_count + error_count)
+            processed = success_count + error_count + len(self.not_found)
+            rate = processed / elapsed if elapsed > 0 else 0
+            remaining_movies = total_movies - processed
             remaining_time = remaining_movies / rate if rate > 0 else 0
             
             logger.info(
@@ -366,9 +559,10 @@ class TMDBMoviesExtractorV3:
         logger.info(f"📊 Total: {total_movies:,}")
         logger.info(f"✅ Sucesso: {success_count:,} ({success_count/total_movies*100:.1f}%)")
         logger.info(f"❌ Erros: {error_count:,} ({error_count/total_movies*100:.1f}%)")
+        logger.info(f"🔍 Inexistentes no TMDB: {len(self.not_found):,}")
         logger.info(f"📦 Batches: {total_batches}")
         logger.info(f"⏱️ Tempo: {elapsed/3600:.2f}h")
-        logger.info(f"⚡ Taxa média: {(success_count + error_count)/elapsed:.2f} filmes/s")
+        logger.info(f"⚡ Taxa média: {(success_count + error_count + len(self.not_found))/elapsed:.2f} filmes/s")
         logger.info("=" * 80)
         
         self.clear_checkpoint()
@@ -378,43 +572,71 @@ def run_extraction_v3(
     batch_size: int = 2000,
     max_workers: int = 10,
     limit: Optional[int] = None,
-    resume: bool = True
+    resume: bool = True,
+    use_async: bool = True,
+    with_credits: bool = False,
+    use_cache: bool = True,
+    offline: bool = False
 ):
     """Executa extração V3 ULTRA com paralelismo."""
-    extractor = TMDBMoviesExtractorV3(batch_size=batch_size, max_workers=max_workers)
-    extractor.extract_all_movies(limit=limit, resume=resume)
+    extractor = TMDBMoviesExtractorV3(
+        batch_size=batch_size,
+        max_workers=max_workers,
+        use_async=use_async,
+        with_credits=with_credits,
+        use_cache=use_cache,
+        offline=offline
+    )
+    try:
+        extractor.extract_all_movies(limit=limit, resume=resume)
+    finally:
+        extractor.close()
 
 
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) == 1:
+    # --sync: modo antigo com threads e um TMDBClient por filme
+    use_async = "--sync" not in sys.argv
+    # --with-credits: detalhes + créditos numa requisição só (append_to_response)
+    with_credits = "--with-credits" in sys.argv
+    # --no-cache: ignora o cache HTTP; --offline: replay só do cache
+    use_cache = "--no-cache" not in sys.argv
+    offline = "--offline" in sys.argv
+    flags = ("--sync", "--with-credits", "--no-cache", "--offline")
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    options = dict(use_async=use_async, with_credits=with_credits, use_cache=use_cache, offline=offline)
+    
+    if not args:
         logger.info("🧪 MODO TESTE: 1 batch (2000 filmes) com 10 threads")
-        run_extraction_v3(batch_size=2000, max_workers=10, limit=2000, resume=False)
+        run_extraction_v3(batch_size=2000, max_workers=10, limit=2000, resume=False, **options)
     
     elif "--full" in sys.argv:
         logger.warning("🚀 MODO PRODUÇÃO: TODOS os filmes (PARALELO)")
         logger.warning("⏱️ Pressione Ctrl+C para pausar (não perde dados)")
         time.sleep(3)
-        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=True)
+        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=True, **options)
     
     elif "--resume" in sys.argv:
         logger.info("🔄 MODO RESUMO: Continuando...")
-        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=True)
+        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=True, **options)
     
     elif "--reset" in sys.argv:
         logger.warning("🔄 MODO RESET: Começando do zero")
         time.sleep(2)
-        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=False)
+        run_extraction_v3(batch_size=2000, max_workers=10, limit=None, resume=False, **options)
     
     elif "--turbo" in sys.argv:
         logger.warning("🚀🔥 MODO TURBO: 20 threads paralelas!")
         time.sleep(2)
-        run_extraction_v3(batch_size=2000, max_workers=20, limit=None, resume=True)
+        run_extraction_v3(batch_size=2000, max_workers=20, limit=None, resume=True, **options)
     
     else:
         print("📖 Uso:")
         print("  python -m src.pipelines.tmdb.bronze.extract_tmdb_movies              # Teste (10 threads)")
         print("  python -m src.pipelines.tmdb.bronze.extract_tmdb_movies --full       # Produção (10 threads)")
         print("  python -m src.pipelines.tmdb.bronze.extract_tmdb_movies --turbo      # TURBO (20 threads)")
-        print("  python -m src.pipelines.tmdb.bronze.extract_tmdb_movies --resume     # Retomar")
\ No newline at end of file
+        print("  python -m src.pipelines.tmdb.bronze.extract_tmdb_movies --resume     # Retomar")
+        print("  (acrescente --sync para usar threads em vez do cliente async)")
+        print("  (acrescente --with-credits para extrair créditos na mesma requisição)")
+        print("  (acrescente --no-cache para ignorar o cache HTTP, --offline para replay só do cache)")
\ No newline at end of file
@@ -1,12 +1,12 @@
 """
 Orquestrador da Camada Bronze TMDB.
-Executa todas as extrações em sequência.
+Extrai filmes e créditos numa passada só (append_to_response=credits),
+gravando movies_v3/ e credits_v3/.
 """
 
 import time
 from src.utils.logger import setup_logger
-from src.pipelines.tmdb.bronze.extract_tmdb_movies import run_extraction as run_movies
-from src.pipelines.tmdb.bronze.extract_tmdb_credits import run_credits_extraction
+from src.pipelines.tmdb.bronze.extract_tmdb_movies import run_extraction_v3
 
 logger = setup_logger(__name__, "tmdb_bronze_pipeline.log")
 
@@ -27,17 +27,11 @@ def run_bronze_pipeline(mode: str = "test"):
     limit = 10 if mode == "test" else None
     
     try:
-        # PASSO 1: Extrair filmes
+        # Filmes + créditos: uma requisição por filme, sem passada separada em /credits
         logger.info("\n" + "=" * 90)
-        logger.info("📝 PASSO 1/2: Extraindo dados dos filmes...")
+        logger.info("📝 Extraindo filmes e créditos (elenco e equipe)...")
         logger.info("=" * 90)
-        run_movies(batch_size=100, limit=limit, skip_existing=True)
-        
-        # PASSO 2: Extrair créditos
-        logger.info("\n" + "=" * 90)
-        logger.info("🎭 PASSO 2/2: Extraindo créditos (elenco e equipe)...")
-        logger.info("=" * 90)
-        run_credits_extraction(limit=limit, skip_existing=True)
+        run_extraction_v3(limit=limit, resume=True, with_credits=True)
         
         elapsed = time.time() - start_time
         
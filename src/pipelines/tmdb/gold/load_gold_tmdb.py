@@ -4,11 +4,11 @@ sys.path.insert(0, '/app')
 
 import pandas as pd
 import time
-from sqlalchemy import create_engine
-from settings.db import get_connection
+from settings.db import get_connection, swap_replace_table
 from settings.settings import settings
+from settings.matviews import refresh_materialized_views
 from utils.logger import setup_logger
-from pipelines.tmdb.gold.schemas_gold_tmdb import ALL_GOLD_TMDB_SCHEMAS
+from pipelines.tmdb.gold.schemas_gold_tmdb import ALL_GOLD_TMDB_SCHEMAS, DROP_GOLD_TMDB_TABLES
 from pipelines.tmdb.gold.transformations_gold_tmdb import (
     aggregate_movies_tmdb,
     aggregate_box_office,
@@ -19,14 +19,16 @@ from pipelines.tmdb.gold.transformations_gold_tmdb import (
 logger = setup_logger(__name__, "tmdb_gold_pipeline.log")
 
 
-def create_schemas():
-    """Cria schemas e tabelas Gold TMDB no PostgreSQL."""
+def create_schemas(recreate: bool = False):
+    """Cria schemas e tabelas Gold TMDB no PostgreSQL (recreate=True apaga as existentes)."""
     logger.info("🏗️  Criando schemas e tabelas Gold TMDB...")
     
     conn = get_connection()
     cur = conn.cursor()
     
     try:
+        if recreate:
+            cur.execute(DROP_GOLD_TMDB_TABLES)
         for schema_sql in ALL_GOLD_TMDB_SCHEMAS:
             cur.execute(schema_sql)
         
@@ -42,15 +44,6 @@ def create_schemas():
         conn.close()
 
 
-def get_sqlalchemy_engine():
-    """Cria SQLAlchemy engine para PostgreSQL."""
-    connection_string = (
-        f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
-        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-    )
-    return create_engine(connection_string)
-
-
 def clean_numeric_overflows(df: pd.DataFrame):
     """Limpa valores absurdos que causam overflow no banco."""
     for col in ['roi', 'avg_roi']:
@@ -60,7 +53,10 @@ def clean_numeric_overflows(df: pd.DataFrame):
 
 
 def save_to_postgres(df: pd.DataFrame, table_name: str, schema: str = 'gold_tmdb'):
-    """Salva DataFrame no PostgreSQL."""
+    """
+    Salva DataFrame no PostgreSQL: carrega a tabela sombra via COPY e troca
+    com a tabela viva numa transação curta (versão anterior fica em __prev).
+    """
     logger.info(f"💾 Salvando {table_name} no PostgreSQL...")
     
     if df.empty:
@@ -70,49 +66,21 @@ def save_to_postgres(df: pd.DataFrame, table_name: str, schema: str = 'gold_tmdb
     # ✅ Limpar valores absurdos
     df = clean_numeric_overflows(df)
     
-    engine = get_sqlalchemy_engine()
     conn = get_connection()
     
     try:
-        # Truncar tabela
-        cur = conn.cursor()
-        cur.execute(f"TRUNCATE TABLE {schema}.{table_name} RESTART IDENTITY CASCADE")
-        conn.commit()
-        cur.close()
-        logger.info(f"  🗑️  Tabela {schema}.{table_name} truncada")
-        
-        # Inserir em batches
-        batch_size = 100
-        total_batches = (len(df) - 1) // batch_size + 1
-        
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i:i + batch_size]
-            
-            with engine.begin() as connection:
-                batch.to_sql(
-                    name=table_name,
-                    con=connection,
-                    schema=schema,
-                    if_exists='append',
-                    index=False,
-                    method='multi'
-                )
-            
-            batch_num = i // batch_size + 1
-            if batch_num % 10 == 0 or batch_num == total_batches:
-                logger.info(f"  ✓ Batch {batch_num}/{total_batches} inserido")
-        
-        logger.info(f"✅ {schema}.{table_name}: {len(df):,} registros salvos")
+        rows, elapsed = swap_replace_table(df, f"{schema}.{table_name}", conn)
+        rate = rows / elapsed if elapsed > 0 else 0
+        logger.info(f"✅ {schema}.{table_name}: {rows:,} registros salvos ({elapsed:.1f}s, {rate:,.0f} linhas/s)")
         
     except Exception as e:
         logger.error(f"❌ Erro ao salvar {table_name}: {e}")
         raise
     finally:
         conn.close()
-        engine.dispose()
 
 
-def run_gold_tmdb_pipeline():
+def run_gold_tmdb_pipeline(recreate_schema: bool = False):
     """Executa pipeline completo Silver → Gold TMDB."""
     start_time = time.time()
     
@@ -122,7 +90,7 @@ def run_gold_tmdb_pipeline():
     
     try:
         # 1. Criar schemas
-        create_schemas()
+        create_schemas(recreate=recreate_schema)
         
         # 2. Agregar dimensão de filmes
         logger.info("\n📦 [1/4] Processando dimensão de filmes TMDB...")
@@ -144,6 +112,12 @@ def run_gold_tmdb_pipeline():
         df_countries = aggregate_country_performance()
         save_to_postgres(df_countries, 'fact_country_performance', 'gold_tmdb')
         
+        # 6. Rollups consultados pela API (materialized views)
+        views = refresh_materialized_views("tmdb")
+        failed = [name for name, status in views.items() if status == "failed"]
+        if failed:
+            logger.warning(f"⚠️  Materialized views não atualizadas (API usa as tabelas base): {failed}")
+        
         # Resumo
         elapsed = time.time() - start_time
         
@@ -2,16 +2,17 @@
 Schemas Gold TMDB - Dados agregados do TMDB
 """
 
+# Usado só com recreate_schema=True (remove também as cópias __next/__prev)
 DROP_GOLD_TMDB_TABLES = """
-DROP TABLE IF EXISTS gold_tmdb.fact_country_performance CASCADE;
-DROP TABLE IF EXISTS gold_tmdb.fact_studio_performance CASCADE;
-DROP TABLE IF EXISTS gold_tmdb.fact_box_office CASCADE;
-DROP TABLE IF EXISTS gold_tmdb.dim_movies_tmdb CASCADE;
+DROP TABLE IF EXISTS gold_tmdb.fact_country_performance, gold_tmdb.fact_country_performance__next, gold_tmdb.fact_country_performance__prev CASCADE;
+DROP TABLE IF EXISTS gold_tmdb.fact_studio_performance, gold_tmdb.fact_studio_performance__next, gold_tmdb.fact_studio_performance__prev CASCADE;
+DROP TABLE IF EXISTS gold_tmdb.fact_box_office, gold_tmdb.fact_box_office__next, gold_tmdb.fact_box_office__prev CASCADE;
+DROP TABLE IF EXISTS gold_tmdb.dim_movies_tmdb, gold_tmdb.dim_movies_tmdb__next, gold_tmdb.dim_movies_tmdb__prev CASCADE;
 """
 
 # Dimensão principal de filmes TMDB (agregada)
 CREATE_DIM_MOVIES_TMDB = """
-CREATE TABLE gold_tmdb.dim_movies_tmdb (
+CREATE TABLE IF NOT EXISTS gold_tmdb.dim_movies_tmdb (
     movielens_id INTEGER PRIMARY KEY,
     tmdb_id INTEGER NOT NULL,
     imdb_id VARCHAR(20) NOT NULL,
@@ -52,18 +53,18 @@ CREATE TABLE gold_tmdb.dim_movies_tmdb (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_dim_movies_tmdb_year ON gold_tmdb.dim_movies_tmdb(release_year);
-CREATE INDEX idx_dim_movies_tmdb_budget ON gold_tmdb.dim_movies_tmdb(budget);
-CREATE INDEX idx_dim_movies_tmdb_revenue ON gold_tmdb.dim_movies_tmdb(revenue);
-CREATE INDEX idx_dim_movies_tmdb_roi ON gold_tmdb.dim_movies_tmdb(roi DESC);
-CREATE INDEX idx_dim_movies_tmdb_quality ON gold_tmdb.dim_movies_tmdb(quality_score DESC);
+CREATE INDEX IF NOT EXISTS idx_dim_movies_tmdb_year ON gold_tmdb.dim_movies_tmdb(release_year);
+CREATE INDEX IF NOT EXISTS idx_dim_movies_tmdb_budget ON gold_tmdb.dim_movies_tmdb(budget);
+CREATE INDEX IF NOT EXISTS idx_dim_movies_tmdb_revenue ON gold_tmdb.dim_movies_tmdb(revenue);
+CREATE INDEX IF NOT EXISTS idx_dim_movies_tmdb_roi ON gold_tmdb.dim_movies_tmdb(roi DESC);
+CREATE INDEX IF NOT EXISTS idx_dim_movies_tmdb_quality ON gold_tmdb.dim_movies_tmdb(quality_score DESC);
 
 COMMENT ON TABLE gold_tmdb.dim_movies_tmdb IS 'Dimensão de filmes TMDB agregada (Gold)';
 """
 
 # Fato de desempenho de bilheteria
 CREATE_FACT_BOX_OFFICE = """
-CREATE TABLE gold_tmdb.fact_box_office (
+CREATE TABLE IF NOT EXISTS gold_tmdb.fact_box_office (
     movielens_id INTEGER PRIMARY KEY,
     title VARCHAR(500) NOT NULL,
     release_year SMALLINT,
@@ -83,20 +84,21 @@ CREATE TABLE gold_tmdb.fact_box_office (
     is_profitable BOOLEAN,
     is_blockbuster BOOLEAN,
     
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (movielens_id) REFERENCES gold_tmdb.dim_movies_tmdb(movielens_id)
+    -- Sem FK para dim_movies_tmdb: as tabelas Gold são trocadas via
+    -- tabela sombra (ver settings.db.swap_replace_table)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_box_office_profit ON gold_tmdb.fact_box_office(profit DESC);
-CREATE INDEX idx_box_office_roi ON gold_tmdb.fact_box_office(roi DESC);
-CREATE INDEX idx_box_office_category ON gold_tmdb.fact_box_office(budget_category);
+CREATE INDEX IF NOT EXISTS idx_box_office_profit ON gold_tmdb.fact_box_office(profit DESC);
+CREATE INDEX IF NOT EXISTS idx_box_office_roi ON gold_tmdb.fact_box_office(roi DESC);
+CREATE INDEX IF NOT EXISTS idx_box_office_category ON gold_tmdb.fact_box_office(budget_category);
 
 COMMENT ON TABLE gold_tmdb.fact_box_office IS 'Análise de desempenho financeiro';
 """
 
 # Fato de performance de estúdios/produtoras
 CREATE_FACT_STUDIO_PERFORMANCE = """
-CREATE TABLE gold_tmdb.fact_studio_performance (
+CREATE TABLE IF NOT EXISTS gold_tmdb.fact_studio_performance (
     company_id INTEGER PRIMARY KEY,
     company_name VARCHAR(200) NOT NULL,
     
@@ -115,16 +117,16 @@ CREATE TABLE gold_tmdb.fact_studio_performance (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_studio_roi ON gold_tmdb.fact_studio_performance(avg_roi DESC);
-CREATE INDEX idx_studio_revenue ON gold_tmdb.fact_studio_performance(total_revenue DESC);
-CREATE INDEX idx_studio_success ON gold_tmdb.fact_studio_performance(success_rate DESC);
+CREATE INDEX IF NOT EXISTS idx_studio_roi ON gold_tmdb.fact_studio_performance(avg_roi DESC);
+CREATE INDEX IF NOT EXISTS idx_studio_revenue ON gold_tmdb.fact_studio_performance(total_revenue DESC);
+CREATE INDEX IF NOT EXISTS idx_studio_success ON gold_tmdb.fact_studio_performance(success_rate DESC);
 
 COMMENT ON TABLE gold_tmdb.fact_studio_performance IS 'Performance agregada de produtoras';
 """
 
 # Fato de performance por país
 CREATE_FACT_COUNTRY_PERFORMANCE = """
-CREATE TABLE gold_tmdb.fact_country_performance (
+CREATE TABLE IF NOT EXISTS gold_tmdb.fact_country_performance (
     country_code VARCHAR(10) PRIMARY KEY,
     country_name VARCHAR(100) NOT NULL,
     
@@ -140,15 +142,15 @@ CREATE TABLE gold_tmdb.fact_country_performance (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_country_movies ON gold_tmdb.fact_country_performance(total_movies DESC);
-CREATE INDEX idx_country_roi ON gold_tmdb.fact_country_performance(avg_roi DESC);
+CREATE INDEX IF NOT EXISTS idx_country_movies ON gold_tmdb.fact_country_performance(total_movies DESC);
+CREATE INDEX IF NOT EXISTS idx_country_roi ON gold_tmdb.fact_country_performance(avg_roi DESC);
 
 COMMENT ON TABLE gold_tmdb.fact_country_performance IS 'Performance por país produtor';
 """
 
-# Lista de todos os schemas
+# Lista de todos os schemas (idempotente: as tabelas vivas são mantidas
+# entre execuções para que a troca via tabela sombra não exponha tabelas vazias)
 ALL_GOLD_TMDB_SCHEMAS = [
-    DROP_GOLD_TMDB_TABLES,
     CREATE_DIM_MOVIES_TMDB,
     CREATE_FACT_BOX_OFFICE,
     CREATE_FACT_STUDIO_PERFORMANCE,
@@ -0,0 +1,100 @@
+"""
+Benchmark: explode_json_dimensions vs transform_genres/companies/countries/languages.
+
+Gera uma Bronze sintética (padrão: 100k filmes) com as colunas JSON no mesmo
+formato salvo pelo extrator (json.dumps por linha) e compara tempo e resultado.
+
+Uso:
+    python -m src.pipelines.tmdb.silver.benchmark_json_explode [n_filmes]
+"""
+import json
+import random
+import sys
+import time
+import pandas as pd
+from src.utils.logger import get_logger
+from src.pipelines.tmdb.silver.transformations_silver_tmdb import (
+    transform_genres,
+    transform_production_companies,
+    transform_production_countries,
+    transform_spoken_languages,
+    explode_json_dimensions
+)
+
+logger = get_logger(__name__)
+
+GENRES = [(28, "Action"), (12, "Adventure"), (16, "Animation"), (35, "Comedy"),
+          (80, "Crime"), (99, "Documentary"), (18, "Drama"), (10751, "Family"),
+          (14, "Fantasy"), (27, "Horror"), (9648, "Mystery"), (10749, "Romance")]
+COUNTRIES = [("US", "United States of America"), ("GB", "United Kingdom"),
+             ("FR", "France"), ("BR", "Brazil"), ("JP", "Japan"), ("DE", "Germany")]
+LANGUAGES = [("en", "English", "English"), ("fr", "Français", "French"),
+             ("pt", "Português", "Portuguese"), ("ja", "日本語", "Japanese")]
+
+
+def make_synthetic_bronze(n_movies: int, seed: int = 42) -> pd.DataFrame:
+    """Cria DataFrame Bronze sintético com n_movies filmes."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_movies):
+        genres = [{"id": g, "name": n} for g, n in rng.sample(GENRES, rng.randint(0, 4))]
+        companies = [
+            {"id": rng.randint(1, 50_000), "name": f"Studio {rng.randint(1, 5000)}",
+             "logo_path": rng.choice([None, f"/logo{i}.png"]), "origin_country": rng.choice(COUNTRIES)[0]}
+            for _ in range(rng.randint(0, 5))
+        ]
+        countries = [{"iso_3166_1": c, "name": n} for c, n in rng.sample(COUNTRIES, rng.randint(0, 3))]
+        languages = [{"iso_639_1": c, "name": n, "english_name": e}
+                     for c, n, e in rng.sample(LANGUAGES, rng.randint(0, 3))]
+        rows.append({
+            "movielens_id": i + 1,
+            "imdb_id": f"tt{i + 1:07d}",
+            "id": 100_000 + i,
+            "genres": json.dumps(genres),
+            "production_companies": json.dumps(companies),
+            "production_countries": json.dumps(countries),
+            "spoken_languages": json.dumps(languages),
+        })
+    return pd.DataFrame(rows)
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Ordena e reseta índice para comparar resultados."""
+    if df.empty:
+        return df.reset_index(drop=True)
+    return df.sort_values(df.columns.tolist()).reset_index(drop=True)
+
+
+def run_benchmark(n_movies: int = 100_000):
+    logger.info(f"🧪 Gerando Bronze sintética com {n_movies:,} filmes...")
+    df = make_synthetic_bronze(n_movies)
+
+    legacy = {
+        'genres_tmdb': transform_genres,
+        'production_companies_tmdb': transform_production_companies,
+        'production_countries_tmdb': transform_production_countries,
+        'spoken_languages_tmdb': transform_spoken_languages,
+    }
+
+    start = time.perf_counter()
+    legacy_frames = {table: fn(df) for table, fn in legacy.items()}
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = explode_json_dimensions(df)
+    explode_elapsed = time.perf_counter() - start
+
+    for table, legacy_df in legacy_frames.items():
+        pd.testing.assert_frame_equal(
+            _normalize(legacy_df), _normalize(frames[table]), check_dtype=False
+        )
+        logger.info(f"  ✓ {table}: {len(frames[table]):,} linhas (resultados iguais)")
+
+    logger.info(f"⏱️  Funções atuais (4x iterrows + json.loads): {legacy_elapsed:.2f}s")
+    logger.info(f"⏱️  explode_json_dimensions (Arrow):           {explode_elapsed:.2f}s")
+    logger.info(f"🚀 Speedup: {legacy_elapsed / explode_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    run_benchmark(n)
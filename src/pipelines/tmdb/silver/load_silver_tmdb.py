@@ -3,23 +3,30 @@ Pipeline Silver Layer TMDB - Carrega Bronze e transforma para Silver
 Segue o mesmo padrão do MovieLens
 """
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import time
-from sqlalchemy import create_engine
+from typing import Iterator, List
 from src.minio_client.minio_utils import MinioClient
 from src.settings.settings import settings
-from src.settings.db import get_connection
+from src.settings.db import get_connection, copy_replace_table, copy_dataframe, align_integer_columns
 from src.utils.logger import setup_logger
 from src.pipelines.tmdb.silver.schemas_tmdb import ALL_SCHEMAS
 from src.pipelines.tmdb.silver.transformations_silver_tmdb import (
     transform_movies_main,
-    transform_genres,
-    transform_production_companies,
-    transform_production_countries,
-    transform_spoken_languages
+    explode_json_dimensions
 )
 
 logger = setup_logger(__name__, "tmdb_silver_pipeline.log")
 
+SILVER_TMDB_TABLES = [
+    'movies_tmdb',
+    'genres_tmdb',
+    'production_companies_tmdb',
+    'production_countries_tmdb',
+    'spoken_languages_tmdb'
+]
+
 
 def create_schemas():
     """Cria schemas e tabelas no PostgreSQL."""
@@ -44,30 +51,80 @@ def create_schemas():
         conn.close()
 
 
-def load_bronze_data() -> pd.DataFrame:
-    """Carrega todos os batches Bronze do MinIO."""
-    logger.info("📥 Carregando dados Bronze do MinIO...")
-    
-    minio_client = MinioClient(
+def get_minio_client() -> MinioClient:
+    return MinioClient(
         endpoint=settings.MINIO_ENDPOINT,
         access_key=settings.MINIO_ACCESS_KEY,
         secret_key=settings.MINIO_SECRET_KEY
     )
-    
-    # Listar arquivos
+
+
+def list_bronze_batches(minio_client: MinioClient, prefix: str = 'movies_v3/') -> List[str]:
+    """Lista os arquivos Parquet de batch da Bronze."""
     objects = minio_client.list_objects(
         bucket=settings.BUCKET_BRONZE_TMDB,
-        prefix='movies_v3/',
+        prefix=prefix,
         recursive=True
     )
+    return sorted(obj for obj in objects if obj.endswith('.parquet'))
+
+
+def read_arrow_table(data: pa.Buffer) -> pa.Table:
+    """Lê um batch Bronze como tabela Arrow (sem passar por pandas)."""
+    return pq.read_table(pa.BufferReader(data))
+
+
+def iter_bronze_batches(
+    prefix: str = 'movies_v3/',
+    max_workers: int = 4,
+    prefetch: int = 8
+) -> Iterator[pa.RecordBatch]:
+    """
+    Gera os record batches Arrow da Bronze, arquivo por arquivo.
+    
+    MinioClient.download_many baixa os próximos arquivos (max_workers threads)
+    enquanto o consumidor processa o atual; no máximo `prefetch` arquivos ficam
+    em voo, então a memória fica limitada a ~prefetch arquivos, não à Bronze
+    inteira. Os arquivos são gerados na ordem das chaves (batch_00001, ...),
+    então a deduplicação por movielens_id é determinística.
+    """
+    minio_client = get_minio_client()
+    batch_files = list_bronze_batches(minio_client, prefix)
+    logger.info(f"📦 Encontrados {len(batch_files)} batches (streaming, {max_workers} threads, prefetch {prefetch})")
     
-    batch_files = [obj for obj in objects if obj.endswith('.parquet')]
+    downloads = minio_client.download_many(
+        settings.BUCKET_BRONZE_TMDB,
+        batch_files,
+        max_workers=max_workers,
+        parser=read_arrow_table,
+        max_in_flight=prefetch,
+        ordered=True
+    )
+    for batch_file, table in downloads:
+        if table is None:
+            raise RuntimeError(f"Falha ao baixar {batch_file} da Bronze")
+        yield from table.to_batches()
+
+
+def load_bronze_data() -> pd.DataFrame:
+    """Carrega todos os batches Bronze do MinIO."""
+    logger.info("📥 Carregando dados Bronze do MinIO...")
+    
+    minio_client = get_minio_client()
+    batch_files = list_bronze_batches(minio_client)
     logger.info(f"📦 Encontrados {len(batch_files)} batches")
     
-    # Carregar todos
+    # Carregar todos (downloads em paralelo)
     dfs = []
-    for i, batch_file in enumerate(batch_files, 1):
-        df = minio_client.download_parquet(settings.BUCKET_BRONZE_TMDB, batch_file)
+    downloads = minio_client.download_many(
+        settings.BUCKET_BRONZE_TMDB,
+        batch_files,
+        parser=lambda data: read_arrow_table(data).to_pandas(),
+        ordered=True
+    )
+    for i, (batch_file, df) in enumerate(downloads, 1):
+        if df is None:
+            raise RuntimeError(f"Falha ao baixar {batch_file} da Bronze")
         dfs.append(df)
         if i % 10 == 0:
             logger.info(f"  {i}/{len(batch_files)} batches carregados...")
@@ -78,65 +135,92 @@ def load_bronze_data() -> pd.DataFrame:
     return df_all
 
 
-def get_sqlalchemy_engine():
-    """Cria SQLAlchemy engine para PostgreSQL."""
-    connection_string = (
-        f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
-        f"@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
-    )
-    return create_engine(connection_string)
-
-
 def save_to_postgres(df: pd.DataFrame, table_name: str, schema: str = 'silver_tmdb'):
-    """Salva DataFrame no PostgreSQL usando TRUNCATE + APPEND em batches."""
+    """Salva DataFrame no PostgreSQL: TRUNCATE + COPY numa única transação."""
     logger.info(f"💾 Salvando {table_name} no PostgreSQL...")
     
-    engine = get_sqlalchemy_engine()
     conn = get_connection()
     
     try:
-        # 1. Truncar tabela
-        cur = conn.cursor()
-        cur.execute(f"TRUNCATE TABLE {schema}.{table_name} RESTART IDENTITY CASCADE")
-        conn.commit()
-        cur.close()
-        logger.info(f"  🗑️  Tabela {schema}.{table_name} truncada")
+        rows, elapsed = copy_replace_table(df, f"{schema}.{table_name}", conn)
+        rate = rows / elapsed if elapsed > 0 else 0
+        logger.info(f"✅ {schema}.{table_name}: {rows:,} registros salvos ({elapsed:.1f}s, {rate:,.0f} linhas/s)")
         
-        # 2. Inserir em batches PEQUENOS com COMMIT forçado
-        batch_size = 50  # ✅ REDUZIDO PARA 50
-        total_batches = (len(df) - 1) // batch_size + 1
+    except Exception as e:
+        logger.error(f"❌ Erro ao salvar {table_name}: {e}")
+        raise
+    finally:
+        conn.close()
+
+
+def stream_bronze_to_silver(max_workers: int = 4, prefetch: int = 8) -> dict:
+    """
+    Bronze → Silver batch a batch: transforma e faz COPY de cada record batch
+    assim que chega, numa única transação (TRUNCATE no início, COMMIT no fim).
+    
+    Filmes repetidos entre batches (re-extrações) ficam com o primeiro batch
+    na ordem das chaves.
+    
+    Returns:
+        Linhas carregadas por tabela
+    """
+    totals = dict.fromkeys(SILVER_TMDB_TABLES, 0)
+    seen_ids = set()
+    
+    conn = get_connection()
+    cur = conn.cursor()
+    
+    try:
+        tables = ", ".join(f"silver_tmdb.{table}" for table in SILVER_TMDB_TABLES)
+        cur.execute(f"TRUNCATE TABLE {tables} RESTART IDENTITY CASCADE")
         
-        for i in range(0, len(df), batch_size):
-            batch = df.iloc[i:i + batch_size]
+        for i, record_batch in enumerate(iter_bronze_batches(max_workers=max_workers, prefetch=prefetch), 1):
+            df_bronze = record_batch.to_pandas()
+            df_bronze = df_bronze[~df_bronze['movielens_id'].isin(seen_ids)]
+            df_bronze = df_bronze.drop_duplicates(subset='movielens_id').reset_index(drop=True)
+            seen_ids.update(df_bronze['movielens_id'].tolist())
+            
+            frames = {'movies_tmdb': transform_movies_main(df_bronze)}
+            frames.update(explode_json_dimensions(df_bronze))
             
-            # ✅ USAR CONEXÃO DIRETA (não SQLAlchemy) para controlar COMMIT
-            with engine.begin() as connection:
-                batch.to_sql(
-                    name=table_name,
-                    con=connection,
-                    schema=schema,
-                    if_exists='append',
-                    index=False,
-                    method='multi'
-                )
-            # ✅ COMMIT AUTOMÁTICO ao sair do 'with'
+            # movies_tmdb primeiro: as dimensões referenciam o filme
+            for table in SILVER_TMDB_TABLES:
+                df = frames[table]
+                if df.empty:
+                    continue
+                df = align_integer_columns(df, cur, f"silver_tmdb.{table}")
+                copy_dataframe(df, f"silver_tmdb.{table}", conn, commit=False)
+                totals[table] += len(df)
             
-            batch_num = i // batch_size + 1
-            if batch_num % 20 == 0 or batch_num == total_batches:
-                logger.info(f"  ✓ Batch {batch_num}/{total_batches} inserido ({len(batch)} registros)")
+            if i % 10 == 0:
+                logger.info(f"  {i} batches carregados ({totals['movies_tmdb']:,} filmes)...")
         
-        logger.info(f"✅ {schema}.{table_name}: {len(df):,} registros salvos")
+        conn.commit()
         
     except Exception as e:
-        logger.error(f"❌ Erro ao salvar {table_name}: {e}")
+        conn.rollback()
+        logger.error(f"❌ Erro no streaming Bronze → Silver: {e}")
         raise
     finally:
+        cur.close()
         conn.close()
-        engine.dispose()
+    
+    for table, rows in totals.items():
+        logger.info(f"✅ silver_tmdb.{table}: {rows:,} registros salvos")
+    
+    return totals
 
 
-def run_silver_pipeline_tmdb():
-    """Executa pipeline completo Bronze → Silver TMDB."""
+def run_silver_pipeline_tmdb(streaming: bool = True, max_workers: int = 4, prefetch: int = 8):
+    """
+    Executa pipeline completo Bronze → Silver TMDB.
+    
+    Args:
+        streaming: Se True, processa a Bronze batch a batch (memória constante);
+            se False, carrega tudo com pd.concat antes de transformar
+        max_workers: Threads de download no modo streaming
+        prefetch: Máximo de arquivos Bronze em voo no modo streaming
+    """
     start_time = time.time()
     
     logger.info("=" * 80)
@@ -146,6 +230,16 @@ def run_silver_pipeline_tmdb():
     # 1. Criar schemas
     create_schemas()
     
+    if streaming:
+        totals = stream_bronze_to_silver(max_workers=max_workers, prefetch=prefetch)
+        elapsed = time.time() - start_time
+        logger.info("=" * 80)
+        logger.info("🎉 PIPELINE SILVER CONCLUÍDO (streaming)!")
+        logger.info(f"🎬 movies_tmdb: {totals['movies_tmdb']:,}")
+        logger.info(f"⏱️  Tempo total: {elapsed:.2f}s ({elapsed/60:.2f}min)")
+        logger.info("=" * 80)
+        return
+    
     # 2. Carregar Bronze
     df_bronze = load_bronze_data()
     
@@ -156,20 +250,17 @@ def run_silver_pipeline_tmdb():
     df_movies = transform_movies_main(df_bronze)
     save_to_postgres(df_movies, 'movies_tmdb', 'silver_tmdb')
     
-    # 4. Transformar genres_tmdb
-    df_genres = transform_genres(df_bronze)
-    save_to_postgres(df_genres, 'genres_tmdb', 'silver_tmdb')
+    # 4. Explodir colunas JSON (genres, companies, countries, languages) de uma vez
+    dimensions = explode_json_dimensions(df_bronze)
+    df_genres = dimensions['genres_tmdb']
+    df_companies = dimensions['production_companies_tmdb']
+    df_countries = dimensions['production_countries_tmdb']
+    df_languages = dimensions['spoken_languages_tmdb']
     
-    # 5. Transformar production_companies_tmdb
-    df_companies = transform_production_companies(df_bronze)
+    # 5. Salvar tabelas normalizadas
+    save_to_postgres(df_genres, 'genres_tmdb', 'silver_tmdb')
     save_to_postgres(df_companies, 'production_companies_tmdb', 'silver_tmdb')
-    
-    # 6. Transformar production_countries_tmdb
-    df_countries = transform_production_countries(df_bronze)
     save_to_postgres(df_countries, 'production_countries_tmdb', 'silver_tmdb')
-    
-    # 7. Transformar spoken_languages_tmdb
-    df_languages = transform_spoken_languages(df_bronze)
     save_to_postgres(df_languages, 'spoken_languages_tmdb', 'silver_tmdb')
     
     # Resumo
@@ -187,4 +278,7 @@ def run_silver_pipeline_tmdb():
 
 
 if __name__ == "__main__":
-    run_silver_pipeline_tmdb()
\ No newline at end of file
+    import sys
+    
+    # --in-memory: modo antigo (concat de toda a Bronze antes de transformar)
+    run_silver_pipeline_tmdb(streaming="--in-memory" not in sys.argv)
\ No newline at end of file
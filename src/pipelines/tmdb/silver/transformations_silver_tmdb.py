@@ -3,7 +3,11 @@ Transformações Bronze → Silver para TMDB
 """
 import pandas as pd
 import json
+import pyarrow as pa
+import pyarrow.json as pa_json
+import pyarrow.compute as pc
 from datetime import datetime
+from typing import Dict
 
 
 def transform_movies_main(df: pd.DataFrame) -> pd.DataFrame:
@@ -189,4 +193,168 @@ def transform_spoken_languages(df: pd.DataFrame) -> pd.DataFrame:
         except (json.JSONDecodeError, KeyError, TypeError, ValueError):
             continue
     
-    return pd.DataFrame(languages_list).reset_index(drop=True)
\ No newline at end of file
+    return pd.DataFrame(languages_list).reset_index(drop=True)
+
+
+# Colunas JSON da Bronze: tabela Silver, schema Arrow dos objetos da lista,
+# mapeamento campo → coluna Silver e campos obrigatórios.
+JSON_DIMENSIONS = {
+    'genres': {
+        'table': 'genres_tmdb',
+        'fields': [('id', pa.int64()), ('name', pa.string())],
+        'columns': {'id': 'genre_id', 'name': 'genre_name'},
+        'required': ['id', 'name'],
+    },
+    'production_companies': {
+        'table': 'production_companies_tmdb',
+        'fields': [
+            ('id', pa.int64()), ('name', pa.string()),
+            ('logo_path', pa.string()), ('origin_country', pa.string())
+        ],
+        'columns': {
+            'id': 'company_id', 'name': 'company_name',
+            'logo_path': 'company_logo_path', 'origin_country': 'company_country'
+        },
+        'required': ['id', 'name'],
+    },
+    'production_countries': {
+        'table': 'production_countries_tmdb',
+        'fields': [('iso_3166_1', pa.string()), ('name', pa.string())],
+        'columns': {'iso_3166_1': 'country_code', 'name': 'country_name'},
+        'required': ['iso_3166_1', 'name'],
+    },
+    'spoken_languages': {
+        'table': 'spoken_languages_tmdb',
+        'fields': [
+            ('iso_639_1', pa.string()), ('name', pa.string()), ('english_name', pa.string())
+        ],
+        'columns': {
+            'iso_639_1': 'language_code', 'name': 'language_name',
+            'english_name': 'language_english_name'
+        },
+        'required': ['iso_639_1', 'name'],
+    },
+}
+
+
+def _to_json_text(value) -> str:
+    """Normaliza o valor da célula para texto JSON ('null' se ausente)."""
+    if isinstance(value, str) and value.strip():
+        return value
+    if isinstance(value, list):
+        return json.dumps(value)
+    return 'null'
+
+
+def _parse_json_rows(texts: pd.Series, list_type: pa.DataType) -> pa.Array:
+    """Fallback linha a linha (só usado se o lote tiver JSON inválido)."""
+    field_names = [field.name for field in list_type.value_type]
+    rows = []
+    for text in texts:
+        try:
+            items = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            items = None
+        if not isinstance(items, list):
+            rows.append(None)
+            continue
+        rows.append([
+            {name: item.get(name) for name in field_names}
+            for item in items if isinstance(item, dict)
+        ])
+    try:
+        return pa.array(rows, type=list_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Tipos inesperados (ex: id como texto): converte campo a campo
+        return pa.array(
+            [None if row is None else [
+                {name: _coerce(item.get(name), field.type)
+                 for name, field in zip(field_names, list_type.value_type)}
+                for item in row
+            ] for row in rows],
+            type=list_type
+        )
+
+
+def _coerce(value, arrow_type):
+    try:
+        if value is None:
+            return None
+        return int(value) if pa.types.is_integer(arrow_type) else str(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_json_column(values: pd.Series, fields) -> pa.Array:
+    """
+    Parseia uma coluna de strings JSON (listas de objetos) numa única
+    passada do leitor JSON do Arrow (multithread, em C++), sem json.loads
+    por linha. Retorna um ListArray alinhado com as linhas de entrada.
+    """
+    list_type = pa.list_(pa.struct(fields))
+    texts = values.map(_to_json_text)
+    if texts.empty:
+        return pa.array([], type=list_type)
+
+    payload = ('{"v":' + texts + '}').str.cat(sep='\n').encode('utf-8')
+    parse_options = pa_json.ParseOptions(
+        explicit_schema=pa.schema([('v', list_type)]),
+        unexpected_field_behavior='ignore'
+    )
+    try:
+        table = pa_json.read_json(pa.BufferReader(payload), parse_options=parse_options)
+        parsed = table.column('v').combine_chunks()
+        if len(parsed) == len(texts):
+            return parsed
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    return _parse_json_rows(texts, list_type)
+
+
+def explode_json_dimensions(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Explode as quatro colunas JSON da Bronze (genres, production_companies,
+    production_countries, spoken_languages) de uma vez, parseando cada
+    coluna uma única vez e montando os DataFrames Silver de forma colunar.
+
+    Equivale a transform_genres, transform_production_companies,
+    transform_production_countries e transform_spoken_languages.
+
+    Returns:
+        Dict tabela Silver → DataFrame normalizado
+    """
+    base = pd.DataFrame({
+        'movielens_id': pd.to_numeric(df['movielens_id'], errors='coerce'),
+        'imdb_id': df['imdb_id'],
+        'tmdb_id': pd.to_numeric(df['id'], errors='coerce'),
+    }).reset_index(drop=True)
+
+    frames = {}
+    for json_column, spec in JSON_DIMENSIONS.items():
+        output_columns = ['movielens_id', 'imdb_id', 'tmdb_id'] + list(spec['columns'].values())
+
+        if json_column not in df.columns:
+            frames[spec['table']] = pd.DataFrame(columns=output_columns)
+            continue
+
+        parsed = parse_json_column(df[json_column].reset_index(drop=True), spec['fields'])
+        parents = pc.list_parent_indices(parsed).to_numpy()
+        items = pc.list_flatten(parsed)
+
+        exploded = base.iloc[parents].reset_index(drop=True)
+        # flatten() aplica a validade do struct pai a cada campo
+        for field_array, (field_name, _) in zip(items.flatten(), spec['fields']):
+            exploded[spec['columns'][field_name]] = field_array.to_pandas()
+
+        required = ['movielens_id', 'tmdb_id'] + [spec['columns'][f] for f in spec['required']]
+        exploded = exploded.dropna(subset=required)
+        exploded['movielens_id'] = exploded['movielens_id'].astype(int)
+        exploded['tmdb_id'] = exploded['tmdb_id'].astype(int)
+        for field_name, arrow_type in spec['fields']:
+            if pa.types.is_integer(arrow_type):
+                column = spec['columns'][field_name]
+                exploded[column] = exploded[column].astype(int)
+
+        frames[spec['table']] = exploded[output_columns].reset_index(drop=True)
+
+    return frames
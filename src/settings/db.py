@@ -1,6 +1,8 @@
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import execute_values
 import os
+import time
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 
@@ -34,10 +36,395 @@ def get_sqlalchemy_engine():
     return create_engine(connection_string)
 
 
-def insert_dataframe(columns, table_name, conn, batch_size=50000, values=None):
+class DataFrameCSVStream:
+    """
+    Arquivo somente-leitura que gera o CSV de um DataFrame sob demanda,
+    fatia a fatia, para alimentar COPY FROM STDIN sem materializar o CSV
+    inteiro em memória.
+    """
+
+    def __init__(self, df, chunk_rows=50_000, na_rep='\\N'):
+        self._chunks = (
+            df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows)
+        )
+        self._na_rep = na_rep
+        self._buffer = ''
+        self._pos = 0
+
+    def _fill(self):
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk.to_csv(
+            index=False, header=False, na_rep=self._na_rep
+        )
+        self._pos = 0
+        return True
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while self._fill():
+                pass
+            size = len(self._buffer) - self._pos
+        while len(self._buffer) - self._pos < size and self._fill():
+            pass
+        data = self._buffer[self._pos:self._pos + size]
+        self._pos += len(data)
+        return data
+
+
+def copy_dataframe(df, table_name, conn, columns=None, commit=True, chunk_rows=50_000):
+    """
+    Carrega um DataFrame via COPY FROM STDIN, gerando o CSV em fatias de
+    chunk_rows linhas. Não monta tuplas Python por linha.
+    Com commit=False a transação fica aberta para o chamador.
+    Retorna (linhas carregadas, segundos).
+    """
+    if df is None or df.empty:
+        print("O DataFrame está vazio. Nada para copiar.")
+        return 0, 0.0
+
+    columns = columns or df.columns.tolist()
+    column_names = ", ".join(columns)
+    query = (
+        f"COPY {table_name} ({column_names}) "
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+
+    start = time.perf_counter()
+    stream = DataFrameCSVStream(df[columns], chunk_rows=chunk_rows)
+
+    cur = None
+    try:
+        cur = conn.cursor()
+        cur.copy_expert(query, stream, size=1 << 20)
+        if commit:
+            conn.commit()
+
+    except Exception as e:
+        conn.rollback()
+        raise e
+
+    finally:
+        if cur:
+            cur.close()
+
+    return len(df), time.perf_counter() - start
+
+
+INTEGER_TYPES = ("smallint", "integer", "bigint")
+
+
+def align_integer_columns(df, cur, table_name):
+    """
+    Converte colunas float do DataFrame que vão para colunas inteiras da
+    tabela em Int64 (o COPY rejeita '123.0' em BIGINT; o to_sql convertia).
+    """
+    schema, table = table_name.split(".")
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND data_type IN %s
+        """,
+        (schema, table, INTEGER_TYPES)
+    )
+    integer_columns = {row[0] for row in cur.fetchall()}
+    casts = {
+        col: df[col].round().astype("Int64")
+        for col in df.columns
+        if col in integer_columns and df[col].dtype.kind == "f"
+    }
+    return df.assign(**casts) if casts else df
+
+
+def copy_replace_table(df, table_name, conn, chunk_rows=50_000):
+    """
+    Substitui o conteúdo de uma tabela numa única transação:
+    TRUNCATE ... RESTART IDENTITY CASCADE + COPY FROM STDIN em streaming.
+    Retorna (linhas carregadas, segundos).
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"TRUNCATE TABLE {table_name} RESTART IDENTITY CASCADE")
+        df = align_integer_columns(df, cur, table_name)
+        copy_dataframe(df, table_name, conn, commit=False, chunk_rows=chunk_rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return len(df), time.perf_counter() - start
+
+
+MERGE_STAGE_TABLE = "pg_temp._merge_stage"
+
+
+def merge_dataframe(df, table_name, conn, key_columns, update_columns=None,
+                    commit=True, chunk_rows=50_000):
+    """
+    Upsert idempotente: COPY do DataFrame para uma tabela temporária e
+    INSERT ... ON CONFLICT (key_columns) na tabela destino.
+
+    Linhas novas são inseridas; linhas existentes só são atualizadas quando
+    alguma coluna de update_columns mudou (IS DISTINCT FROM), o resto conta
+    como inalterado. Sem update_columns (padrão: colunas do df fora da
+    chave) o conflito vira DO NOTHING. A chave precisa de PK/UNIQUE na
+    tabela destino; repetições da chave dentro do df mantêm a última linha.
+
+    Returns:
+        Dict com 'inserted', 'updated', 'unchanged' e 'seconds'
+    """
+    if df is None or df.empty:
+        return {"inserted": 0, "updated": 0, "unchanged": 0, "seconds": 0.0}
+
+    start = time.perf_counter()
+    columns = df.columns.tolist()
+    if update_columns is None:
+        update_columns = [col for col in columns if col not in key_columns]
+
+    column_names = ", ".join(columns)
+    key_names = ", ".join(key_columns)
+    if update_columns:
+        assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+        changed = " OR ".join(
+            f"target.{col} IS DISTINCT FROM EXCLUDED.{col}" for col in update_columns
+        )
+        conflict = f"DO UPDATE SET {assignments} WHERE {changed}"
+    else:
+        conflict = "DO NOTHING"
+
+    cur = conn.cursor()
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {MERGE_STAGE_TABLE}")
+        cur.execute(
+            f"CREATE TEMP TABLE {MERGE_STAGE_TABLE} "
+            f"(LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        df = align_integer_columns(df, cur, table_name)
+        copy_dataframe(df, MERGE_STAGE_TABLE, conn, commit=False, chunk_rows=chunk_rows)
+
+        # xmax = 0 na tupla retornada identifica INSERT; no UPDATE do ON CONFLICT ele vem preenchido
+        cur.execute(
+            f"""
+            WITH merged AS (
+                INSERT INTO {table_name} AS target ({column_names})
+                SELECT DISTINCT ON ({key_names}) {column_names}
+                FROM {MERGE_STAGE_TABLE}
+                ORDER BY {key_names}, ctid DESC
+                ON CONFLICT ({key_names}) {conflict}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE inserted),
+                COUNT(*) FILTER (WHERE NOT inserted),
+                (SELECT COUNT(DISTINCT ({key_names})) FROM {MERGE_STAGE_TABLE})
+            FROM merged
+            """
+        )
+        inserted, updated, staged = cur.fetchone()
+        if commit:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": staged - inserted - updated,
+        "seconds": time.perf_counter() - start
+    }
+
+
+SHADOW_SUFFIX = "__next"
+PREVIOUS_SUFFIX = "__prev"
+_SWAP_SUFFIXES = (SHADOW_SUFFIX, PREVIOUS_SUFFIX, "__swap")
+
+
+def _suffixed(name, suffix):
+    """Acrescenta o sufixo respeitando o limite de 63 caracteres do Postgres."""
+    return name[:63 - len(suffix)] + suffix
+
+
+def _base_name(name):
+    for suffix in _SWAP_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _rename_with_indexes(cur, schema, table, new_table, index_suffix):
+    """
+    Renomeia a tabela e seus índices (e as constraints que eles sustentam).
+    O nome base de cada índice recebe index_suffix ('' = nome original).
+    """
+    cur.execute(
+        """
+        SELECT i.relname FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+        """,
+        (f"{schema}.{table}",)
+    )
+    for (index_name,) in cur.fetchall():
+        new_index = _suffixed(_base_name(index_name), index_suffix) if index_suffix else _base_name(index_name)
+        if new_index != index_name:
+            cur.execute(f"ALTER INDEX {schema}.{index_name} RENAME TO {new_index}")
+    cur.execute(f"ALTER TABLE {schema}.{table} RENAME TO {new_table}")
+
+
+def _build_shadow_indexes(cur, schema, table, shadow):
+    """Recria na tabela sombra os índices (e PK/UNIQUE) da tabela viva."""
+    cur.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid), c.contype
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+        WHERE x.indrelid = %s::regclass
+        """,
+        (f"{schema}.{table}",)
+    )
+    for index_name, index_def, contype in cur.fetchall():
+        shadow_index = _suffixed(index_name, SHADOW_SUFFIX)
+        head, _, tail = index_def.partition(" ON ")
+        head = head.replace(f"INDEX {index_name}", f"INDEX {shadow_index}", 1)
+        tail = f"{schema}.{shadow} " + tail.split(" ", 1)[1]
+        cur.execute(f"{head} ON {tail}")
+        if contype in ("p", "u"):
+            kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+            cur.execute(
+                f"ALTER TABLE {schema}.{shadow} ADD CONSTRAINT {shadow_index} "
+                f"{kind} USING INDEX {shadow_index}"
+            )
+
+
+def _dependent_objects(cur, relation):
+    """Views/materialized views e FKs de outras tabelas que dependem de relation."""
+    cur.execute("SELECT to_regclass(%s)", (relation,))
+    if cur.fetchone()[0] is None:
+        return []
+    cur.execute(
+        """
+        SELECT DISTINCT r.ev_class::regclass::text
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid AND d.classid = 'pg_rewrite'::regclass
+        WHERE d.refobjid = %s::regclass AND r.ev_class <> d.refobjid
+        UNION
+        SELECT conrelid::regclass::text
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = %s::regclass AND conrelid <> confrelid
+        """,
+        (relation, relation)
+    )
+    return sorted(row[0] for row in cur.fetchall())
+
+
+def swap_replace_table(df, table_name, conn, chunk_rows=50_000, lock_timeout="5s", retries=3):
+    """
+    Recarrega uma tabela sem que leitores vejam dados parciais:
+    carrega <tabela>__next (COPY), cria índices e roda ANALYZE nela, e só
+    então troca os nomes numa transação curta. A versão anterior fica em
+    <tabela>__prev para rollback instantâneo (ver rollback_table_swap).
+
+    FKs entre tabelas não são copiadas para a sombra (LIKE não as copia).
+    Views e FKs acompanham a tabela renomeada para __prev; se ainda houver
+    dependentes nela no swap seguinte, o swap falha em vez de apagá-los
+    (reconstrua as views, ex: settings.matviews, antes de recarregar).
+    Retorna (linhas carregadas, segundos).
+    """
+    start = time.perf_counter()
+    schema, table = table_name.split(".")
+    shadow = _suffixed(table, SHADOW_SUFFIX)
+    previous = _suffixed(table, PREVIOUS_SUFFIX)
+
+    cur = conn.cursor()
+    try:
+        # 0. Falha cedo (antes da carga) se algo ainda aponta para a versão anterior
+        dependents = _dependent_objects(cur, f"{schema}.{previous}")
+        conn.rollback()
+        if dependents:
+            raise RuntimeError(
+                f"{schema}.{previous} ainda tem dependentes ({', '.join(dependents)}); "
+                f"reconstrua-os sobre {table_name} antes de recarregá-la"
+            )
+
+        # 1. Monta e carrega a sombra (leitores seguem na tabela viva)
+        cur.execute(f"DROP TABLE IF EXISTS {schema}.{shadow}")
+        cur.execute(
+            f"CREATE TABLE {schema}.{shadow} "
+            f"(LIKE {table_name} INCLUDING ALL EXCLUDING INDEXES)"
+        )
+        df = align_integer_columns(df, cur, table_name)
+        copy_dataframe(df, f"{schema}.{shadow}", conn, commit=False, chunk_rows=chunk_rows)
+        conn.commit()
+
+        # 2. Índices e estatísticas na sombra
+        _build_shadow_indexes(cur, schema, table, shadow)
+        cur.execute(f"ANALYZE {schema}.{shadow}")
+        conn.commit()
+
+        # 3. Troca atômica (só operações de catálogo)
+        for attempt in range(1, retries + 1):
+            try:
+                cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+                cur.execute(f"DROP TABLE IF EXISTS {schema}.{previous}")
+                _rename_with_indexes(cur, schema, table, previous, PREVIOUS_SUFFIX)
+                _rename_with_indexes(cur, schema, shadow, table, "")
+                conn.commit()
+                break
+            except psycopg2.errors.LockNotAvailable:
+                conn.rollback()
+                if attempt == retries:
+                    raise
+                time.sleep(attempt)
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return len(df), time.perf_counter() - start
+
+
+def rollback_table_swap(table_name, conn):
+    """Volta a versão anterior (<tabela>__prev) para o lugar da tabela viva."""
+    schema, table = table_name.split(".")
+    previous = _suffixed(table, PREVIOUS_SUFFIX)
+    parked = _suffixed(table, "__swap")
+
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT to_regclass(%s)", (f"{schema}.{previous}",))
+        if cur.fetchone()[0] is None:
+            raise ValueError(f"Sem versão anterior para {table_name}")
+        _rename_with_indexes(cur, schema, table, parked, "__swap")
+        _rename_with_indexes(cur, schema, previous, table, "")
+        _rename_with_indexes(cur, schema, parked, previous, PREVIOUS_SUFFIX)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def insert_dataframe(columns, table_name, conn, batch_size=50000, values=None,
+                     df=None, use_copy=False):
     """
     Insere dados usando execute_values do psycopg2.
+    Com use_copy=True e um DataFrame em df, usa COPY (ver copy_dataframe).
     """
+    if use_copy:
+        copy_dataframe(df, table_name, conn, columns=columns)
+        return
+
     if not values:
         print("A lista de valores está vazia. Nada para inserir.")
         return
@@ -0,0 +1,183 @@
+"""
+Materialized views dos rollups Gold consultados pela API.
+
+Cada view tem um índice único (exigido pelo REFRESH ... CONCURRENTLY) e
+pertence a um grupo de pipeline ('movielens' ou 'tmdb'); o pipeline Gold
+chama refresh_materialized_views(grupo) ao terminar.
+
+Views guardam o OID das tabelas, não o nome: depois de swap_replace_table
+elas continuam lendo <tabela>__prev. Nesse caso a view é reconstruída
+(nova view sombra + troca de nomes); sem swap, REFRESH CONCURRENTLY
+atualiza sem bloquear leitores.
+"""
+import time
+from settings.db import get_connection, SHADOW_SUFFIX, PREVIOUS_SUFFIX
+
+STALE_SUFFIXES = (SHADOW_SUFFIX, PREVIOUS_SUFFIX, "__swap")
+
+MATERIALIZED_VIEWS = {
+    "movielens": [
+        {
+            "name": "gold.mv_movielens_stats",
+            "unique": ["stats_id"],
+            "query": """
+                SELECT
+                    1 as stats_id,
+                    COUNT(DISTINCT dm.movieid) as total_movies,
+                    SUM(fmr.total_users) as total_users,
+                    SUM(fmr.total_ratings) as total_ratings,
+                    AVG(fmr.avg_rating) as avg_rating
+                FROM gold.dim_movies dm
+                LEFT JOIN gold.fact_movie_ratings fmr ON dm.movieid = fmr.movieid
+            """
+        },
+        {
+            "name": "gold.mv_genre_stats",
+            "unique": ["genre_id"],
+            "query": """
+                SELECT
+                    dg.genre_id,
+                    dg.genre_name,
+                    COUNT(DISTINCT fmg.movieid) as total_movies,
+                    COALESCE(SUM(fmr.total_ratings), 0) as total_ratings,
+                    COALESCE(AVG(fmr.avg_rating), 0) as avg_rating
+                FROM gold.dim_genres dg
+                JOIN gold.fact_movie_genres fmg ON dg.genre_id = fmg.genre_id
+                LEFT JOIN gold.fact_movie_ratings fmr ON fmg.movieid = fmr.movieid
+                GROUP BY dg.genre_id, dg.genre_name
+            """
+        },
+        {
+            "name": "gold.mv_movies_by_decade",
+            "unique": ["decade"],
+            "query": """
+                SELECT
+                    FLOOR(release_year / 10) * 10 as decade,
+                    COUNT(*) as count
+                FROM gold.dim_movies
+                WHERE release_year IS NOT NULL
+                GROUP BY decade
+            """
+        },
+    ],
+    "tmdb": [
+        {
+            "name": "gold_tmdb.mv_genre_revenue",
+            "unique": ["genre"],
+            "query": """
+                WITH genre_split AS (
+                    SELECT
+                        movielens_id,
+                        TRIM(UNNEST(STRING_TO_ARRAY(genres_list, ','))) as genre,
+                        revenue,
+                        roi
+                    FROM gold_tmdb.dim_movies_tmdb
+                    WHERE has_revenue = true AND genres_list IS NOT NULL
+                )
+                SELECT
+                    genre,
+                    COUNT(*) as total_movies,
+                    COALESCE(SUM(revenue), 0) as total_revenue,
+                    COALESCE(AVG(revenue), 0) as avg_revenue,
+                    COALESCE(AVG(roi), 0.0) as avg_roi
+                FROM genre_split
+                GROUP BY genre
+            """
+        },
+        {
+            "name": "gold_tmdb.mv_revenue_by_decade",
+            "unique": ["decade"],
+            "query": """
+                SELECT
+                    release_decade as decade,
+                    COUNT(*) as movie_count,
+                    COALESCE(SUM(revenue), 0) as total_revenue,
+                    COALESCE(AVG(revenue), 0) as avg_revenue
+                FROM gold_tmdb.dim_movies_tmdb
+                WHERE has_revenue = true AND release_decade IS NOT NULL
+                GROUP BY release_decade
+            """
+        },
+    ],
+}
+
+
+def _stale_dependencies(cur, name):
+    """Relações de swap (__prev/__next/__swap) das quais a view ainda depende."""
+    cur.execute(
+        """
+        SELECT DISTINCT c.relname
+        FROM pg_rewrite r
+        JOIN pg_depend d ON d.objid = r.oid AND d.classid = 'pg_rewrite'::regclass
+        JOIN pg_class c ON c.oid = d.refobjid
+        WHERE r.ev_class = %s::regclass AND c.oid <> r.ev_class
+        """,
+        (name,)
+    )
+    return [relname for (relname,) in cur.fetchall() if relname.endswith(STALE_SUFFIXES)]
+
+
+def _rebuild_view(cur, view, lock_timeout):
+    """
+    Cria a view como <nome>__next (fora do lock) e troca com a atual numa
+    transação curta; também serve para criar uma view que ainda não existe.
+    """
+    schema, name = view["name"].split(".")
+    shadow = f"{name}{SHADOW_SUFFIX}"
+    cur.execute(f"DROP MATERIALIZED VIEW IF EXISTS {schema}.{shadow}")
+    cur.execute(f"CREATE MATERIALIZED VIEW {schema}.{shadow} AS {view['query']} WITH DATA")
+    cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+    cur.execute(f"DROP MATERIALIZED VIEW IF EXISTS {view['name']}")
+    cur.execute(f"ALTER MATERIALIZED VIEW {schema}.{shadow} RENAME TO {name}")
+    cur.execute(
+        f"CREATE UNIQUE INDEX {name}_key ON {view['name']} ({', '.join(view['unique'])})"
+    )
+
+
+def refresh_materialized_views(group, lock_timeout="5s"):
+    """
+    Atualiza as materialized views de um grupo ('movielens' ou 'tmdb').
+
+    View inexistente ou presa a uma tabela trocada por swap: reconstruída.
+    Caso contrário: REFRESH MATERIALIZED VIEW CONCURRENTLY. Uma view com
+    falha não impede as demais (a API lê as tabelas base como fallback).
+
+    Returns:
+        Dict {view: 'created' | 'rebuilt' | 'refreshed' | 'failed'}
+    """
+    print(f"\n🔄 Atualizando materialized views ({group})...")
+    results = {}
+    conn = get_connection()
+    try:
+        for view in MATERIALIZED_VIEWS[group]:
+            start = time.perf_counter()
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT to_regclass(%s)", (view["name"],))
+                if cur.fetchone()[0] is None:
+                    _rebuild_view(cur, view, lock_timeout)
+                    results[view["name"]] = "created"
+                elif _stale_dependencies(cur, view["name"]):
+                    _rebuild_view(cur, view, lock_timeout)
+                    results[view["name"]] = "rebuilt"
+                else:
+                    cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view['name']}")
+                    results[view["name"]] = "refreshed"
+                conn.commit()
+                print(f"  ✅ {view['name']}: {results[view['name']]} ({time.perf_counter() - start:.1f}s)")
+            except Exception as e:
+                conn.rollback()
+                results[view["name"]] = "failed"
+                print(f"  ❌ {view['name']}: {e}")
+            finally:
+                cur.close()
+    finally:
+        conn.close()
+    return results
+
+
+if __name__ == "__main__":
+    # Reconstrói/atualiza as views de um grupo fora da pipeline (ex: após falha)
+    import sys
+    for group in sys.argv[1:] or list(MATERIALIZED_VIEWS):
+        refresh_materialized_views(group)
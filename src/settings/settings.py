@@ -48,6 +48,14 @@ class Settings:
     TMDB_BATCH_SIZE = 100
     TMDB_RETRY_ATTEMPTS = 3
     
+    # Cache HTTP persistente da extração TMDB
+    TMDB_CACHE_PATH = os.getenv("TMDB_CACHE_PATH", "logs/tmdb_http_cache.sqlite")
+    TMDB_CACHE_TTL_HOURS = float(os.getenv("TMDB_CACHE_TTL_HOURS", "168"))
+    TMDB_CACHE_MAX_MB = float(os.getenv("TMDB_CACHE_MAX_MB", "2048"))
+    
+    # Gold: erro padrão aceito nas contagens distintas aproximadas (HyperLogLog)
+    GOLD_DISTINCT_ERROR = float(os.getenv("GOLD_DISTINCT_ERROR", "0.023"))
+    
     # Schemas PostgreSQL
     SCHEMA_SILVER_MOVIELENS = "silver"
     SCHEMA_SILVER_TMDB = "silver_tmdb"
@@ -0,0 +1,270 @@
+"""
+Testes do AsyncTMDBClient contra um TMDB stub local (httpx.MockTransport).
+"""
+import asyncio
+import time
+
+import httpx
+import pandas as pd
+import pytest
+
+from src.api_clients.async_tmdb_client import AsyncTMDBClient, TokenBucket, parse_retry_after
+
+
+class StubTMDB:
+    """TMDB falso: responde pela fila de respostas de cada path e registra as requisições."""
+
+    def __init__(self, routes):
+        self.routes = {path: list(responses) for path, responses in routes.items()}
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append((time.monotonic(), request))
+        responses = self.routes.get(request.url.path)
+        if not responses:
+            return httpx.Response(404, json={"status_code": 34})
+        return responses.pop(0) if len(responses) > 1 else responses[0]
+
+    def paths(self):
+        return [request.url.path for _, request in self.requests]
+
+
+def make_client(stub, **kwargs):
+    kwargs.setdefault("max_requests_per_second", 1000)
+    kwargs.setdefault("retries", 3)
+    return AsyncTMDBClient(
+        api_key="test",
+        base_url="https://tmdb.stub/3",
+        http2=False,
+        transport=httpx.MockTransport(stub),
+        **kwargs
+    )
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# ============ TOKEN BUCKET ============
+def test_token_bucket_holds_rate():
+    async def acquire_all(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Rajada de 1 token: 11 aquisições a 20/s precisam de ~10 intervalos de 50ms
+    elapsed = run(acquire_all(TokenBucket(rate=20, capacity=1), 11))
+    assert 0.45 <= elapsed < 1.0
+
+
+def test_token_bucket_allows_burst_up_to_capacity():
+    async def acquire_all(bucket, n):
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert run(acquire_all(TokenBucket(rate=5, capacity=5), 5)) < 0.05
+
+
+def test_client_requests_follow_bucket_rate():
+    stub = StubTMDB({"/3/movie/603": [httpx.Response(200, json={"id": 603})]})
+
+    async def fetch():
+        async with make_client(stub, max_requests_per_second=20) as client:
+            client.bucket.capacity = client.bucket.tokens = 1
+            for _ in range(6):
+                await client.get_movie_details(603)
+
+    run(fetch())
+    times = [t for t, _ in stub.requests]
+    assert len(times) == 6
+    assert times[-1] - times[0] >= 0.2
+
+
+# ============ 429 / RETRY-AFTER ============
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None, default=1.5) == 1.5
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("lixo", default=3.0) == 3.0
+
+
+def test_429_waits_retry_after_then_succeeds():
+    stub = StubTMDB({"/3/movie/603": [
+        httpx.Response(429, headers={"Retry-After": "0.3"}),
+        httpx.Response(200, json={"id": 603, "title": "The Matrix"}),
+    ]})
+
+    async def fetch():
+        async with make_client(stub) as client:
+            return await client.get_movie_details(603)
+
+    assert run(fetch()) == {"id": 603, "title": "The Matrix"}
+    assert len(stub.requests) == 2
+    assert stub.requests[1][0] - stub.requests[0][0] >= 0.3
+
+
+def test_429_pauses_whole_bucket():
+    stub = StubTMDB({
+        "/3/movie/1": [
+            httpx.Response(429, headers={"Retry-After": "0.3"}),
+            httpx.Response(200, json={"id": 1}),
+        ],
+        "/3/movie/2": [httpx.Response(200, json={"id": 2})],
+    })
+
+    async def fetch():
+        async with make_client(stub) as client:
+            first = asyncio.ensure_future(client.get_movie_details(1))
+            await asyncio.sleep(0.05)
+            await client.get_movie_details(2)
+            await first
+
+    run(fetch())
+    first_request = stub.requests[0][0]
+    assert all(t - first_request >= 0.3 for t, _ in stub.requests[1:])
+
+
+# ============ 5xx ============
+def test_5xx_is_retried():
+    stub = StubTMDB({"/3/movie/603": [
+        httpx.Response(503),
+        httpx.Response(200, json={"id": 603}),
+    ]})
+
+    async def fetch():
+        async with make_client(stub) as client:
+            return await client.get_movie_details(603)
+
+    assert run(fetch()) == {"id": 603}
+    assert len(stub.requests) == 2
+
+
+def test_5xx_raises_after_last_attempt():
+    stub = StubTMDB({"/3/movie/603": [httpx.Response(500)]})
+
+    async def fetch():
+        async with make_client(stub, retries=2) as client:
+            return await client.get_movie_details(603)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(fetch())
+    assert len(stub.requests) == 2
+
+
+def test_persistent_429_raises():
+    stub = StubTMDB({"/3/movie/603": [httpx.Response(429, headers={"Retry-After": "0"})]})
+
+    async def fetch():
+        async with make_client(stub, retries=2) as client:
+            return await client.get_movie_details(603)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(fetch())
+    assert len(stub.requests) == 2
+
+
+def test_connection_error_raises_after_last_attempt():
+    def refuse(request):
+        raise httpx.ConnectError("conexão recusada", request=request)
+
+    async def fetch():
+        async with make_client(refuse, retries=1) as client:
+            return await client.get_movie_details(603)
+
+    with pytest.raises(httpx.ConnectError):
+        run(fetch())
+
+
+def test_404_returns_empty_without_retry():
+    stub = StubTMDB({})
+
+    async def fetch():
+        async with make_client(stub) as client:
+            return await client.get_movie_details(999)
+
+    assert run(fetch()) == {}
+    assert len(stub.requests) == 1
+
+
+# ============ EXTRAÇÃO (known_tmdb_id + append_to_response) ============
+@pytest.fixture
+def extractor():
+    """TMDBMoviesExtractorV3 sem MinIO/Postgres (só os métodos de extração)."""
+    module = pytest.importorskip("src.pipelines.tmdb.bronze.extract_tmdb_movies")
+    instance = module.TMDBMoviesExtractorV3.__new__(module.TMDBMoviesExtractorV3)
+    instance.with_credits = True
+    instance.not_found = []
+    return instance
+
+
+def extract(extractor, stub, row):
+    async def fetch():
+        async with make_client(stub) as client:
+            return await extractor.extract_single_movie_async(row, client, asyncio.Semaphore(1))
+    return run(fetch())
+
+
+def movie_row(tmdbid):
+    return pd.Series({"movieid": 2571, "title": "Matrix, The (1999)", "imdbid": "133093", "tmdbid": tmdbid})
+
+
+def test_known_tmdb_id_skips_find_and_appends_credits(extractor):
+    stub = StubTMDB({"/3/movie/603": [httpx.Response(200, json={
+        "id": 603, "credits": {"cast": [{"name": "Keanu Reeves"}], "crew": []}
+    })]})
+
+    movie = extract(extractor, stub, movie_row("603"))
+
+    assert stub.paths() == ["/3/movie/603"]
+    assert stub.requests[0][1].url.params["append_to_response"] == "credits"
+    assert movie["movielens_id"] == 2571
+    assert movie["imdb_id"] == "tt0133093"
+
+    credits = extractor.split_credits([movie])
+    assert "credits" not in movie
+    assert credits[0]["tmdb_id"] == 603
+
+
+def test_missing_tmdb_id_uses_find(extractor):
+    stub = StubTMDB({
+        "/3/find/tt0133093": [httpx.Response(200, json={"movie_results": [{"id": 603}]})],
+        "/3/movie/603": [httpx.Response(200, json={"id": 603})],
+    })
+
+    extract(extractor, stub, movie_row(None))
+
+    assert stub.paths() == ["/3/find/tt0133093", "/3/movie/603"]
+    assert stub.requests[0][1].url.params["external_source"] == "imdb_id"
+
+
+def test_stale_tmdb_id_falls_back_to_find(extractor):
+    stub = StubTMDB({
+        "/3/find/tt0133093": [httpx.Response(200, json={"movie_results": [{"id": 603}]})],
+        "/3/movie/603": [httpx.Response(200, json={"id": 603})],
+    })
+
+    movie = extract(extractor, stub, movie_row("111"))
+
+    assert stub.paths() == ["/3/movie/111", "/3/find/tt0133093", "/3/movie/603"]
+    assert movie["id"] == 603
+
+
+def test_missing_movie_is_not_found_not_error(extractor):
+    stub = StubTMDB({"/3/find/tt0133093": [httpx.Response(200, json={"movie_results": []})]})
+
+    movie = extract(extractor, stub, movie_row("111"))
+
+    assert movie == {}
+    assert extractor.not_found == [2571]
+
+
+def test_transient_failure_is_error(extractor):
+    stub = StubTMDB({"/3/movie/603": [httpx.Response(503)]})
+
+    movie = extract(extractor, stub, movie_row("603"))
+
+    assert movie is None
+    assert extractor.not_found == []
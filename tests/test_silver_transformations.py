@@ -0,0 +1,38 @@
+"""
+Testes das transformações Silver do MovieLens.
+"""
+import numpy as np
+import pandas as pd
+
+from src.pipelines.movielens.silver.transformations import _clean_tags, transform_tags
+
+
+def tags_chunk(tags):
+    return pd.DataFrame({
+        "userId": np.arange(1, len(tags) + 1),
+        "movieId": np.full(len(tags), 10),
+        "tag": tags,
+        "timestamp": np.arange(len(tags)) + 1_500_000_000,
+    })
+
+
+def test_clean_tags_strips_and_lowers():
+    result = _clean_tags(pd.Series(["  Funny ", None, "DARK", "funny"]))
+    assert result.tolist() == ["funny", None, "dark", "funny"]
+
+
+def test_clean_tags_all_null_chunk():
+    assert _clean_tags(pd.Series([None, None])).tolist() == [None, None]
+    assert _clean_tags(pd.Series([np.nan, np.nan])).tolist() == [None, None]
+
+
+def test_transform_tags_all_null_chunk_is_empty():
+    df = transform_tags(tags_chunk([None, np.nan, None]))
+    assert df.empty
+    assert list(df.columns) == ["userid", "movieid", "tag", "timestamp"]
+
+
+def test_transform_tags_drops_null_and_empty_tags():
+    df = transform_tags(tags_chunk([" Sci-Fi ", None, "   ", "Classic"]))
+    assert df["tag"].tolist() == ["sci-fi", "classic"]
+    assert df["userid"].tolist() == [1, 4]